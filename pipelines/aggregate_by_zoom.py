@@ -23,6 +23,7 @@ from .aggregate_pmtiles import (
     SourceRecord,
     MAX_SUPPORTED_ZOOM,
 )
+from .tile_workers import default_workers
 from .uss_monitor import USSMonitor
 
 
@@ -37,6 +38,8 @@ def aggregate_zoom_range(
     io_sleep_ms: int = 0,
     warp_threads: int = 1,
     overwrite: bool = False,
+    pyramid: bool = False,
+    workers: int = 1,
 ) -> Path:
     """指定されたズーム範囲でaggregate処理を実行する。
 
@@ -54,6 +57,8 @@ def aggregate_zoom_range(
         io_sleep_ms: タイルごとのスリープ時間（ミリ秒）
         warp_threads: warpスレッド数
         overwrite: 既存ファイルを上書きするか
+        pyramid: max_zoom のみソースから生成し、下位ズームは子タイルから縮小するか
+        workers: タイル生成を行うワーカープロセス数（1 ならプロセス内で処理）
 
     Returns:
         生成されたMBTilesファイルのパス
@@ -87,6 +92,8 @@ def aggregate_zoom_range(
         io_sleep_ms=io_sleep_ms,
         warp_threads=warp_threads,
         overwrite=overwrite,
+        pyramid=pyramid,
+        workers=workers,
         emit_lineage=False,  # lineageは無効化
         lineage_suffix="",
     )
@@ -203,6 +210,18 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Overwrite existing MBTiles output if present",
     )
+    parser.add_argument(
+        "--pyramid",
+        action="store_true",
+        default=os.environ.get("FUSI_PYRAMID", "").lower() in ("1", "true", "yes"),
+        help="Build zooms below max-zoom from child tiles instead of the sources (env: FUSI_PYRAMID=1)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=default_workers(),
+        help="Render tiles in N worker processes (env: FUSI_WORKERS)",
+    )
     parser.add_argument(
         "sources",
         nargs="+",
@@ -345,6 +364,8 @@ def main() -> None:
                 io_sleep_ms=args.io_sleep_ms,
                 warp_threads=args.warp_threads,
                 overwrite=args.overwrite,
+                pyramid=args.pyramid,
+                workers=args.workers,
             )
             print(f"Success! Output: {output_path}")
         finally:
@@ -22,11 +22,12 @@ Examples:
 from __future__ import annotations
 
 import argparse
-import csv
 import math
+import os
+import threading
 from collections import defaultdict
 from pathlib import Path
-from typing import Dict, Generator, Iterable, List, Optional, Sequence, Tuple, Union, NamedTuple
+from typing import Callable, Dict, Generator, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
 import time
 from io import BytesIO
 
@@ -40,10 +41,12 @@ try:
     from rasterio.enums import Resampling
     from rasterio.transform import from_bounds as transform_from_bounds
     from rasterio.warp import transform_bounds, reproject
+    from rasterio.windows import Window
     RASTERIO_AVAILABLE = True
 except Exception:  # pragma: no cover - optional runtime dependency
     rasterio = None
     Resampling = None
+    Window = None
     transform_from_bounds = None
     transform_bounds = None
     reproject = None
@@ -54,11 +57,67 @@ import shutil
 import subprocess
 
 try:  # Allow running as a module or script
-    from .convert_terrarium import encode_terrarium
+    from .dataset_pool import (
+        DatasetPool,
+        ThreadLocalPool,
+        configure_shared_pool,
+        default_max_open_files,
+        get_shared_pool,
+    )
+    from .source_cache import (
+        SourceBlockCache,
+        configure_shared_cache,
+        default_source_cache_mb,
+        get_shared_cache,
+        read_level_window,
+    )
+    from .coverage import TileCoverage
+    from .fast_warp import WARP_ENGINES, default_warp_engine, is_separable, warp_separable
+    from .footprints import Footprint, compute_footprint, footprint_touches, load_stored_footprints, plan_occlusion
     from .mbtiles_writer import create_mbtiles_from_tiles
+    from .pyramid import DepthFirstPyramid, iter_morton_tiles
+    from .source_catalog import SourceCatalog, SourceRecord, SourceRef
+    from .spatial_index import SpatialIndex
+    from .staged_pipeline import Stage, StagedPipeline
+    from .tile_kernel import TileKernel, get_tile_kernel
+    from .tile_grid import count_tiles, iter_tiles, tile_range, tiles_in_subtree, zoom_ranges as bbox_zoom_ranges
+    from .tile_workers import (
+        TileWorkerPool,
+        default_workers,
+        render_chunk_task,
+        render_pyramid_chunk_task,
+    )
 except ImportError:  # pragma: no cover - fallback for direct execution
-    from convert_terrarium import encode_terrarium
+    from dataset_pool import (
+        DatasetPool,
+        ThreadLocalPool,
+        configure_shared_pool,
+        default_max_open_files,
+        get_shared_pool,
+    )
+    from source_cache import (
+        SourceBlockCache,
+        configure_shared_cache,
+        default_source_cache_mb,
+        get_shared_cache,
+        read_level_window,
+    )
+    from coverage import TileCoverage
+    from fast_warp import WARP_ENGINES, default_warp_engine, is_separable, warp_separable
+    from footprints import Footprint, compute_footprint, footprint_touches, load_stored_footprints, plan_occlusion
     from mbtiles_writer import create_mbtiles_from_tiles
+    from pyramid import DepthFirstPyramid, iter_morton_tiles
+    from source_catalog import SourceCatalog, SourceRecord, SourceRef
+    from spatial_index import SpatialIndex
+    from staged_pipeline import Stage, StagedPipeline
+    from tile_kernel import TileKernel, get_tile_kernel
+    from tile_grid import count_tiles, iter_tiles, tile_range, tiles_in_subtree, zoom_ranges as bbox_zoom_ranges
+    from tile_workers import (
+        TileWorkerPool,
+        default_workers,
+        render_chunk_task,
+        render_pyramid_chunk_task,
+    )
 
 EPSG_4326 = "EPSG:4326"
 EPSG_3857 = "EPSG:3857"
@@ -68,6 +127,15 @@ REFERENCE_TILE_SIZE = 512
 BASE_RESOLUTION_M = EARTH_CIRCUMFERENCE_M / REFERENCE_TILE_SIZE
 MAX_SUPPORTED_ZOOM = 17
 
+# Source read strategies accepted by `read_tile_from_source` / --read-mode
+READ_MODES = ("auto", "window", "full")
+# Zoom levels between a worker chunk tile and the tiles it renders (--chunk-depth)
+DEFAULT_CHUNK_DEPTH = 3
+# Zoom of the coarse buckets occlusion culling is planned for
+OCCLUSION_ZOOM = 5
+# Metatile edge lengths in tiles accepted by --metatile (1 renders tile by tile)
+METATILE_SIZES = (1, 2, 4, 8)
+
 __all__ = [
     "generate_aggregated_tiles",
     "build_records_from_sources",
@@ -75,30 +143,40 @@ __all__ = [
     "run_aggregate",
     "merge_tile_candidates_with_provenance",
     "compute_tile_provenance",
+    "SourceReadStats",
+    "get_shared_read_stats",
 ]
 
 
-class SourceRecord(NamedTuple):
-    """Lightweight tuple-like record for a single GeoTIFF derived from bounds.csv.
+def default_read_mode() -> str:
+    """Return the read mode from env `FUSI_READ_MODE` (default "auto")."""
+    mode = os.environ.get("FUSI_READ_MODE", "auto").lower()
+    return mode if mode in READ_MODES else "auto"
 
-    Using NamedTuple reduces per-record memory compared to a full dataclass
-    while preserving attribute access (e.g. `r.left`).
-    """
 
-    path: Path
-    left: float
-    bottom: float
-    right: float
-    top: float
-    width: int
-    height: int
-    pixel_size: float
-    source: str
-    priority: int
+def default_read_threads() -> int:
+    """Return the --pipeline reader thread count from env `FUSI_READ_THREADS` (default 2)."""
+    try:
+        return max(1, int(os.environ.get("FUSI_READ_THREADS", "2")))
+    except (TypeError, ValueError):
+        return 2
+
 
-    @property
-    def bounds_mercator(self) -> Tuple[float, float, float, float]:
-        return self.left, self.bottom, self.right, self.top
+def default_chunk_depth() -> int:
+    """Return the worker chunk depth from env `FUSI_CHUNK_DEPTH` (default 3)."""
+    try:
+        return int(os.environ.get("FUSI_CHUNK_DEPTH", str(DEFAULT_CHUNK_DEPTH)))
+    except (TypeError, ValueError):
+        return DEFAULT_CHUNK_DEPTH
+
+
+def default_metatile() -> int:
+    """Return the metatile size from env `FUSI_METATILE` (default 1 = tile by tile)."""
+    try:
+        size = int(os.environ.get("FUSI_METATILE", "1"))
+    except (TypeError, ValueError):
+        return 1
+    return size if size in METATILE_SIZES else 1
 
 
 def parse_args() -> argparse.Namespace:
@@ -164,6 +242,123 @@ def parse_args() -> argparse.Namespace:
         default=1,
         help="Number of threads for raster warping (reproject). Use 1 to reduce I/O pressure",
     )
+    parser.add_argument(
+        "--read-mode",
+        choices=READ_MODES,
+        default=default_read_mode(),
+        help=(
+            "How much of each source GeoTIFF to decode per tile: 'auto' reads the tile's window "
+            "and decimates when the tile is coarser than the source, 'window' reads the window at "
+            "full resolution (pixel-identical to 'full'), 'full' decodes the whole file "
+            "(env: FUSI_READ_MODE)"
+        ),
+    )
+    parser.add_argument(
+        "--warp-engine",
+        choices=WARP_ENGINES,
+        default=default_warp_engine(),
+        help=(
+            "Resampler for source reads: 'gdal' reprojects every tile with GDAL, 'numpy' uses a "
+            "separable bilinear warp for north-up geographic sources (falls back to GDAL otherwise; "
+            "env: FUSI_WARP_ENGINE)"
+        ),
+    )
+    parser.add_argument(
+        "--codec-backend",
+        choices=imagecodecs.available_backends(),
+        default=None,
+        help=(
+            "WebP codec library: 'pillow' or 'imagecodecs' when installed; all write lossless tiles "
+            "(compare with `python -m pipelines.imagecodecs --bench`; env: FUSI_WEBP_BACKEND)"
+        ),
+    )
+    parser.add_argument(
+        "--metatile",
+        type=int,
+        choices=METATILE_SIZES,
+        default=default_metatile(),
+        help=(
+            "Render N x N blocks of tiles at once: each source is read and warped once per block "
+            "and the merged block is sliced into tiles (in-process direct rendering only; "
+            "env: FUSI_METATILE)"
+        ),
+    )
+    parser.add_argument(
+        "--max-open-files",
+        type=int,
+        default=default_max_open_files(),
+        help="Maximum number of source GeoTIFFs kept open across tiles (LRU; env: FUSI_MAX_OPEN_FILES)",
+    )
+    parser.add_argument(
+        "--source-cache-mb",
+        type=int,
+        default=default_source_cache_mb(),
+        help="Memory budget in MiB for decoded source blocks shared across tiles (0 disables; env: FUSI_SOURCE_CACHE_MB)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=default_workers(),
+        help="Render tiles in N worker processes (1 = in-process; env: FUSI_WORKERS)",
+    )
+    parser.add_argument(
+        "--chunk-depth",
+        type=int,
+        default=default_chunk_depth(),
+        help=(
+            "With --workers, hand out tiles in chunks of all descendants of one tile this many zooms "
+            "above the rendered zoom (env: FUSI_CHUNK_DEPTH)"
+        ),
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        default=os.environ.get("FUSI_PIPELINE", "").lower() in ("1", "true", "yes"),
+        help=(
+            "Overlap reading and encoding in separate thread pools connected by bounded queues "
+            "(in-process rendering only; env: FUSI_PIPELINE=1)"
+        ),
+    )
+    parser.add_argument(
+        "--read-threads",
+        type=int,
+        default=default_read_threads(),
+        help="Reader threads for --pipeline, each with its own dataset pool (env: FUSI_READ_THREADS)",
+    )
+    parser.add_argument(
+        "--encode-threads",
+        type=int,
+        default=imagecodecs.default_encode_threads(),
+        help="Terrarium/WebP encoder threads, also for lineage tiles (env: FUSI_ENCODE_THREADS)",
+    )
+    parser.add_argument(
+        "--cull-occluded",
+        action="store_true",
+        default=os.environ.get("FUSI_CULL_OCCLUDED", "").lower() in ("1", "true", "yes"),
+        help=(
+            "Plan from valid-data footprints and never read sources fully covered by "
+            "higher-priority data (env: FUSI_CULL_OCCLUDED=1)"
+        ),
+    )
+    parser.add_argument(
+        "--footprint-filter",
+        action=argparse.BooleanOptionalAction,
+        default=os.environ.get("FUSI_FOOTPRINT_FILTER", "1").lower() not in ("0", "false", "no"),
+        help=(
+            "Skip reading a source for tiles outside its stored valid-data footprint "
+            "(footprints.npz from source_bounds.py --footprints; env: FUSI_FOOTPRINT_FILTER=0 disables)"
+        ),
+    )
+    parser.add_argument(
+        "--pyramid",
+        action="store_true",
+        default=os.environ.get("FUSI_PYRAMID", "").lower() in ("1", "true", "yes"),
+        help=(
+            "Render only max zoom from sources and build lower zooms by NaN-aware 2x2 averaging "
+            "of child tiles, walked depth-first so at most ~4 float32 tiles per zoom level are held "
+            "in memory regardless of area (env: FUSI_PYRAMID=1)"
+        ),
+    )
     parser.add_argument(
         "--overwrite",
         action="store_true",
@@ -190,6 +385,16 @@ def parse_args() -> argparse.Namespace:
         parser.error("Zoom levels must be non-negative")
     if args.max_zoom is not None and args.min_zoom > args.max_zoom:
         parser.error("min_zoom cannot be larger than max_zoom")
+    if args.max_open_files < 1:
+        parser.error("--max-open-files must be at least 1")
+    if args.source_cache_mb < 0:
+        parser.error("--source-cache-mb must be >= 0")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.chunk_depth < 0:
+        parser.error("--chunk-depth must be >= 0")
+    if args.read_threads < 1 or args.encode_threads < 1:
+        parser.error("--read-threads and --encode-threads must be at least 1")
 
     # Resolve verbose/silent precedence: explicit --verbose wins, then
     # --silent, otherwise verbose enabled by default
@@ -207,67 +412,32 @@ def recommended_max_zoom(pixel_size_m: float) -> int:
     return max(0, min(MAX_SUPPORTED_ZOOM, zoom))
 
 
-def load_bounds(source_name: str, priority: int = 0) -> List[SourceRecord]:
+def load_bounds(source_name: str, priority: int = 0) -> SourceCatalog:
+    """Load `source-store/<source_name>/bounds.csv` as a columnar catalog.
+
+    Items are `SourceRef` views with the attributes of `SourceRecord`. The
+    CSV is compiled once into `bounds.catalog/` and memory-mapped on later
+    loads; set `FUSI_CATALOG_CACHE=0` to always parse the CSV.
+    """
     bounds_path = Path("source-store") / source_name / "bounds.csv"
     if not bounds_path.exists():
         raise FileNotFoundError(
             f"Bounds file not found: {bounds_path}. Run 'just bounds {source_name}' first."
         )
 
-    records: List[SourceRecord] = []
-
-    with bounds_path.open() as fp:
-        reader = csv.DictReader(fp)
-        required = {"filename", "left", "bottom", "right", "top", "width", "height"}
-        missing = required.difference(reader.fieldnames or [])
-        if missing:
-            raise ValueError(f"bounds.csv is missing columns: {sorted(missing)}")
-
-        for row in reader:
-            tif_path = bounds_path.parent / row["filename"]
-            if not tif_path.exists():
-                print(f"Warning: Skipping missing file {tif_path}")
-                continue
-
-            width = int(row["width"])
-            height = int(row["height"])
-            left = float(row["left"])
-            bottom = float(row["bottom"])
-            right = float(row["right"])
-            top = float(row["top"])
-
-            if not (math.isfinite(left) and math.isfinite(bottom) and math.isfinite(right) and math.isfinite(top)):
-                print(f"Warning: Skipping invalid bounds for {tif_path}")
-                continue
-
-            span_x = max(abs(right - left), 1e-6)
-            span_y = max(abs(top - bottom), 1e-6)
-            res_x = span_x / max(width, 1)
-            res_y = span_y / max(height, 1)
-            pixel_size = max(res_x, res_y)
-
-            records.append(
-                SourceRecord(
-                    path=tif_path,
-                    left=left,
-                    bottom=bottom,
-                    right=right,
-                    top=top,
-                    width=width,
-                    height=height,
-                    pixel_size=pixel_size,
-                    source=source_name,
-                    priority=priority,
-                )
-            )
-
-    if not records:
+    if os.environ.get("FUSI_CATALOG_CACHE", "1").lower() in ("0", "false", "no"):
+        records = SourceCatalog.from_bounds_csv(bounds_path, source_name, priority)
+    else:
+        records = SourceCatalog.cached(bounds_path, source_name, priority)
+    if not len(records):
         raise RuntimeError(f"No valid GeoTIFF entries available for source '{source_name}'")
 
     return records
 
 
 def union_bounds(records: Sequence[SourceRecord]) -> Tuple[float, float, float, float]:
+    if isinstance(records, SourceCatalog):
+        return records.union_bounds()
     left = min(r.left for r in records)
     bottom = min(r.bottom for r in records)
     right = max(r.right for r in records)
@@ -281,13 +451,192 @@ def intersects(bounds_a: Tuple[float, float, float, float], bounds_b: Tuple[floa
     return not (a_right <= b_left or a_left >= b_right or a_top <= b_bottom or a_bottom >= b_top)
 
 
+def drop_occluded(
+    candidates: List[SourceRecord],
+    z: int,
+    x: int,
+    y: int,
+    occluded: Optional[Dict[Tuple[int, int, int], Set[SourceRecord]]],
+) -> List[SourceRecord]:
+    """Remove the records `occluded` culls in the coarse bucket containing z/x/y."""
+    if not occluded or not candidates or z < OCCLUSION_ZOOM:
+        return candidates
+    shift = z - OCCLUSION_ZOOM
+    hidden = occluded.get((OCCLUSION_ZOOM, x >> shift, y >> shift))
+    if not hidden:
+        return candidates
+    return [r for r in candidates if r not in hidden]
+
+
+def drop_outside_footprints(
+    candidates: List[SourceRecord],
+    z: int,
+    x: int,
+    y: int,
+    footprints: Optional[Dict[SourceRecord, Optional[Footprint]]],
+) -> List[SourceRecord]:
+    """Remove the records whose stored footprint has no data near tile z/x/y.
+
+    Records without a stored footprint are kept.
+    """
+    if not footprints or not candidates:
+        return candidates
+    kept = []
+    for r in candidates:
+        fp = footprints.get(r, r)
+        if fp is r or (fp is not None and footprint_touches(fp, z, x, y)):
+            kept.append(r)
+    return kept
+
+
+def make_candidate_pruner(
+    bbox_mercator: Tuple[float, float, float, float],
+    zoom_ranges: Dict[int, Tuple[int, int, int, int]],
+    on_checked: Optional[Callable[[int], None]] = None,
+    count_from_zoom: int = 0,
+    occluded: Optional[Dict[Tuple[int, int, int], Set[SourceRecord]]] = None,
+    index: Optional[SpatialIndex] = None,
+    footprints: Optional[Dict[SourceRecord, Optional[Footprint]]] = None,
+    coverage: Optional[TileCoverage] = None,
+) -> Callable[[int, int, int, Sequence[SourceRecord]], Optional[List[SourceRecord]]]:
+    """Build a quadtree `prune(z, x, y, candidates)` callback.
+
+    The callback narrows `candidates` to the records overlapping the tile and
+    returns None when the tile is outside `bbox_mercator` or has no
+    candidates, so whole subtrees are skipped. `on_checked` receives progress
+    increments: the planned tile count of every skipped subtree, and 1 for
+    every visited tile at or below `count_from_zoom` that is in `zoom_ranges`.
+    `occluded` (see `pipelines.footprints.plan_occlusion`) maps coarse
+    buckets to the records dropped inside them, from the bucket's
+    zoom down. With `index`, each tile's records are queried from the
+    spatial index instead of filtering `candidates` (a tile's records are
+    always among its parent's), and come back in merge order.
+    `footprints` (see `drop_outside_footprints`) drops records with no
+    valid data near the tile. With `coverage` (see `pipelines.coverage`),
+    subtrees without covered tiles are skipped before any query, and
+    progress counts covered tiles instead of all planned ones.
+    """
+
+    def prune(z: int, x: int, y: int, candidates: Sequence[SourceRecord]) -> Optional[List[SourceRecord]]:
+        if coverage is not None:
+            covered = coverage.count_in_subtree(z, x, y, zoom_ranges)
+            if not covered:
+                return None
+        b = mercantile.xy_bounds(x, y, z)
+        box = (b.left, b.bottom, b.right, b.top)
+        narrowed: List[SourceRecord] = []
+        if intersects(box, bbox_mercator):
+            if index is not None:
+                narrowed = index.candidates(box)
+            else:
+                narrowed = [r for r in candidates if intersects(r.bounds_mercator, box)]
+        narrowed = drop_outside_footprints(drop_occluded(narrowed, z, x, y, occluded), z, x, y, footprints)
+        if not narrowed:
+            if on_checked is not None:
+                on_checked(covered if coverage is not None else tiles_in_subtree(z, x, y, zoom_ranges))
+            return None
+        if on_checked is not None and z >= count_from_zoom and z in zoom_ranges:
+            if coverage is None or coverage.contains(z, x, y):
+                on_checked(1)
+        return narrowed
+
+    return prune
+
+
+def plan_source_window(
+    src: "rasterio.io.DatasetReader",
+    tile_bounds_mercator: mercantile.TileBoundingBox,
+    out_shape: Tuple[int, int],
+    decimate: bool = True,
+) -> Optional[Tuple["Window", int]]:
+    """Return the source-space window (and decimation factor) needed for a tile.
+
+    The window covers the tile's Mercator bounds transformed into the source
+    CRS, padded by a resampling margin so bilinear sampling at the tile edges
+    sees the same neighbours as a whole-file read. The margin grows with the
+    source-to-tile pixel ratio because GDAL widens the bilinear kernel when
+    downsampling.
+
+    When `decimate` is enabled and the tile is at least 2x coarser than the
+    source, a power-of-two decimation factor is returned so the caller can
+    read a reduced `out_shape` (GDAL serves this from overviews when present).
+
+    Returns None when the tile does not touch the raster, and raises
+    ValueError for rotated/sheared grids that cannot be windowed.
+    """
+    t = src.transform
+    if t.b != 0 or t.d != 0:
+        raise ValueError("Windowed reads require a north-up source transform")
+
+    src_left, src_bottom, src_right, src_top = transform_bounds(
+        EPSG_3857,
+        src.crs,
+        tile_bounds_mercator.left,
+        tile_bounds_mercator.bottom,
+        tile_bounds_mercator.right,
+        tile_bounds_mercator.top,
+        densify_pts=21,
+    )
+    window = rasterio.windows.from_bounds(src_left, src_bottom, src_right, src_top, transform=t)
+
+    height, width = out_shape
+    ratio_x = abs(window.width) / max(width, 1)
+    ratio_y = abs(window.height) / max(height, 1)
+    margin = int(math.ceil(max(ratio_x, ratio_y, 1.0))) + 2
+
+    col_off = int(math.floor(window.col_off)) - margin
+    row_off = int(math.floor(window.row_off)) - margin
+    col_end = int(math.ceil(window.col_off + window.width)) + margin
+    row_end = int(math.ceil(window.row_off + window.height)) + margin
+
+    col_off = max(col_off, 0)
+    row_off = max(row_off, 0)
+    col_end = min(col_end, src.width)
+    row_end = min(row_end, src.height)
+    if col_off >= col_end or row_off >= row_end:
+        return None
+
+    factor = 1
+    ratio = min(ratio_x, ratio_y)
+    if decimate and ratio >= 2.0:
+        factor = 1 << int(math.floor(math.log2(ratio)))
+
+    return Window(col_off, row_off, col_end - col_off, row_end - row_off), factor
+
+
 def read_tile_from_source(
     record: SourceRecord,
     tile_bounds_mercator: mercantile.TileBoundingBox,
     out_shape: Tuple[int, int],
     warp_threads: int,
+    read_mode: str = "auto",
+    pool: Optional[DatasetPool] = None,
+    cache: Optional[SourceBlockCache] = None,
+    zoom: Optional[int] = None,
+    warp_engine: str = "gdal",
 ) -> Optional[np.ndarray]:
-    """Reproject the raster onto the requested tile grid and return float32 elevations."""
+    """Reproject the raster onto the requested tile grid and return float32 elevations.
+
+    The dataset handle comes from `pool` (the process-wide shared pool by
+    default) so consecutive tiles reuse open files instead of reopening them.
+    Windowed reads are served from `cache` (the shared decoded block cache by
+    default); `zoom` only labels the cache hit/miss counters.
+
+    `read_mode` selects how much of the source is decoded:
+
+    * ``"full"``: read the whole band (legacy behaviour).
+    * ``"window"``: read only the window covering the tile plus a resampling
+      margin. Output is pixel-identical to ``"full"``.
+    * ``"auto"``: like ``"window"``, but additionally read at a power-of-two
+      decimation (aligned to the factor) when the tile is at least 2x
+      coarser than the source.
+
+    With `warp_engine="numpy"`, north-up geographic sources are resampled by
+    `pipelines.fast_warp.warp_separable` instead of GDAL when the tile is
+    not coarser than the (decimated) source.
+    """
+    if read_mode not in READ_MODES:
+        raise ValueError(f"Unknown read_mode '{read_mode}' (expected one of {READ_MODES})")
 
     height, width = out_shape
     tile_transform = transform_from_bounds(
@@ -299,15 +648,42 @@ def read_tile_from_source(
         height,
     )
 
-    with rasterio.open(record.path) as src:
-        if src.crs is None:
-            raise ValueError(f"CRS not defined for {record.path}")
+    if pool is None:
+        pool = get_shared_pool()
+    src = pool.get(record.path)
+    if src.crs is None:
+        raise ValueError(f"CRS not defined for {record.path}")
 
-        destination = np.full(out_shape, np.nan, dtype=np.float32)
+    window = None
+    factor = 1
+    if read_mode != "full":
+        try:
+            planned = plan_source_window(
+                src, tile_bounds_mercator, out_shape, decimate=(read_mode == "auto")
+            )
+        except ValueError:
+            planned = (None, 1)
+        if planned is None:
+            return None
+        window, factor = planned
 
+    if window is not None:
+        # Windowed reads go through the decoded block cache; blocks come back
+        # as float32 with NaN for nodata, so the NaN pattern is the mask.
+        if cache is None:
+            cache = get_shared_cache()
+        try:
+            src_arr, src_transform = read_level_window(
+                src, str(record.path), window, factor=factor, cache=cache, zoom=zoom
+            )
+        except Exception as exc:
+            raise ValueError(f"Failed to read band from {record.path}: {exc}")
+        valid_mask = ~np.isnan(src_arr)
+    else:
+        src_transform = src.transform
         # Build explicit source mask to ensure NODATA propagates as NaN
         try:
-            src_arr = src.read(1, masked=False).astype("float32")
+            src_arr = src.read(1, masked=False).astype("float32", copy=False)
         except Exception as exc:
             raise ValueError(f"Failed to read band from {record.path}: {exc}")
 
@@ -321,28 +697,82 @@ def read_tile_from_source(
             except Exception:
                 # Fallback: treat all as valid; outside bounds will still be NaN after reproject
                 valid_mask = np.ones_like(src_arr, dtype=bool)
+            src_arr[~valid_mask] = np.nan
 
+    destination = None
+    if warp_engine == "numpy" and is_separable(src.crs, src_transform):
+        destination = warp_separable(src_arr, src_transform, tile_bounds_mercator, out_shape)
+    if destination is None:
+        destination = np.full(out_shape, np.nan, dtype=np.float32)
         reproject(
             source=src_arr,
             destination=destination,
-            src_transform=src.transform,
+            src_transform=src_transform,
             src_crs=src.crs,
             dst_transform=tile_transform,
             dst_crs=EPSG_3857,
             resampling=Resampling.bilinear,
-            source_mask=valid_mask.astype("uint8"),
+            # bool and uint8 share a layout: pass the mask without a copy
+            source_mask=valid_mask.view(np.uint8),
             dst_nodata=np.nan,
             num_threads=max(1, int(warp_threads)),
         )
 
-        if np.isnan(destination).all():
-            return None
+    if np.isnan(destination).all():
+        return None
+
+    return destination
+
+
+class SourceReadStats:
+    """Per-zoom counts of source reads made and skipped by the early-exit merge."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # zoom -> [reads, skipped]; None collects reads made outside a zoom loop
+        self._zoom_stats: Dict[Optional[int], List[int]] = defaultdict(lambda: [0, 0])
+
+    def record(self, zoom: Optional[int], reads: int, skipped: int) -> None:
+        with self._lock:
+            stats = self._zoom_stats[zoom]
+            stats[0] += reads
+            stats[1] += skipped
 
-        return destination
+    def zoom_stats(self) -> Dict[Optional[int], Tuple[int, int]]:
+        """Return {zoom: (reads, skipped)}."""
+        with self._lock:
+            return {z: (v[0], v[1]) for z, v in self._zoom_stats.items()}
+
+    def format_stats(self, zoom: Optional[int] = None) -> str:
+        """One-line summary; restricted to `zoom` when given."""
+        stats = self.zoom_stats()
+        if zoom is not None:
+            reads, skipped = stats.get(zoom, (0, 0))
+        else:
+            reads = sum(r for r, _ in stats.values())
+            skipped = sum(k for _, k in stats.values())
+        total = reads + skipped
+        rate = (skipped / total * 100.0) if total else 0.0
+        return f"reads={reads} skipped={skipped} ({rate:.1f}% skipped)"
+
+
+_shared_read_stats = SourceReadStats()
+
+
+def get_shared_read_stats() -> SourceReadStats:
+    """Return the process-wide read counters used by default by the tile readers."""
+    return _shared_read_stats
 
 
 def merge_tile_candidates(candidates: Iterable[np.ndarray]) -> Optional[np.ndarray]:
+    """Fill the NaN gaps of each candidate from the next one, in priority order.
+
+    `candidates` is consumed lazily and the merge stops as soon as no NaN
+    pixel is left, so passing a generator of reads skips the reads of
+    sources that could not contribute anything.
+    """
     merged: Optional[np.ndarray] = None
+    gaps: Optional[np.ndarray] = None
 
     for data in candidates:
         if data is None:
@@ -350,11 +780,15 @@ def merge_tile_candidates(candidates: Iterable[np.ndarray]) -> Optional[np.ndarr
 
         if merged is None:
             merged = data
-            continue
+            gaps = np.isnan(merged)
+        else:
+            mask = gaps & ~np.isnan(data)
+            if np.any(mask):
+                merged = np.where(mask, data, merged)
+                gaps &= ~mask
 
-        mask = np.isnan(merged) & ~np.isnan(data)
-        if np.any(mask):
-            merged = np.where(mask, data, merged)
+        if not gaps.any():
+            break
 
     return merged
 
@@ -372,6 +806,7 @@ def merge_tile_candidates_with_provenance(candidates: Iterable[Tuple[int, np.nda
     merged: Optional[np.ndarray] = None
     provenance: Optional[np.ndarray] = None
 
+    # Like `merge_tile_candidates`, stop consuming once every pixel is filled
     for src_idx, data in candidates:
         if data is None:
             continue
@@ -380,13 +815,17 @@ def merge_tile_candidates_with_provenance(candidates: Iterable[Tuple[int, np.nda
             merged = data.copy()
             provenance = np.full(data.shape, fill_value=src_idx, dtype=np.int16)
             # mark NaNs as nodata provenance
-            provenance[np.isnan(merged)] = -1
-            continue
+            gaps = np.isnan(merged)
+            provenance[gaps] = -1
+        else:
+            mask = gaps & ~np.isnan(data)
+            if np.any(mask):
+                merged = np.where(mask, data, merged)
+                provenance[mask] = src_idx
+                gaps &= ~mask
 
-        mask = np.isnan(merged) & ~np.isnan(data)
-        if np.any(mask):
-            merged = np.where(mask, data, merged)
-            provenance[mask] = src_idx
+        if not gaps.any():
+            break
 
     if merged is None:
         return None, None
@@ -402,31 +841,167 @@ def compute_tile_provenance(
     tile_bounds_mercator: mercantile.TileBoundingBox,
     out_shape: Tuple[int, int],
     warp_threads: int = 1,
+    read_mode: str = "auto",
+    pool: Optional[DatasetPool] = None,
+    cache: Optional[SourceBlockCache] = None,
+    zoom: Optional[int] = None,
+    read_stats: Optional[SourceReadStats] = None,
+    warp_engine: str = "gdal",
 ) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
     """Read overlapping records for a tile and compute merged elevation and provenance mask.
 
     Returns (merged_elevation, provenance_mask) where provenance_mask uses
     source priority indices (0 = highest priority) and -1 = nodata.
+    Records are read in priority order until the tile is full; the
+    remaining ones are counted as skipped in `read_stats`.
     """
-    arrays: List[Tuple[int, np.ndarray]] = []
-    for rec in overlapping_records:
-        try:
-            data = read_tile_from_source(rec, tile_bounds_mercator, out_shape=out_shape, warp_threads=warp_threads)
-        except Exception as exc:  # pragma: no cover - defensive
-            print(f"Warning: {exc}")
-            data = None
-        if data is not None:
-            arrays.append((rec.priority, data))
-
-    if not arrays:
-        return None, None
+    # Same merge rank as render_tile_from_sources, so lineage matches the tiles
+    ordered = sorted(overlapping_records, key=lambda r: (r.priority, r.pixel_size))
+    reads = 0
+
+    def tile_reads() -> Iterator[Tuple[int, np.ndarray]]:
+        nonlocal reads
+        for rec in ordered:
+            reads += 1
+            try:
+                data = read_tile_from_source(
+                    rec,
+                    tile_bounds_mercator,
+                    out_shape=out_shape,
+                    warp_threads=warp_threads,
+                    read_mode=read_mode,
+                    pool=pool,
+                    cache=cache,
+                    zoom=zoom,
+                    warp_engine=warp_engine,
+                )
+            except Exception as exc:  # pragma: no cover - defensive
+                print(f"Warning: {exc}")
+                continue
+            if data is not None:
+                yield rec.priority, data
 
-    # Sort by priority then pixel size was already done upstream; ensure order by priority
-    arrays.sort(key=lambda t: (t[0],))
-    merged, provenance = merge_tile_candidates_with_provenance(arrays)
+    merged, provenance = merge_tile_candidates_with_provenance(tile_reads())
+    (read_stats or get_shared_read_stats()).record(zoom, reads, len(ordered) - reads)
     return merged, provenance
 
 
+def render_tile_from_sources(
+    candidate_records: Sequence[SourceRecord],
+    tile_bounds_mercator: mercantile.TileBoundingBox,
+    out_shape: Tuple[int, int] = (512, 512),
+    warp_threads: int = 1,
+    read_mode: str = "auto",
+    pool: Optional[DatasetPool] = None,
+    cache: Optional[SourceBlockCache] = None,
+    zoom: Optional[int] = None,
+    read_stats: Optional[SourceReadStats] = None,
+    warp_engine: str = "gdal",
+    kernel: Optional[TileKernel] = None,
+) -> Optional[np.ndarray]:
+    """Read and priority-merge the candidates overlapping a tile.
+
+    Sources are read in priority order only until the tile has no NaN
+    pixel left; the reads skipped that way are counted per zoom in
+    `read_stats` (the shared counters by default).
+
+    With `kernel`, the merge runs in the kernel's buffers and the result is
+    `kernel.merged`, valid until the kernel's next merge.
+
+    Returns the merged float32 elevations, or None when nothing has data.
+    """
+    xy_bounds = tile_bounds_mercator
+    # Filter candidates precisely using Mercator bounds
+    overlapping = [
+        record for record in candidate_records
+        if intersects(record.bounds_mercator, (xy_bounds.left, xy_bounds.bottom, xy_bounds.right, xy_bounds.top))
+    ]
+    if not overlapping:
+        return None
+
+    # Sort by source priority first (lower = higher priority), then finer pixel size
+    overlapping.sort(key=lambda r: (r.priority, r.pixel_size))
+    reads = 0
+
+    def tile_reads() -> Iterator[np.ndarray]:
+        nonlocal reads
+        for rec in overlapping:
+            reads += 1
+            try:
+                data = read_tile_from_source(
+                    rec,
+                    xy_bounds,
+                    out_shape=out_shape,
+                    warp_threads=warp_threads,
+                    read_mode=read_mode,
+                    pool=pool,
+                    cache=cache,
+                    zoom=zoom,
+                    warp_engine=warp_engine,
+                )
+            except Exception as exc:  # pragma: no cover - defensive logging
+                print(f"Warning: {exc}")
+                continue
+            if data is not None:
+                yield data
+
+    merged = kernel.merge(tile_reads()) if kernel is not None else merge_tile_candidates(tile_reads())
+    (read_stats or get_shared_read_stats()).record(zoom, reads, len(overlapping) - reads)
+    if merged is None or np.isnan(merged).all():
+        return None
+    return merged
+
+
+def render_metatile_from_sources(
+    candidate_records: Sequence[SourceRecord],
+    z: int,
+    tiles: Sequence[Tuple[int, int]],
+    size: int,
+    tile_shape: Tuple[int, int] = (512, 512),
+    warp_threads: int = 1,
+    read_mode: str = "auto",
+    pool: Optional[DatasetPool] = None,
+    cache: Optional[SourceBlockCache] = None,
+    read_stats: Optional[SourceReadStats] = None,
+    warp_engine: str = "gdal",
+) -> List[Tuple[int, int, np.ndarray]]:
+    """Render `tiles` at `z` from one read and warp per source over their metatile.
+
+    `size` is a power of two and all `tiles` lie under the same tile
+    log2(size) zooms up; that tile's bounds are rendered at `size` times
+    the tile resolution by `render_tile_from_sources` and sliced into
+    tiles. Output pixels are centred where the per-tile ones are, so tiles
+    match tile-by-tile rendering up to the warper's rounding.
+
+    Returns `(x, y, elevations)` for the tiles with data; the arrays are
+    views into the merged metatile.
+    """
+    shift = size.bit_length() - 1
+    mx, my = tiles[0][0] >> shift, tiles[0][1] >> shift
+    height, width = tile_shape
+    merged = render_tile_from_sources(
+        candidate_records,
+        mercantile.xy_bounds(mx, my, z - shift),
+        out_shape=(size * height, size * width),
+        warp_threads=warp_threads,
+        read_mode=read_mode,
+        pool=pool,
+        cache=cache,
+        zoom=z,
+        read_stats=read_stats,
+        warp_engine=warp_engine,
+    )
+    if merged is None:
+        return []
+    out = []
+    for x, y in tiles:
+        row, col = (y - (my << shift)) * height, (x - (mx << shift)) * width
+        tile = merged[row : row + height, col : col + width]
+        if not np.isnan(tile).all():
+            out.append((x, y, tile))
+    return out
+
+
 def generate_aggregated_tiles(
     records: Sequence[SourceRecord],
     min_zoom: int,
@@ -436,7 +1011,71 @@ def generate_aggregated_tiles(
     verbose: bool = False,
     io_sleep_ms: int = 0,
     warp_threads: int = 1,
+    read_mode: str = "auto",
+    pool: Optional[DatasetPool] = None,
+    cache: Optional[SourceBlockCache] = None,
+    pyramid: bool = False,
+    workers: int = 1,
+    chunk_depth: int = DEFAULT_CHUNK_DEPTH,
+    pipeline: bool = False,
+    read_threads: int = 2,
+    encode_threads: Optional[int] = None,
+    cull_occluded: bool = False,
+    footprint_filter: bool = True,
+    warp_engine: str = "gdal",
+    metatile: int = 1,
 ) -> Generator[Tuple[int, int, int, bytes], None, None]:
+    """Yield `(z, x, y, webp)` Terrarium tiles for `records`.
+
+    By default every zoom is rendered directly from the sources. With
+    `pyramid` only `max_zoom` is; the tile tree under each `min_zoom` tile
+    is walked depth-first and lower zooms are reduced from their children
+    (see `pipelines.pyramid`), holding at most ~4 float32 tiles (1 MiB
+    each) per zoom level in memory.
+
+    With `workers` > 1, tiles are rendered and encoded in a process pool
+    (see `pipelines.tile_workers`). Work is handed out in spatially compact
+    chunks: in direct mode the tiles of each zoom under one tile
+    `chunk_depth` zooms up (the last chunks of a zoom are split into
+    quadrants), in pyramid mode whole subtrees up to `chunk_depth` deep.
+    Chunks are rendered in Morton order, so the output is identical for
+    any worker count (though ordered differently from the in-process scan).
+
+    In-process, Terrarium/WebP encoding runs on `encode_threads` threads
+    (FUSI_ENCODE_THREADS by default) while the next tiles are read. With
+    `pipeline`, reading gets its own pool of `read_threads` threads too, and
+    the two are connected by bounded queues (see `pipelines.staged_pipeline`);
+    each reader thread has its own dataset pool. In pyramid mode the
+    depth-first walk feeds the encoders. Output order is unchanged.
+
+    With `cull_occluded`, a planning pass rasterises every record's
+    valid-data footprint and drops, per coarse bucket, the records fully
+    covered by higher-priority data (see `pipelines.footprints`).
+
+    With `footprint_filter`, footprints stored next to bounds.csv by
+    `source_bounds.py --footprints` are loaded and a record is dropped from
+    a tile before any read when it has no valid data near the tile.
+
+    Only tiles in the sources' coverage (`pipelines.coverage`: record
+    bboxes, narrowed by stored footprints) are scanned or walked, and the
+    planned tile count and progress count covered tiles only.
+
+    `warp_engine` selects the resampler of source reads (see
+    `read_tile_from_source`).
+
+    With `metatile` > 1 (a power of two), the in-process direct scans render
+    blocks of `metatile` x `metatile` covered tiles: each source overlapping
+    a block is read and warped once onto the block and the merged block is
+    sliced into tiles (see `render_metatile_from_sources`). Tiles come out
+    block by block. A block of 8 x 8 holds 64 MiB of float32 per read.
+    """
+    if metatile not in METATILE_SIZES:
+        raise ValueError(f"metatile must be one of {METATILE_SIZES}")
+    if pool is None:
+        pool = get_shared_pool()
+    if cache is None:
+        cache = get_shared_cache()
+
     # start_time will be set once the planned tile scan is known. This
     # avoids inflating ETA by including earlier setup (bounds/buckets)
     # phases in the measured processing rate.
@@ -465,30 +1104,51 @@ def generate_aggregated_tiles(
     else:
         west, south, east, north = union_west, union_south, union_east, union_north
 
-    # Build spatial index keyed by zoom level 5 tiles for efficient candidate filtering
+    # Packed R-tree over the records' Mercator bounds; queries return
+    # candidates already in merge order
     if verbose:
-        print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] [phase] Building coarse buckets (z5) for source records...")
+        print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] [phase] Building spatial index for source records...")
     else:
-        print("[phase] Building coarse buckets (z5) for source records...")
-    buckets: Dict[Tuple[int, int, int], List[SourceRecord]] = defaultdict(list)
-    coarse_zoom = 5
-    for record in records:
-        west_r, south_r, east_r, north_r = transform_bounds(
-            EPSG_3857,
-            EPSG_4326,
-            record.left,
-            record.bottom,
-            record.right,
-            record.top,
-            densify_pts=5,
-        )
-        for tile in mercantile.tiles(west_r, south_r, east_r, north_r, coarse_zoom):
-            buckets[(coarse_zoom, tile.x, tile.y)].append(record)
-
+        print("[phase] Building spatial index for source records...")
+    index = SpatialIndex.from_records(records)
     if verbose:
-        print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] [phase] Coarse buckets ready: {len(buckets)} tiles with candidates")
+        print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] [phase] Spatial index ready: {len(index)} records, depth {index.depth}")
     else:
-        print(f"[phase] Coarse buckets ready: {len(buckets)} tiles with candidates")
+        print(f"[phase] Spatial index ready: {len(index)} records, depth {index.depth}")
+
+    stored_footprints: Dict[SourceRecord, Optional[Footprint]] = {}
+    if footprint_filter:
+        stored_footprints = load_stored_footprints(records)
+        if stored_footprints:
+            empty = sum(1 for fp in stored_footprints.values() if fp is None)
+            print(
+                f"[phase] Footprint filter: {len(stored_footprints)} of {len(records)} records have stored "
+                f"footprints ({empty} without valid data)"
+            )
+
+    occluded: Dict[Tuple[int, int, int], Set[SourceRecord]] = {}
+    if cull_occluded:
+        if verbose:
+            print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] [phase] Planning occlusion from valid-data footprints...")
+        else:
+            print("[phase] Planning occlusion from valid-data footprints...")
+        footprints = dict(stored_footprints)
+        for record in records:
+            if record in footprints:
+                continue
+            try:
+                footprints[record] = compute_footprint(record, pool)
+            except Exception as exc:  # never cull a record we could not read
+                print(f"Warning: footprint of {record.path} unavailable: {exc}")
+        buckets: Dict[Tuple[int, int, int], List[SourceRecord]] = {}
+        bucket_range = tile_range(union_west, union_south, union_east, union_north, OCCLUSION_ZOOM)
+        for x, y, b in iter_tiles(bucket_range, OCCLUSION_ZOOM):
+            candidates = index.candidates((b.left, b.bottom, b.right, b.top))
+            if candidates:
+                buckets[(OCCLUSION_ZOOM, x, y)] = candidates
+        plan = plan_occlusion(buckets, footprints)
+        occluded = plan.occluded
+        print(f"[phase] {plan.format_summary()}")
 
     per_zoom_candidate_counts: Dict[int, int] = {}
     total_candidates = 0
@@ -496,16 +1156,25 @@ def generate_aggregated_tiles(
         print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] [phase] Scanning candidate tile counts per zoom...")
     else:
         print("[phase] Scanning candidate tile counts per zoom...")
+    # Closed-form per zoom: the tiles of a bbox are a rectangle of indices
+    zoom_ranges = bbox_zoom_ranges(west, south, east, north, range(min_zoom, max_zoom + 1))
+    # Only tiles some record's bbox (or stored footprint) reaches are scanned
+    coverage = TileCoverage.from_records(records, zoom_ranges, stored_footprints)
     for z in range(min_zoom, max_zoom + 1):
-        count = sum(1 for _ in mercantile.tiles(west, south, east, north, z))
+        count = coverage.count(z)
         per_zoom_candidate_counts[z] = count
         total_candidates += count
+    bbox_tiles = count_tiles(zoom_ranges)
 
     if verbose:
-        print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Planned tile scan: {total_candidates} candidates across zooms {min_zoom}-{max_zoom}")
+        print(
+            f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Planned tile scan: {total_candidates} candidates across zooms "
+            f"{min_zoom}-{max_zoom} ({bbox_tiles - total_candidates} of {bbox_tiles} bbox tiles have no source)"
+        )
     else:
         print(
-            f"Planned tile scan: {total_candidates} candidates across zooms {min_zoom}-{max_zoom}"
+            f"Planned tile scan: {total_candidates} candidates across zooms {min_zoom}-{max_zoom} "
+            f"({bbox_tiles - total_candidates} of {bbox_tiles} bbox tiles have no source)"
         )
     if total_candidates:
         detail = ", ".join(
@@ -523,80 +1192,439 @@ def generate_aggregated_tiles(
     # distort the early ETA estimate.
     start_time = time.time()
 
-    for z in range(min_zoom, max_zoom + 1):
+    def tile_candidates(z: int, x: int, y: int, b: mercantile.Bbox) -> List[SourceRecord]:
+        candidates = drop_occluded(index.candidates((b.left, b.bottom, b.right, b.top)), z, x, y, occluded)
+        return drop_outside_footprints(candidates, z, x, y, stored_footprints)
+
+    def encode_tile(z: int, x: int, y: int, merged: np.ndarray) -> Optional[bytes]:
+        try:
+            # Encoder threads each reuse their own kernel's buffers
+            rgb = get_tile_kernel(merged.shape).encode(merged, z)
+            return encoder.encode(rgb)
+        except Exception as exc:  # pragma: no cover - defensive logging
+            print(f"Warning: Failed to encode tile {z}/{x}/{y}: {exc}")
+            return None
+
+    def encode_stage(item: Tuple[int, int, int, np.ndarray]) -> Optional[Tuple[int, int, int, bytes]]:
+        z, x, y, merged = item
+        webp = encode_tile(z, x, y, merged)
+        return None if webp is None else (z, x, y, webp)
+
+    read_stats = get_shared_read_stats()
+    # Readers of the in-process modes; the staged pipeline swaps in per-thread pools
+    reader_pool: Union[DatasetPool, ThreadLocalPool] = pool
+    staged: Optional[StagedPipeline] = None
+
+    def stats_suffix(z: int) -> str:
+        if workers > 1:
+            # Dataset pools and block caches live in the worker processes
+            return f"{workers} workers"
+        suffix = f"{reader_pool.format_stats()}; {cache.format_stats(z)}; {read_stats.format_stats(z)}"
+        if staged is not None:
+            suffix += f"; {staged.format_stats()}"
+        return suffix
+
+    def report_progress(z: int) -> None:
+        if not progress_interval or not (
+            emitted_tiles % progress_interval == 0 or checked_tiles == total_candidates
+        ):
+            return
+        percent = (checked_tiles / total_candidates * 100.0) if total_candidates else 0.0
+        # ETA based on checked_tiles processing rate
+        now = time.time()
+        elapsed = max(1e-6, now - start_time)
+        rate = checked_tiles / elapsed if elapsed > 0 else 0
+        eta_str = "?"
+        if rate > 0 and total_candidates and checked_tiles < total_candidates:
+            remaining = total_candidates - checked_tiles
+            eta_seconds = int(remaining / rate)
+            eta_time = time.localtime(now + eta_seconds)
+            eta_str = time.strftime('%Y-%m-%d %H:%M:%S', eta_time) + f" (in {eta_seconds}s)"
+
+        print(
+            f"Progress: {emitted_tiles} tiles written; processed {checked_tiles}/"
+            f"{total_candidates} candidates ({percent:.1f}%) ETA: {eta_str} "
+            f"[{stats_suffix(z)}]"
+        )
+
+    def announce_zoom(z: int, what: str) -> None:
         if verbose:
-            print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] [z{z}] Starting tile scan...")
+            print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] [z{z}] {what}...")
         else:
-            print(f"[z{z}] Starting tile scan...")
-        for tile in mercantile.tiles(west, south, east, north, z):
-            checked_tiles += 1
-            xy_bounds = mercantile.xy_bounds(tile)
-            shift = max(z - coarse_zoom, 0)
-            bucket_key = (coarse_zoom, tile.x >> shift, tile.y >> shift)
-            candidate_records = buckets.get(bucket_key, [])
-            if not candidate_records:
-                continue
+            print(f"[z{z}] {what}...")
+
+    if pipeline and workers > 1:
+        print("Note: --pipeline applies to in-process rendering; worker processes already overlap stages")
+        pipeline = False
+    if metatile > 1 and (pyramid or workers > 1):
+        print("Note: --metatile applies to in-process direct rendering; rendering tile by tile")
+        metatile = 1
+
+    def metatile_tasks(z: int) -> Iterator[Tuple[int, List[Tuple[int, int]], List[SourceRecord]]]:
+        """Yield `(size, tiles, candidates)` per metatile at `z`; tiles without candidates are left out."""
+        nonlocal checked_tiles
+        size = min(metatile, 1 << z)
+        shift = size.bit_length() - 1
+        for mx, my, xs, ys in coverage.iter_metatiles(z, size):
+            checked_tiles += len(xs)
+            tiles = []
+            used: Set[SourceRecord] = set()
+            for x, y in zip(xs.tolist(), ys.tolist()):
+                candidates = tile_candidates(z, x, y, mercantile.xy_bounds(x, y, z))
+                if candidates:
+                    tiles.append((x, y))
+                    used.update(candidates)
+            if tiles:
+                # Query the block once so candidates keep the index's merge order
+                b = mercantile.xy_bounds(mx, my, z - shift)
+                yield size, tiles, [r for r in index.candidates((b.left, b.bottom, b.right, b.top)) if r in used]
+
+    if pyramid or workers > 1:
+        bbox_left, bbox_bottom = mercantile.xy(west, south)
+        bbox_right, bbox_top = mercantile.xy(east, north)
+        bbox_mercator = (bbox_left, bbox_bottom, bbox_right, bbox_top)
+        all_records = list(records)
+
+        def add_checked(n: int) -> None:
+            nonlocal checked_tiles
+            checked_tiles += n
+
+        # Narrows candidates only; progress is counted by the traversal that renders
+        quiet_prune = make_candidate_pruner(
+            bbox_mercator,
+            zoom_ranges,
+            occluded=occluded,
+            index=index,
+            footprints=stored_footprints,
+            coverage=coverage,
+        )
 
-            # Filter candidates precisely using Mercator bounds
-            overlapping = [
-                record for record in candidate_records
-                if intersects(record.bounds_mercator, (xy_bounds.left, xy_bounds.bottom, xy_bounds.right, xy_bounds.top))
-            ]
-            if not overlapping:
-                continue
+    if workers > 1:
+        if isinstance(records, SourceCatalog):
+            # Catalog views already carry their row number
 
-            # Sort by source priority first (lower = higher priority), then finer pixel size
-            overlapping.sort(key=lambda r: (r.priority, r.pixel_size))
-            tile_arrays: List[np.ndarray] = []
-            for rec in overlapping:
-                try:
-                    data = read_tile_from_source(rec, xy_bounds, out_shape=(512, 512), warp_threads=warp_threads)
-                except Exception as exc:  # pragma: no cover - defensive logging
-                    print(f"Warning: {exc}")
-                    continue
-                if data is not None:
-                    tile_arrays.append(data)
+            def indices_of(candidates: Sequence[SourceRef]) -> Tuple[int, ...]:
+                return tuple(r.index for r in candidates)
 
-            merged = merge_tile_candidates(tile_arrays)
-            if merged is None or np.isnan(merged).all():
-                continue
-
-            try:
-                rgb = encode_terrarium(merged, z)
-                webp = imagecodecs.webp_encode(rgb, lossless=True)
-            except Exception as exc:  # pragma: no cover - defensive logging
-                print(f"Warning: Failed to encode tile {z}/{tile.x}/{tile.y}: {exc}")
-                continue
+        else:
+            record_index = {rec: i for i, rec in enumerate(records)}
+
+            def indices_of(candidates: Sequence[SourceRecord]) -> Tuple[int, ...]:
+                return tuple(record_index[r] for r in candidates)
+
+        settings = {
+            "warp_threads": warp_threads,
+            "read_mode": read_mode,
+            "warp_engine": warp_engine,
+            "codec_backend": imagecodecs.get_backend().name,
+            "max_open_files": pool.max_open,
+            "source_cache_mb": cache.max_bytes // (1024 * 1024),
+            "bbox_mercator": bbox_mercator,
+            "zoom_ranges": zoom_ranges,
+            # Records are rebuilt in each worker, so culled records travel as indices
+            "occluded": {key: indices_of(hidden) for key, hidden in occluded.items()},
+            "footprints": dict(zip(indices_of(list(stored_footprints)), stored_footprints.values())),
+            "coverage": coverage,
+        }
+
+    encoder = imagecodecs.WebPEncoder(encode_threads)
+    try:
+        if pyramid and max_zoom > min_zoom and workers > 1:
+            # Workers build whole subtrees below chunk tiles at `chunk_zoom` and
+            # return their encoded tiles plus the float32 chunk root; this
+            # process reduces the chunk roots up to min_zoom depth-first.
+            roots = [(min_zoom, x, y) for x, y in zip(*(a.tolist() for a in coverage.tiles(min_zoom)))]
+            chunk_zoom = max_zoom - 1
+            for depth in range(min(chunk_depth, max_zoom - min_zoom), 0, -1):
+                # Prefer the largest chunks that still give every worker several
+                chunk_zoom = max_zoom - depth
+                n_chunks = sum(
+                    1 for root in roots for _ in iter_morton_tiles(chunk_zoom, root, quiet_prune, all_records)
+                )
+                if n_chunks >= 8 * workers:
+                    break
+            announce_zoom(
+                min_zoom,
+                f"Depth-first pyramid over {len(roots)} root tiles; {workers} workers build subtrees from z{chunk_zoom}",
+            )
 
-            emitted_tiles += 1
-            if progress_interval and (
-                emitted_tiles % progress_interval == 0 or checked_tiles == total_candidates
-            ):
-                percent = (checked_tiles / total_candidates * 100.0) if total_candidates else 0.0
-                # ETA based on checked_tiles processing rate
-                now = time.time()
-                elapsed = max(1e-6, now - start_time)
-                rate = checked_tiles / elapsed if elapsed > 0 else 0
-                eta_str = "?"
-                if rate > 0 and total_candidates and checked_tiles < total_candidates:
-                    remaining = total_candidates - checked_tiles
-                    eta_seconds = int(remaining / rate)
-                    eta_time = time.localtime(now + eta_seconds)
-                    eta_str = time.strftime('%Y-%m-%d %H:%M:%S', eta_time) + f" (in {eta_seconds}s)"
-
-                print(
-                    f"Progress: {emitted_tiles} tiles written; processed {checked_tiles}/"
-                    f"{total_candidates} candidates ({percent:.1f}%) ETA: {eta_str}"
+            def pyramid_chunk_tasks():
+                for root in roots:
+                    for cz, cx, cy, candidates in iter_morton_tiles(chunk_zoom, root, quiet_prune, all_records):
+                        yield max_zoom, cz, cx, cy, indices_of(candidates)
+
+            chunk_tiles: List[Tuple[int, int, int, bytes]] = []
+            with TileWorkerPool(records, workers, settings=settings, max_in_flight=2 * workers) as worker_pool:
+                chunk_results = worker_pool.imap(pyramid_chunk_tasks(), fn=render_pyramid_chunk_task)
+
+                def render_chunk_root(z: int, x: int, y: int, candidates) -> Optional[np.ndarray]:
+                    rz, rx, ry, tiles, root_tile, checked = next(chunk_results)
+                    if (rz, rx, ry) != (z, x, y):
+                        raise RuntimeError(f"pyramid chunk {rz}/{rx}/{ry} arrived for {z}/{x}/{y}")
+                    add_checked(checked)
+                    chunk_tiles.extend(tiles)
+                    return root_tile
+
+                builder = DepthFirstPyramid(
+                    chunk_zoom,
+                    render_chunk_root,
+                    prune=make_candidate_pruner(
+                        bbox_mercator, zoom_ranges, add_checked, min_zoom, occluded, index, stored_footprints, coverage
+                    ),
+                    min_zoom=min_zoom,
+                )
+                for z, x, y, merged in builder.build(roots, state=all_records):
+                    if z == chunk_zoom:
+                        # Already encoded by the worker together with its subtree
+                        for tile in chunk_tiles:
+                            emitted_tiles += 1
+                            report_progress(tile[0])
+                            yield tile
+                        chunk_tiles.clear()
+                        continue
+                    webp = encode_tile(z, x, y, merged)
+                    if webp is None:
+                        continue
+                    emitted_tiles += 1
+                    report_progress(z)
+                    yield z, x, y, webp
+            print(f"[pyramid] peak buffered tiles above z{chunk_zoom}: {builder.peak_buffered}")
+        elif pyramid and max_zoom > min_zoom:
+            # Depth-first pyramid: only max_zoom is rendered from sources and
+            # each parent is reduced from its children as soon as they are done,
+            # so at most ~4 tiles per zoom level are held at any time.
+            def render_leaf(z: int, x: int, y: int, candidates: Sequence[SourceRecord]) -> Optional[np.ndarray]:
+                return render_tile_from_sources(
+                    candidates,
+                    mercantile.xy_bounds(x, y, z),
+                    out_shape=(512, 512),
+                    warp_threads=warp_threads,
+                    read_mode=read_mode,
+                    pool=pool,
+                    cache=cache,
+                    zoom=z,
+                    warp_engine=warp_engine,
                 )
 
-            yield z, tile.x, tile.y, webp
+            builder = DepthFirstPyramid(
+                max_zoom,
+                render_leaf,
+                prune=make_candidate_pruner(
+                    bbox_mercator, zoom_ranges, add_checked, min_zoom, occluded, index, stored_footprints, coverage
+                ),
+                min_zoom=min_zoom,
+            )
+            roots = [(min_zoom, x, y) for x, y in zip(*(a.tolist() for a in coverage.tiles(min_zoom)))]
+            announce_zoom(min_zoom, f"Depth-first pyramid over {len(roots)} root tiles (leaves at z{max_zoom})")
+            pyramid_tiles = builder.build(iter(roots), state=all_records)
+            if pipeline:
+                # The walk (leaf reads + reductions) runs on the feeder thread;
+                # yielded arrays are never modified, so encoders can share them.
+                staged = StagedPipeline([Stage("encode", encode_stage, encoder.threads)])
+                encoded = staged.run(pyramid_tiles)
+            else:
+                encoded = filter(None, encoder.map(encode_stage, pyramid_tiles))
+            for z, x, y, webp in encoded:
+                emitted_tiles += 1
+                report_progress(z)
+                yield z, x, y, webp
+                if io_sleep_ms > 0 and z == max_zoom:
+                    time.sleep(io_sleep_ms / 1000.0)
+
+            if cache.enabled:
+                print(f"[z{max_zoom}] Source block {cache.format_stats(max_zoom)}")
+            print(f"[z{max_zoom}] Source {read_stats.format_stats(max_zoom)}")
+            print(
+                f"[pyramid] visited {builder.visited} tiles; peak buffered child tiles: "
+                f"{builder.peak_buffered} (~{builder.peak_buffered} MiB)"
+            )
+            if staged is not None:
+                print(f"[pipeline] {staged.format_stats()}")
+        elif workers > 1:
+            # Hand out spatially compact chunks: all tiles at zoom z under one
+            # tile `chunk_depth` levels up, with its candidate sources attached.
+            with TileWorkerPool(records, workers, settings=settings, max_in_flight=2 * workers) as worker_pool:
+                for z in range(min_zoom, max_zoom + 1):
+                    chunk_zoom = max(0, z - chunk_depth)
+                    zoom_prune = make_candidate_pruner(
+                        bbox_mercator,
+                        {z: zoom_ranges[z]},
+                        add_checked,
+                        z + 1,
+                        occluded,
+                        index,
+                        stored_footprints,
+                        coverage,
+                    )
+                    chunks = list(iter_morton_tiles(chunk_zoom, (0, 0, 0), zoom_prune, all_records))
+                    # Split the last chunks of the zoom into quadrants so the tail
+                    # keeps every worker busy; Morton order is unchanged by this.
+                    tail_size = min(len(chunks), 2 * workers)
+                    head, tail = chunks[: len(chunks) - tail_size], chunks[len(chunks) - tail_size :]
+                    while tail and len(tail) < 4 * workers and tail[0][0] < z:
+                        tail = [
+                            sub
+                            for cz, cx, cy, candidates in tail
+                            for sub in iter_morton_tiles(cz + 1, (cz, cx, cy), zoom_prune, candidates)
+                        ]
+                    announce_zoom(z, f"Starting tile scan: {len(head) + len(tail)} chunks from z{chunk_zoom} for {workers} workers")
+                    tasks = ((z, cz, cx, cy, indices_of(candidates)) for cz, cx, cy, candidates in head + tail)
+                    for _, _, _, _, tiles, checked in worker_pool.imap(tasks, fn=render_chunk_task):
+                        add_checked(checked)
+                        for tile in tiles:
+                            emitted_tiles += 1
+                            report_progress(z)
+                            yield tile
+
+                            if io_sleep_ms > 0:
+                                time.sleep(io_sleep_ms / 1000.0)
+        elif pipeline:
+            # read -> encode thread stages in front of the writer (our consumer)
+            reader_pool = ThreadLocalPool(pool.max_open)
+
+            def scan_tasks():
+                nonlocal checked_tiles
+                for z in range(min_zoom, max_zoom + 1):
+                    announce_zoom(z, "Starting tile scan")
+                    if metatile > 1:
+                        for size, tiles, candidates in metatile_tasks(z):
+                            yield (z, size, tiles), candidates
+                        continue
+                    for x, y, b in coverage.iter_tiles(z):
+                        checked_tiles += 1
+                        candidates = tile_candidates(z, x, y, b)
+                        if candidates:
+                            yield (z, x, y, b), candidates
+
+            def read_stage(
+                task: Tuple[Tuple[int, int, int, mercantile.Bbox], List[SourceRecord]]
+            ) -> Optional[Tuple[int, int, int, np.ndarray]]:
+                (z, x, y, b), candidates = task
+                merged = render_tile_from_sources(
+                    candidates,
+                    b,
+                    out_shape=(512, 512),
+                    warp_threads=warp_threads,
+                    read_mode=read_mode,
+                    pool=reader_pool,
+                    cache=cache,
+                    zoom=z,
+                    warp_engine=warp_engine,
+                )
+                return None if merged is None else (z, x, y, merged)
+
+            def read_metatile_stage(
+                task: Tuple[Tuple[int, int, List[Tuple[int, int]]], List[SourceRecord]]
+            ) -> Optional[List[Tuple[int, int, int, np.ndarray]]]:
+                (z, size, tiles), candidates = task
+                rendered = render_metatile_from_sources(
+                    candidates,
+                    z,
+                    tiles,
+                    size,
+                    warp_threads=warp_threads,
+                    read_mode=read_mode,
+                    pool=reader_pool,
+                    cache=cache,
+                    warp_engine=warp_engine,
+                )
+                return [(z, x, y, merged) for x, y, merged in rendered] or None
+
+            def encode_metatile_stage(
+                items: List[Tuple[int, int, int, np.ndarray]]
+            ) -> List[Tuple[int, int, int, bytes]]:
+                return [tile for tile in map(encode_stage, items) if tile is not None]
+
+            if metatile > 1:
+                # Stages pass whole metatiles; the consumer flattens them
+                staged = StagedPipeline(
+                    [
+                        Stage("read", read_metatile_stage, read_threads),
+                        Stage("encode", encode_metatile_stage, encoder.threads),
+                    ]
+                )
+            else:
+                staged = StagedPipeline(
+                    [Stage("read", read_stage, read_threads), Stage("encode", encode_stage, encoder.threads)]
+                )
+            try:
+                results = staged.run(scan_tasks())
+                if metatile > 1:
+                    results = (tile for block in results for tile in block)
+                for z, x, y, webp in results:
+                    emitted_tiles += 1
+                    report_progress(z)
+                    yield z, x, y, webp
+
+                    if io_sleep_ms > 0:
+                        time.sleep(io_sleep_ms / 1000.0)
+            finally:
+                reader_pool.close()
+
+            for z in range(min_zoom, max_zoom + 1):
+                if cache.enabled:
+                    print(f"[z{z}] Source block {cache.format_stats(z)}")
+                print(f"[z{z}] Source {read_stats.format_stats(z)}")
+            print(f"[pipeline] {staged.format_stats()}")
+        else:
+            def rendered_tiles():
+                nonlocal checked_tiles
+                for z in range(min_zoom, max_zoom + 1):
+                    announce_zoom(z, "Starting tile scan")
+                    if metatile > 1:
+                        for size, tiles, candidates in metatile_tasks(z):
+                            for x, y, merged in render_metatile_from_sources(
+                                candidates,
+                                z,
+                                tiles,
+                                size,
+                                warp_threads=warp_threads,
+                                read_mode=read_mode,
+                                pool=pool,
+                                cache=cache,
+                                warp_engine=warp_engine,
+                            ):
+                                yield z, x, y, merged
+                    else:
+                        for x, y, b in coverage.iter_tiles(z):
+                            checked_tiles += 1
+                            merged = render_tile_from_sources(
+                                tile_candidates(z, x, y, b),
+                                b,
+                                out_shape=(512, 512),
+                                warp_threads=warp_threads,
+                                read_mode=read_mode,
+                                pool=pool,
+                                cache=cache,
+                                zoom=z,
+                                warp_engine=warp_engine,
+                            )
+                            if merged is not None:
+                                yield z, x, y, merged
+
+                    if cache.enabled:
+                        print(f"[z{z}] Source block {cache.format_stats(z)}")
+                    print(f"[z{z}] Source {read_stats.format_stats(z)}")
+
+            # Tiles are read on this thread while earlier ones encode on the pool
+            for z, x, y, webp in filter(None, encoder.map(encode_stage, rendered_tiles())):
+                emitted_tiles += 1
+                report_progress(z)
+                yield z, x, y, webp
 
-            if io_sleep_ms > 0:
-                time.sleep(io_sleep_ms / 1000.0)
+                if io_sleep_ms > 0:
+                    time.sleep(io_sleep_ms / 1000.0)
+    finally:
+        # Also on errors and when the consumer stops iterating early
+        encoder.close()
 
     print(
         f"Finished tile generation: {emitted_tiles} tiles produced from {checked_tiles} candidates"
     )
+    if workers <= 1:
+        print(f"Dataset {reader_pool.format_stats()}")
+        print(f"Source block {cache.format_stats()}")
+        print(f"Source {read_stats.format_stats()}")
 
 
 def main() -> None:
@@ -624,6 +1652,8 @@ def main() -> None:
     bbox = tuple(args.bbox) if args.bbox else None
 
     pmtiles_path = Path(args.output)
+    if args.codec_backend:
+        imagecodecs.set_backend(args.codec_backend)
 
     run_aggregate(
         records=records,
@@ -635,30 +1665,46 @@ def main() -> None:
         verbose=args.verbose,
         io_sleep_ms=args.io_sleep_ms,
         warp_threads=args.warp_threads,
+        read_mode=args.read_mode,
+        warp_engine=args.warp_engine,
+        max_open_files=args.max_open_files,
+        source_cache_mb=args.source_cache_mb,
+        pyramid=args.pyramid,
+        workers=args.workers,
+        chunk_depth=args.chunk_depth,
+        pipeline=args.pipeline,
+        read_threads=args.read_threads,
+        encode_threads=args.encode_threads,
+        cull_occluded=args.cull_occluded,
+        footprint_filter=args.footprint_filter,
+        metatile=args.metatile,
         overwrite=args.overwrite,
         emit_lineage=args.emit_lineage,
         lineage_suffix=args.lineage_suffix,
     )
 
 
-def build_records_from_sources(sources: Sequence[str]) -> List[SourceRecord]:
-    """Load and return a flattened list of SourceRecord objects for the
-    provided ordered `sources` sequence. The order of `sources` defines
-    priority: earlier entries have higher priority (lower `priority` value).
+def build_records_from_sources(sources: Sequence[str]) -> SourceCatalog:
+    """Load one catalog of source records for the provided ordered
+    `sources` sequence. The order of `sources` defines priority: earlier
+    entries have higher priority (lower `priority` value).
     """
-    records: List[SourceRecord] = []
+    catalogs: List[SourceCatalog] = []
     for prio, src_name in enumerate(sources):
         recs = load_bounds(src_name, priority=prio)
-        records.extend(recs)
+        catalogs.append(recs)
         print(f"Loaded metadata for {len(recs)} GeoTIFF files from '{src_name}' (priority {prio})")
-    return records
+    return SourceCatalog.concat(catalogs)
 
 
 def compute_max_zoom_for_records(records: Sequence[SourceRecord], user_max_zoom: Optional[int] = None) -> int:
     """Compute a sensible max zoom for the given records, honoring a
     user-specified `user_max_zoom` if provided.
     """
-    finest_pixel_size = min(r.pixel_size for r in records)
+    if isinstance(records, SourceCatalog):
+        finest_pixel_size = float(records.pixel_size.min())
+    else:
+        finest_pixel_size = min(r.pixel_size for r in records)
     auto_max_zoom = recommended_max_zoom(finest_pixel_size)
     return user_max_zoom if user_max_zoom is not None else auto_max_zoom
 
@@ -676,11 +1722,42 @@ def run_aggregate(
     overwrite: bool = False,
     emit_lineage: bool = False,
     lineage_suffix: str = "-lineage",
+    read_mode: str = "auto",
+    max_open_files: Optional[int] = None,
+    source_cache_mb: Optional[int] = None,
+    pyramid: bool = False,
+    workers: int = 1,
+    chunk_depth: int = DEFAULT_CHUNK_DEPTH,
+    pipeline: bool = False,
+    read_threads: int = 2,
+    encode_threads: Optional[int] = None,
+    cull_occluded: bool = False,
+    footprint_filter: bool = True,
+    warp_engine: Optional[str] = None,
+    metatile: int = 1,
 ) -> Path:
     """Run the aggregation for prepared `records` and write tiles into an
     MBTiles file alongside the intended `output_pmtiles` path. Returns the
     path to the created MBTiles file.
+
+    `max_open_files` resizes the shared dataset pool used by both the tile
+    generator and lineage emission (defaults to FUSI_MAX_OPEN_FILES);
+    `source_cache_mb` likewise sizes the decoded source block cache
+    (defaults to FUSI_SOURCE_CACHE_MB, 0 disables it). `pyramid` builds
+    zooms below `max_zoom` from child tiles instead of the sources, and
+    `workers` > 1 renders tiles in a process pool in chunks `chunk_depth`
+    zooms deep. `encode_threads` sizes the WebP encoder pool (also used for
+    lineage) and `pipeline` adds a pool of `read_threads` reader threads.
+    `cull_occluded` skips sources hidden under higher-priority data and
+    `footprint_filter` skips them outside their stored valid-data footprints.
+    `warp_engine` ("gdal" or "numpy", defaults to FUSI_WARP_ENGINE) selects
+    the resampler of source reads, for lineage too. `metatile` renders
+    blocks of tiles with one read per source (in-process direct mode).
     """
+    if warp_engine is None:
+        warp_engine = default_warp_engine()
+    pool = configure_shared_pool(max_open_files)
+    cache = configure_shared_cache(source_cache_mb)
     pmtiles_path = Path(output_pmtiles)
     mbtiles_path = pmtiles_path.with_suffix(".mbtiles")
     mbtiles_path.parent.mkdir(parents=True, exist_ok=True)
@@ -699,6 +1776,19 @@ def run_aggregate(
         verbose=verbose,
         io_sleep_ms=io_sleep_ms,
         warp_threads=warp_threads,
+        read_mode=read_mode,
+        pool=pool,
+        cache=cache,
+        pyramid=pyramid,
+        workers=workers,
+        chunk_depth=chunk_depth,
+        pipeline=pipeline,
+        read_threads=read_threads,
+        encode_threads=encode_threads,
+        cull_occluded=cull_occluded,
+        footprint_filter=footprint_filter,
+        warp_engine=warp_engine,
+        metatile=metatile,
     )
 
     print(f"Writing Terrarium WebP tiles into MBTiles: {mbtiles_path}")
@@ -739,6 +1829,11 @@ def run_aggregate(
                 lineage_suffix=lineage_suffix,
                 pmtiles_exe=shutil.which("pmtiles") or shutil.which("pmtiles-cli"),
                 verbose=verbose,
+                read_mode=read_mode,
+                pool=pool,
+                cache=cache,
+                encode_threads=encode_threads,
+                warp_engine=warp_engine,
             )
         except Exception as exc:  # pragma: no cover - non-fatal optional step
             print(f"Warning: failed to emit lineage MBTiles: {exc}")
@@ -758,12 +1853,17 @@ def emit_lineage_from_mbtiles(
     lineage_suffix: str = "-lineage",
     pmtiles_exe: Optional[str] = None,
     verbose: bool = True,
+    read_mode: str = "auto",
+    pool: Optional[DatasetPool] = None,
+    cache: Optional[SourceBlockCache] = None,
+    encode_threads: Optional[int] = None,
+    warp_engine: str = "gdal",
 ) -> None:
     """Generate lineage MBTiles (and optional PMTiles) from an existing MBTiles file.
 
     This extracts the lineage-generation logic from `run_aggregate` so other
     drivers (e.g., split_aggregate) can invoke it after merging intermediate
-    MBTiles.
+    MBTiles. Lineage tiles are WebP-encoded on `encode_threads` threads.
     """
     try:
         from .lineage import provenance_to_rgb
@@ -776,7 +1876,9 @@ def emit_lineage_from_mbtiles(
 
     lineage_path = mbtiles_path.with_name(mbtiles_path.stem + f"{lineage_suffix}.mbtiles")
 
-    def lineage_generator():
+    index = SpatialIndex.from_records(records)
+
+    def provenance_tiles():
         conn = sqlite3.connect(str(mbtiles_path))
         try:
             cur = conn.execute("SELECT zoom_level, tile_column, tile_row FROM tiles")
@@ -784,30 +1886,46 @@ def emit_lineage_from_mbtiles(
                 y = (1 << z) - 1 - tms_y
                 tile = mercantile.Tile(x=x, y=y, z=z)
                 bounds = mercantile.xy_bounds(tile)
-                overlapping = [r for r in records if intersects(r.bounds_mercator, (bounds.left, bounds.bottom, bounds.right, bounds.top))]
+                overlapping = index.candidates((bounds.left, bounds.bottom, bounds.right, bounds.top))
                 if not overlapping:
                     continue
 
-                merged, provenance = compute_tile_provenance(overlapping, bounds, out_shape=(512, 512), warp_threads=warp_threads)
+                merged, provenance = compute_tile_provenance(
+                    overlapping,
+                    bounds,
+                    out_shape=(512, 512),
+                    warp_threads=warp_threads,
+                    read_mode=read_mode,
+                    pool=pool,
+                    cache=cache,
+                    zoom=z,
+                    warp_engine=warp_engine,
+                )
                 if provenance is None:
                     continue
 
-                rgb = provenance_to_rgb(provenance)
-                try:
-                    webp = imagecodecs.webp_encode(rgb, lossless=True)
-                except Exception:
-                    # Fallback: encode PNG via Pillow
-                    from PIL import Image
-
-                    img = Image.fromarray(rgb)
-                    bio = BytesIO()
-                    img.save(bio, format="PNG")
-                    webp = bio.getvalue()
-
-                yield z, x, y, webp
+                yield z, x, y, provenance_to_rgb(provenance)
         finally:
             conn.close()
 
+    def encode_lineage(item):
+        z, x, y, rgb = item
+        try:
+            webp = imagecodecs.webp_encode(rgb, lossless=True)
+        except Exception:
+            # Fallback: encode PNG via Pillow
+            from PIL import Image
+
+            img = Image.fromarray(rgb)
+            bio = BytesIO()
+            img.save(bio, format="PNG")
+            webp = bio.getvalue()
+        return z, x, y, webp
+
+    def lineage_generator():
+        with imagecodecs.WebPEncoder(encode_threads) as encoder:
+            yield from encoder.map(encode_lineage, provenance_tiles())
+
     from .mbtiles_writer import create_mbtiles_from_tiles as _create_mbtiles_for_lineage
 
     if verbose:
@@ -0,0 +1,132 @@
+"""Benchmark the packed R-tree (`pipelines.spatial_index`) against the linear
+z5-bucket scan it replaced, on a synthetic grid of map sheets.
+
+Usage:
+  python scripts/bench_spatial_index.py --sheets 20000 --sheet-m 1000 --zoom 16 --queries 5000
+
+Sheets are laid out edge to edge in Web Mercator (plus a coarser second
+source underneath, as with mixed-resolution DEMs). Queries are random tiles
+at `--zoom` inside the covered area. Results are printed as JSON.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import random
+import time
+from collections import defaultdict
+from typing import List, NamedTuple, Optional, Tuple
+
+import mercantile
+
+from .spatial_index import SpatialIndex
+
+ORIGIN_X, ORIGIN_Y = 15_500_000.0, 4_200_000.0
+
+
+class Sheet(NamedTuple):
+    left: float
+    bottom: float
+    right: float
+    top: float
+    pixel_size: float
+    priority: int
+
+    @property
+    def bounds_mercator(self) -> Tuple[float, float, float, float]:
+        return self.left, self.bottom, self.right, self.top
+
+
+def make_sheets(count: int, sheet_m: float) -> List[Sheet]:
+    side = max(1, int(math.sqrt(count)))
+    sheets = []
+    for i in range(count):
+        x = ORIGIN_X + (i % side) * sheet_m
+        y = ORIGIN_Y + (i // side) * sheet_m
+        sheets.append(Sheet(x, y, x + sheet_m, y + sheet_m, 1.0, 0))
+    # A coarse source under everything, 8x larger sheets
+    coarse = 8 * sheet_m
+    for gx in range(0, side, 8):
+        for gy in range(0, -(-count // side), 8):
+            x, y = ORIGIN_X + gx * sheet_m, ORIGIN_Y + gy * sheet_m
+            sheets.append(Sheet(x, y, x + coarse, y + coarse, 10.0, 1))
+    return sheets
+
+
+def intersects(a, b) -> bool:
+    return not (a[2] <= b[0] or a[0] >= b[2] or a[3] <= b[1] or a[1] >= b[3])
+
+
+def build_buckets(sheets: List[Sheet]):
+    buckets = defaultdict(list)
+    for s in sheets:
+        w, south = mercantile.lnglat(s.left, s.bottom)
+        e, n = mercantile.lnglat(s.right, s.top)
+        for t in mercantile.tiles(w, south, e, n, 5):
+            buckets[(5, t.x, t.y)].append(s)
+    return buckets
+
+
+def bucket_query(buckets, tile) -> List[Sheet]:
+    shift = tile.z - 5
+    b = mercantile.xy_bounds(tile)
+    box = (b.left, b.bottom, b.right, b.top)
+    hits = [s for s in buckets.get((5, tile.x >> shift, tile.y >> shift), []) if intersects(s.bounds_mercator, box)]
+    hits.sort(key=lambda s: (s.priority, s.pixel_size))
+    return hits
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the spatial index against z5 buckets")
+    parser.add_argument("--sheets", type=int, default=20000, help="Number of fine sheets")
+    parser.add_argument("--sheet-m", type=float, default=1000.0, help="Sheet edge length in metres")
+    parser.add_argument("--zoom", type=int, default=16, help="Zoom of the query tiles")
+    parser.add_argument("--queries", type=int, default=5000, help="Number of random tile queries")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    sheets = make_sheets(args.sheets, args.sheet_m)
+    t0 = time.perf_counter()
+    buckets = build_buckets(sheets)
+    bucket_build_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    index = SpatialIndex.from_records(sheets)
+    index_build_s = time.perf_counter() - t0
+
+    left = min(s.left for s in sheets)
+    bottom = min(s.bottom for s in sheets)
+    right = max(s.right for s in sheets)
+    top = max(s.top for s in sheets)
+    rng = random.Random(args.seed)
+    tiles = []
+    for _ in range(args.queries):
+        lng, lat = mercantile.lnglat(rng.uniform(left, right), rng.uniform(bottom, top))
+        tiles.append(mercantile.tile(lng, lat, args.zoom))
+
+    t0 = time.perf_counter()
+    expected = [bucket_query(buckets, t) for t in tiles]
+    bucket_query_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    got = []
+    for t in tiles:
+        b = mercantile.xy_bounds(t)
+        got.append(index.candidates((b.left, b.bottom, b.right, b.top)))
+    index_query_s = time.perf_counter() - t0
+
+    result = {
+        "records": len(sheets),
+        "largest_bucket": max(len(v) for v in buckets.values()),
+        "index_depth": index.depth,
+        "bucket_build_s": round(bucket_build_s, 4),
+        "index_build_s": round(index_build_s, 4),
+        "bucket_query_us": round(bucket_query_s / len(tiles) * 1e6, 2),
+        "index_query_us": round(index_query_s / len(tiles) * 1e6, 2),
+        "identical": got == expected,
+    }
+    print(json.dumps(result, indent=2))
+    return 0 if result["identical"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
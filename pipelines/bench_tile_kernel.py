@@ -0,0 +1,104 @@
+"""Benchmark `pipelines.tile_kernel.TileKernel` against the allocating merge/encode.
+
+Usage:
+  python scripts/bench_tile_kernel.py --tiles 200 --sources 3 --zoom 15
+
+Synthetic float32 reads (smooth relief with NaN holes; each later source
+fills part of the earlier ones' gaps) are merged and Terrarium-encoded per
+tile, once with `merge_tile_candidates` + `encode_terrarium` and once with
+a `TileKernel`. A timed pass gives tiles/s; a second pass under tracemalloc
+gives the peak transient allocation per tile and, multiplied by tiles/s,
+the allocation rate. Results and whether both paths produce the same RGB
+are printed as JSON.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+import tracemalloc
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from .aggregate_pmtiles import merge_tile_candidates
+from .convert_terrarium import encode_terrarium
+from .tile_kernel import TileKernel
+
+
+def make_reads(sources: int, seed: int = 0) -> List[np.ndarray]:
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:512, 0:512].astype(np.float32)
+    reads = []
+    for i in range(sources):
+        data = (300.0 + 80.0 * np.sin(xx / (29.0 + i)) + 50.0 * np.cos(yy / 37.0)).astype(np.float32)
+        data += rng.normal(0.0, 0.5, data.shape).astype(np.float32)
+        if i < sources - 1:
+            # Holes shrink with priority so every source contributes something
+            data[rng.random(data.shape) < 0.4 / (i + 1)] = np.nan
+        reads.append(data)
+    return reads
+
+
+def baseline(reads: List[np.ndarray], z: int) -> Optional[np.ndarray]:
+    merged = merge_tile_candidates(iter(reads))
+    return None if merged is None else encode_terrarium(merged, z)
+
+
+def with_kernel(kernel: TileKernel) -> "TileFn":
+    def run(reads: List[np.ndarray], z: int) -> Optional[np.ndarray]:
+        merged = kernel.merge(iter(reads))
+        return None if merged is None else kernel.encode(merged, z)
+
+    return run
+
+
+TileFn = Callable[[List[np.ndarray], int], Optional[np.ndarray]]
+
+
+def measure(fn: TileFn, reads: List[np.ndarray], z: int, tiles: int) -> dict:
+    fn(reads, z)  # warm up
+    t0 = time.perf_counter()
+    for _ in range(tiles):
+        fn(reads, z)
+    elapsed = time.perf_counter() - t0
+    tiles_per_s = tiles / max(elapsed, 1e-9)
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(min(tiles, 20)):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            fn(reads, z)
+            peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    finally:
+        tracemalloc.stop()
+    peak_kib = float(np.mean(peaks)) / 1024.0
+    return {
+        "tiles_per_s": round(tiles_per_s, 1),
+        "peak_alloc_kib_per_tile": round(peak_kib, 1),
+        "alloc_mib_per_s": round(peak_kib * tiles_per_s / 1024.0, 1),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the reusable-buffer tile kernel")
+    parser.add_argument("--tiles", type=int, default=200, help="Tiles merged and encoded per variant")
+    parser.add_argument("--sources", type=int, default=3, help="Candidate reads per tile")
+    parser.add_argument("--zoom", type=int, default=15, help="Zoom used for vertical rounding")
+    args = parser.parse_args(argv)
+
+    reads = make_reads(max(1, args.sources))
+    kernel = TileKernel()
+    result = {"tiles": args.tiles, "sources": args.sources, "zoom": args.zoom}
+    result["before"] = measure(baseline, reads, args.zoom, args.tiles)
+    result["after"] = measure(with_kernel(kernel), reads, args.zoom, args.tiles)
+    result["speedup"] = round(result["after"]["tiles_per_s"] / max(result["before"]["tiles_per_s"], 1e-9), 2)
+    result["identical"] = bool(np.array_equal(baseline(reads, args.zoom), with_kernel(kernel)(reads, args.zoom)))
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
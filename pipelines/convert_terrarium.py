@@ -70,7 +70,35 @@ def recommended_max_zoom(pixel_size_m):
     return max(0, min(MAX_SUPPORTED_ZOOM, zoom))
 
 
-def encode_terrarium(data, z):
+# Largest |elevation| (m) encoded with integer arithmetic: every intermediate
+# stays exact in float32 (and the 1/256 m steps in int32) below this
+_EXACT_LIMIT = float(1 << 22)
+
+
+def _encode_terrarium_reference(data, z, out):
+    """Terrarium encoding in the input's own float arithmetic (any dtype/value)."""
+    nodata_mask = np.isnan(data)
+
+    # Terrarium tiles expect missing data to sit at sea level (0 m).
+    # Replace NaNs before rounding so downstream viewers do not interpret
+    # nodata as extremely low elevations (e.g. -32768 m).
+    filled = np.where(nodata_mask, 0.0, data)
+
+    # Apply zoom-level specific vertical resolution rounding
+    factor = get_vertical_resolution(z)
+    rounded = np.round(filled / factor) * factor
+
+    # Offset for terrarium encoding (0 m → RGB 128/0/0)
+    data_offset = rounded + 32768.0
+
+    out[..., 0] = np.clip(data_offset // 256, 0, 255).astype(np.uint8)
+    out[..., 1] = np.clip(data_offset % 256, 0, 255).astype(np.uint8)
+    fractional = (data_offset - np.floor(data_offset)) * 256
+    out[..., 2] = np.clip(fractional, 0, 255).astype(np.uint8)
+    return out
+
+
+def encode_terrarium(data, z, out=None, scratch=None):
     """
     Encode elevation data as Terrarium RGB.
     
@@ -81,35 +109,89 @@ def encode_terrarium(data, z):
     - G = (elevation + 32768) % 256
     - B = fractional part * 256
     
+    NaN (nodata) is encoded as 0 m. float32 tiles are encoded in float32
+    and int32 without full-size temporaries beyond two scratch arrays: the
+    rounded elevation is a whole number of 1/256 m steps, so R, G and B are
+    shifts and masks of that integer. Where the vertical resolution is
+    1 m or coarser (z <= 11) the rounding itself is done on integers and B
+    is 0. Other dtypes, non-finite values and |elevation| >= 2**22 m take
+    the original float arithmetic. Output is bit-identical either way.
+    
     Args:
-        data: numpy array of elevation values in meters
+        data: numpy array of elevation values in meters, any shape
         z: zoom level (for vertical resolution rounding)
+        out: optional uint8 array of shape data.shape + (3,) to write into
+        scratch: optional (float32, int32) arrays of data.shape reused for
+            intermediates
     
     Returns:
-        RGB numpy array of shape (512, 512, 3) with uint8 dtype
+        RGB numpy array of shape data.shape + (3,) with uint8 dtype
     """
-    nodata_mask = np.isnan(data)
+    data = np.asarray(data)
+    if out is None:
+        out = np.empty(data.shape + (3,), dtype=np.uint8)
+    elif out.shape != data.shape + (3,) or out.dtype != np.uint8:
+        raise ValueError(f"out must be uint8 with shape {data.shape + (3,)}, got {out.dtype} {out.shape}")
+    if data.dtype != np.float32 or data.size == 0:
+        return _encode_terrarium_reference(data, z, out)
+
+    if scratch is None:
+        work = np.empty(data.shape, dtype=np.float32)
+        steps = np.empty(data.shape, dtype=np.int32)
+    else:
+        work, steps = scratch
+    np.copyto(work, data)
+    np.copyto(work, 0.0, where=np.isnan(work))
+    if not (-_EXACT_LIMIT < work.min() and work.max() < _EXACT_LIMIT):
+        return _encode_terrarium_reference(data, z, out)
 
-    # Terrarium tiles expect missing data to sit at sea level (0 m).
-    # Replace NaNs before rounding so downstream viewers do not interpret
-    # nodata as extremely low elevations (e.g. -32768 m).
-    filled = np.where(nodata_mask, 0.0, data)
-
-    # Apply zoom-level specific vertical resolution rounding
     factor = get_vertical_resolution(z)
-    rounded = np.round(filled / factor) * factor
-
-    # Offset for terrarium encoding (0 m → RGB 128/0/0)
-    data_offset = rounded + 32768.0
-
-    # Encode to RGB
-    rgb = np.zeros((512, 512, 3), dtype=np.uint8)
-    rgb[..., 0] = np.clip(data_offset // 256, 0, 255).astype(np.uint8)
-    rgb[..., 1] = np.clip(data_offset % 256, 0, 255).astype(np.uint8)
-    fractional = (data_offset - np.floor(data_offset)) * 256
-    rgb[..., 2] = np.clip(fractional, 0, 255).astype(np.uint8)
-
-    return rgb
+    # `work` is free once `steps` holds the offset elevation
+    channel = work.view(np.int32)
+    if factor >= 1:
+        # Whole metres: steps = round(elevation / factor) * factor + 32768
+        np.multiply(work, 1.0 / factor, out=work)
+        np.rint(work, out=work)
+        np.copyto(steps, work, casting="unsafe")
+        np.left_shift(steps, int(math.log2(factor)), out=steps)
+        np.add(steps, 32768, out=steps)
+        np.right_shift(steps, 8, out=channel)
+        np.clip(channel, 0, 255, out=channel)
+        np.copyto(out[..., 0], channel, casting="unsafe")
+        np.bitwise_and(steps, 255, out=channel)
+        np.copyto(out[..., 1], channel, casting="unsafe")
+        out[..., 2] = 0
+        return out
+
+    # Finer than 1 m: round in float32 as before, then count 1/256 m steps
+    np.divide(work, factor, out=work)
+    np.rint(work, out=work)
+    np.multiply(work, factor, out=work)
+    np.add(work, 32768.0, out=work)
+    np.multiply(work, 256.0, out=work)
+    np.copyto(steps, work, casting="unsafe")
+    np.right_shift(steps, 16, out=channel)
+    np.clip(channel, 0, 255, out=channel)
+    np.copyto(out[..., 0], channel, casting="unsafe")
+    np.right_shift(steps, 8, out=channel)
+    np.bitwise_and(channel, 255, out=channel)
+    np.copyto(out[..., 1], channel, casting="unsafe")
+    np.bitwise_and(steps, 255, out=channel)
+    np.copyto(out[..., 2], channel, casting="unsafe")
+    return out
+
+
+def encode_terrarium_batch(tiles, z, out=None):
+    """
+    Encode a stack of elevation tiles (N, H, W) at zoom `z` in one pass.
+    
+    Returns a uint8 array of shape (N, H, W, 3); `out` may be given as for
+    `encode_terrarium`.
+    """
+    tiles = np.stack(tiles) if isinstance(tiles, (list, tuple)) else np.asarray(tiles)
+    if tiles.ndim != 3:
+        raise ValueError(f"expected a (N, H, W) stack of tiles, got shape {tiles.shape}")
+    return encode_terrarium(tiles, z, out=out)
 
 
 def reproject_to_webmercator(src_path, target_crs='EPSG:3857'):
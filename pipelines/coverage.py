@@ -0,0 +1,273 @@
+"""Coverage quadtree: the tiles that have at least one source candidate.
+
+Scanning every tile of the union bbox wastes most of the work when the
+sources are scattered (Japan's sheets leave most of the bbox as ocean):
+each empty tile still costs an index query and inflates the planned tile
+count, so progress percentages and ETAs are far too pessimistic.
+
+`TileCoverage` holds, per zoom, the sorted Morton keys of the tiles whose
+Mercator bounds overlap some record's bbox (the same strict test as the
+spatial index) and, for records with a stored footprint, lie within the
+footprint's data margin (the same test as `footprint_touches`). The key of
+tile (x, y) interleaves the bits of x (even) and y (odd), so children come
+in `pyramid.CHILD_OFFSETS` order and the descendants of a tile at any
+deeper zoom form one contiguous key range: subtree counts are two binary
+searches per zoom, and subtrees without coverage are skipped outright.
+
+The coverage is a superset of the tiles with candidates after footprint
+filtering (occlusion culling can only drop records that other candidates
+cover), so rendering only covered tiles gives the same output as the full
+scan.
+
+Usage:
+    coverage = TileCoverage.from_records(records, zoom_ranges, footprints)
+    total = coverage.total()
+    for x, y, bounds in coverage.iter_tiles(z):
+        ...
+    for mx, my, xs, ys in coverage.iter_metatiles(z, 4):
+        ...
+"""
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, Hashable, Iterable, Iterator, Optional, Sequence, Tuple
+
+import mercantile
+import numpy as np
+
+try:  # Allow running as a module or script
+    from .tile_grid import CE, DEFAULT_BLOCK, TileRange, iter_tile_arrays
+except ImportError:  # pragma: no cover - fallback for direct execution
+    from tile_grid import CE, DEFAULT_BLOCK, TileRange, iter_tile_arrays
+
+# Tiles expanded per batch while rasterising record bboxes
+_BATCH_TILES = 1 << 22
+
+__all__ = ["TileCoverage", "morton_decode", "morton_encode"]
+
+
+def _spread(v: np.ndarray) -> np.ndarray:
+    v = np.asarray(v, dtype=np.uint64) & np.uint64(0xFFFFFFFF)
+    v = (v | (v << np.uint64(16))) & np.uint64(0x0000FFFF0000FFFF)
+    v = (v | (v << np.uint64(8))) & np.uint64(0x00FF00FF00FF00FF)
+    v = (v | (v << np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    v = (v | (v << np.uint64(2))) & np.uint64(0x3333333333333333)
+    v = (v | (v << np.uint64(1))) & np.uint64(0x5555555555555555)
+    return v
+
+
+def _compact(v: np.ndarray) -> np.ndarray:
+    v = v & np.uint64(0x5555555555555555)
+    v = (v | (v >> np.uint64(1))) & np.uint64(0x3333333333333333)
+    v = (v | (v >> np.uint64(2))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    v = (v | (v >> np.uint64(4))) & np.uint64(0x00FF00FF00FF00FF)
+    v = (v | (v >> np.uint64(8))) & np.uint64(0x0000FFFF0000FFFF)
+    v = (v | (v >> np.uint64(16))) & np.uint64(0x00000000FFFFFFFF)
+    return v
+
+
+def morton_encode(xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+    """Morton keys (int64) of tiles `(xs[i], ys[i])`; x takes the even bits."""
+    return (_spread(xs) | (_spread(ys) << np.uint64(1))).astype(np.int64)
+
+
+def morton_decode(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Inverse of `morton_encode`."""
+    k = np.asarray(keys, dtype=np.int64).astype(np.uint64)
+    return _compact(k).astype(np.int64), _compact(k >> np.uint64(1)).astype(np.int64)
+
+
+def _spans(bounds: np.ndarray, z: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Inclusive tile spans `(x0, y0, x1, y1)` at `z` overlapping each Mercator box.
+
+    Tile edges are computed as in `mercantile.xy_bounds` and compared with
+    the spatial index's strict test, so edge-touching tiles are excluded.
+    Empty spans have x0 > x1 or y0 > y1.
+    """
+    size = CE / math.pow(2, z)
+    half = CE / 2
+    left, bottom, right, top = (bounds[:, i] for i in range(4))
+    # Estimates are within one tile; step to the exact boundary tile
+    x0 = np.floor((left + half) / size).astype(np.int64) - 1
+    x1 = np.ceil((right + half) / size).astype(np.int64)
+    y0 = np.floor((half - top) / size).astype(np.int64) - 1
+    y1 = np.ceil((half - bottom) / size).astype(np.int64)
+    for _ in range(3):
+        x0 += (x0 * size - half + size) <= left
+        x1 -= (x1 * size - half) >= right
+        y0 += (half - y0 * size - size) >= top
+        y1 -= (half - y1 * size) <= bottom
+    n = (1 << z) - 1
+    return np.maximum(x0, 0), np.maximum(y0, 0), np.minimum(x1, n), np.minimum(y1, n)
+
+
+def _rect_keys(x0: np.ndarray, y0: np.ndarray, x1: np.ndarray, y1: np.ndarray) -> np.ndarray:
+    """Sorted unique Morton keys of every tile in the union of the spans."""
+    nx = np.maximum(x1 - x0 + 1, 0)
+    ny = np.maximum(y1 - y0 + 1, 0)
+    sizes = nx * ny
+    keep = sizes > 0
+    x0, y0, ny, sizes = x0[keep], y0[keep], ny[keep], sizes[keep]
+    out = np.empty(0, dtype=np.int64)
+    ends = np.cumsum(sizes)
+    start = 0
+    while start < len(sizes):
+        # Batch rectangles so at most ~_BATCH_TILES keys exist before dedup
+        done = int(ends[start - 1]) if start else 0
+        stop = max(start + 1, int(np.searchsorted(ends, done + _BATCH_TILES, side="right")))
+        counts = sizes[start:stop]
+        rect = np.repeat(np.arange(start, stop), counts)
+        local = np.arange(int(counts.sum()), dtype=np.int64) - np.repeat(np.cumsum(counts) - counts, counts)
+        keys = morton_encode(x0[rect] + local // ny[rect], y0[rect] + local % ny[rect])
+        out = np.union1d(out, keys)
+        start = stop
+    return out
+
+
+def _dilated_cells(fp) -> Tuple[np.ndarray, np.ndarray]:
+    """Grid pixels within one pixel of `fp`'s data (the `footprint_touches` margin)."""
+    h, w = fp.data.shape
+    grown = np.zeros((h + 2, w + 2), dtype=bool)
+    for dy in range(3):
+        for dx in range(3):
+            grown[dy : dy + h, dx : dx + w] |= fp.data
+    rows, cols = np.nonzero(grown)
+    n = (1 << fp.zoom) - 1
+    cx, cy = cols + (fp.x0 - 1), rows + (fp.y0 - 1)
+    inside = (cx >= 0) & (cy >= 0) & (cx <= n) & (cy <= n)
+    return cx[inside], cy[inside]
+
+
+def _record_bounds(records: Sequence[Any]) -> np.ndarray:
+    if isinstance(getattr(records, "bounds", None), np.ndarray):
+        return records.bounds
+    return np.array([r.bounds_mercator for r in records], dtype=np.float64).reshape(-1, 4)
+
+
+class TileCoverage:
+    """Sorted Morton keys of the covered tiles, per zoom."""
+
+    def __init__(self, keys: Dict[int, np.ndarray]) -> None:
+        self.keys = keys
+
+    @classmethod
+    def from_records(
+        cls,
+        records: Sequence[Any],
+        zoom_ranges: Dict[int, TileRange],
+        footprints: Optional[Dict[Hashable, Any]] = None,
+    ) -> "TileCoverage":
+        """Cover the tiles of `zoom_ranges` that some record can contribute to.
+
+        `footprints` maps records to stored footprints as in
+        `aggregate_pmtiles.drop_outside_footprints`: records mapped to None
+        cover nothing, records with a partial footprint cover only the
+        tiles near their data, and the rest cover their bbox.
+        """
+        if not zoom_ranges:
+            return cls({})
+        bounds = _record_bounds(records)
+        max_zoom = max(zoom_ranges)
+        footprints = footprints or {}
+
+        # Records covering their whole bbox, and footprint cells of the others
+        plain = np.ones(len(bounds), dtype=bool)
+        rids, cxs, cys = [], [], []
+        if footprints:
+            for i, record in enumerate(records):
+                if record not in footprints:
+                    continue
+                fp = footprints[record]
+                if fp is None:
+                    plain[i] = False
+                elif fp.zoom >= max_zoom and not fp.data.all():
+                    plain[i] = False
+                    cx, cy = _dilated_cells(fp)
+                    shift = fp.zoom - max_zoom
+                    cells = np.unique(morton_encode(cx >> shift, cy >> shift))
+                    cx, cy = morton_decode(cells)
+                    rids.append(np.full(len(cells), i, dtype=np.int64))
+                    cxs.append(cx)
+                    cys.append(cy)
+
+        keys: Dict[int, np.ndarray] = {}
+        rid = np.concatenate(rids) if rids else np.empty(0, dtype=np.int64)
+        cx = np.concatenate(cxs) if cxs else np.empty(0, dtype=np.int64)
+        cy = np.concatenate(cys) if cys else np.empty(0, dtype=np.int64)
+        for z in range(max_zoom, min(zoom_ranges) - 1, -1):
+            if z < max_zoom and len(rid):
+                # Footprint cells stay per record: the bbox and the data
+                # margin must both reach the same tile
+                cells = np.unique(np.stack([rid, morton_encode(cx >> 1, cy >> 1)]), axis=1)
+                rid = cells[0]
+                cx, cy = morton_decode(cells[1])
+            if z not in zoom_ranges:
+                continue
+            # bboxes are rasterised per zoom: a parent clipped to the range
+            # can overlap a record that none of its in-range children do
+            rx0, ry0, rx1, ry1 = zoom_ranges[z]
+            x0, y0, x1, y1 = _spans(bounds, z)
+            x0, y0 = np.maximum(x0, rx0), np.maximum(y0, ry0)
+            x1, y1 = np.minimum(x1, rx1), np.minimum(y1, ry1)
+            inside = (cx >= x0[rid]) & (cx <= x1[rid]) & (cy >= y0[rid]) & (cy <= y1[rid])
+            keys[z] = np.union1d(
+                _rect_keys(x0[plain], y0[plain], x1[plain], y1[plain]),
+                morton_encode(cx[inside], cy[inside]),
+            )
+        return cls(keys)
+
+    def count(self, z: int) -> int:
+        keys = self.keys.get(z)
+        return 0 if keys is None else len(keys)
+
+    def total(self) -> int:
+        return sum(len(k) for k in self.keys.values())
+
+    def contains(self, z: int, x: int, y: int) -> bool:
+        keys = self.keys.get(z)
+        if keys is None:
+            return False
+        key = int(morton_encode(np.array([x]), np.array([y]))[0])
+        i = int(np.searchsorted(keys, key))
+        return i < len(keys) and int(keys[i]) == key
+
+    def count_in_subtree(self, z: int, x: int, y: int, zooms: Optional[Iterable[int]] = None) -> int:
+        """Count covered tiles in the subtree of z/x/y (itself included), over `zooms`."""
+        key = int(morton_encode(np.array([x]), np.array([y]))[0])
+        total = 0
+        for zz in self.keys if zooms is None else zooms:
+            keys = self.keys.get(zz)
+            if zz < z or keys is None:
+                continue
+            d = 2 * (zz - z)
+            lo, hi = np.searchsorted(keys, [key << d, (key + 1) << d])
+            total += int(hi - lo)
+        return total
+
+    def tiles(self, z: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Covered tiles at `z` in `mercantile.tiles()` order (x outer, y inner)."""
+        xs, ys = morton_decode(self.keys.get(z, np.empty(0, dtype=np.int64)))
+        order = np.lexsort((ys, xs))
+        return xs[order], ys[order]
+
+    def iter_tiles(self, z: int, block: int = DEFAULT_BLOCK) -> Iterator[Tuple[int, int, mercantile.Bbox]]:
+        """Yield `(x, y, xy_bounds)` for the covered tiles at `z`, as `tiles` orders them."""
+        xs, ys = self.tiles(z)
+        return iter_tile_arrays(z, xs, ys, block)
+
+    def iter_metatiles(self, z: int, size: int) -> Iterator[Tuple[int, int, np.ndarray, np.ndarray]]:
+        """Yield `(mx, my, xs, ys)` for each `size` x `size` block of covered tiles at `z`.
+
+        `size` is a power of two, so a block holds the covered tiles under
+        tile (mx, my) at zoom z - log2(size). Blocks come in
+        `mercantile.tiles()` order and so do the tiles within each block.
+        """
+        shift = min(size.bit_length() - 1, z)
+        xs, ys = morton_decode(self.keys.get(z, np.empty(0, dtype=np.int64)))
+        mx, my = xs >> shift, ys >> shift
+        order = np.lexsort((ys, xs, my, mx))
+        xs, ys, mx, my = xs[order], ys[order], mx[order], my[order]
+        starts = np.flatnonzero(np.r_[True, (mx[1:] != mx[:-1]) | (my[1:] != my[:-1])])
+        ends = np.r_[starts[1:], len(xs)]
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            yield int(mx[start]), int(my[start]), xs[start:end], ys[start:end]
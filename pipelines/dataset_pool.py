@@ -0,0 +1,242 @@
+"""Bounded LRU pool of open rasterio datasets.
+
+Opening a GeoTIFF costs a file open, header/IFD parse and CRS construction.
+The aggregator touches the same sources for many neighbouring tiles, so
+keeping recently used datasets open avoids that churn. The pool is keyed by
+the source path (`SourceRecord.path`) and closes the least recently used
+dataset once `max_open` handles are held.
+
+Usage:
+    pool = DatasetPool(max_open=64)
+    src = pool.get(record.path)   # do not close; the pool owns the handle
+    ...
+    print(pool.format_stats())
+    pool.close()
+"""
+from __future__ import annotations
+
+import atexit
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Optional, Union
+
+try:
+    import rasterio
+except Exception:  # pragma: no cover - optional runtime dependency
+    rasterio = None
+
+DEFAULT_MAX_OPEN_FILES = 64
+
+__all__ = [
+    "DatasetPool",
+    "ThreadLocalPool",
+    "DEFAULT_MAX_OPEN_FILES",
+    "default_max_open_files",
+    "get_shared_pool",
+    "configure_shared_pool",
+]
+
+
+def default_max_open_files() -> int:
+    """Return the pool size from env `FUSI_MAX_OPEN_FILES` (default 64)."""
+    try:
+        return max(1, int(os.environ.get("FUSI_MAX_OPEN_FILES", str(DEFAULT_MAX_OPEN_FILES))))
+    except (TypeError, ValueError):
+        return DEFAULT_MAX_OPEN_FILES
+
+
+class DatasetPool:
+    """LRU cache of open datasets with hit/miss/eviction counters."""
+
+    def __init__(self, max_open: int = DEFAULT_MAX_OPEN_FILES, opener: Optional[Callable] = None) -> None:
+        if max_open < 1:
+            raise ValueError("max_open must be >= 1")
+        self.max_open = int(max_open)
+        self._opener = opener
+        self._datasets: "OrderedDict[str, object]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._datasets)
+
+    def __contains__(self, path: Union[str, Path]) -> bool:
+        return str(path) in self._datasets
+
+    def _open(self, path: str):
+        if self._opener is not None:
+            return self._opener(path)
+        if rasterio is None:
+            raise RuntimeError("rasterio is required to open source datasets")
+        return rasterio.open(path)
+
+    def get(self, path: Union[str, Path]):
+        """Return an open dataset for `path`, opening (and evicting) as needed.
+
+        The returned handle is owned by the pool and must not be closed by
+        the caller.
+        """
+        key = str(path)
+        with self._lock:
+            ds = self._datasets.get(key)
+            if ds is not None:
+                self._datasets.move_to_end(key)
+                self.hits += 1
+                return ds
+            self.misses += 1
+
+        ds = self._open(key)
+
+        evicted = []
+        with self._lock:
+            existing = self._datasets.get(key)
+            if existing is not None:
+                # Another caller opened it concurrently; keep the first handle
+                evicted.append(ds)
+                ds = existing
+                self._datasets.move_to_end(key)
+            else:
+                self._datasets[key] = ds
+                while len(self._datasets) > self.max_open:
+                    _, old = self._datasets.popitem(last=False)
+                    evicted.append(old)
+                    self.evictions += 1
+        for old in evicted:
+            _close_quietly(old)
+        return ds
+
+    def resize(self, max_open: int) -> None:
+        """Change the open-file limit, closing surplus datasets immediately."""
+        if max_open < 1:
+            raise ValueError("max_open must be >= 1")
+        evicted = []
+        with self._lock:
+            self.max_open = int(max_open)
+            while len(self._datasets) > self.max_open:
+                _, old = self._datasets.popitem(last=False)
+                evicted.append(old)
+                self.evictions += 1
+        for old in evicted:
+            _close_quietly(old)
+
+    def close(self) -> None:
+        """Close every pooled dataset. Counters are preserved."""
+        with self._lock:
+            datasets = list(self._datasets.values())
+            self._datasets.clear()
+        for ds in datasets:
+            _close_quietly(ds)
+
+    def reset_stats(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "open": len(self._datasets),
+            "max_open": self.max_open,
+        }
+
+    def format_stats(self) -> str:
+        """Short one-line summary suitable for progress output."""
+        total = self.hits + self.misses
+        rate = (self.hits / total * 100.0) if total else 0.0
+        return (
+            f"pool hit={self.hits} miss={self.misses} evict={self.evictions} "
+            f"({rate:.1f}% hits, {len(self._datasets)}/{self.max_open} open)"
+        )
+
+
+class ThreadLocalPool:
+    """One `DatasetPool` per thread, for readers running on several threads.
+
+    A rasterio dataset handle must not be used by two threads at once, so
+    each reader thread gets its own pool of up to `max_open` handles.
+    Statistics are summed over all threads.
+    """
+
+    def __init__(self, max_open: int = DEFAULT_MAX_OPEN_FILES, opener: Optional[Callable] = None) -> None:
+        if max_open < 1:
+            raise ValueError("max_open must be >= 1")
+        self.max_open = int(max_open)
+        self._opener = opener
+        self._local = threading.local()
+        self._pools: "list[DatasetPool]" = []
+        self._lock = threading.Lock()
+
+    def _pool(self) -> DatasetPool:
+        pool = getattr(self._local, "pool", None)
+        if pool is None:
+            pool = DatasetPool(self.max_open, opener=self._opener)
+            self._local.pool = pool
+            with self._lock:
+                self._pools.append(pool)
+        return pool
+
+    def get(self, path: Union[str, Path]):
+        """Return an open dataset for `path` from the calling thread's pool."""
+        return self._pool().get(path)
+
+    def close(self) -> None:
+        """Close the datasets of every thread. Counters are preserved."""
+        with self._lock:
+            pools = list(self._pools)
+        for pool in pools:
+            pool.close()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            pools = list(self._pools)
+        totals = {"hits": 0, "misses": 0, "evictions": 0, "open": 0}
+        for pool in pools:
+            for key, value in pool.stats().items():
+                if key in totals:
+                    totals[key] += value
+        totals["max_open"] = self.max_open * max(1, len(pools))
+        return totals
+
+    def format_stats(self) -> str:
+        s = self.stats()
+        total = s["hits"] + s["misses"]
+        rate = (s["hits"] / total * 100.0) if total else 0.0
+        return (
+            f"pool hit={s['hits']} miss={s['misses']} evict={s['evictions']} "
+            f"({rate:.1f}% hits, {s['open']}/{s['max_open']} open)"
+        )
+
+
+def _close_quietly(ds) -> None:
+    try:
+        ds.close()
+    except Exception:
+        pass
+
+
+_shared_pool: Optional[DatasetPool] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_pool() -> DatasetPool:
+    """Return the process-wide pool used by default by the tile readers."""
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None:
+            _shared_pool = DatasetPool(max_open=default_max_open_files())
+            atexit.register(_shared_pool.close)
+        return _shared_pool
+
+
+def configure_shared_pool(max_open: Optional[int] = None) -> DatasetPool:
+    """Resize the shared pool (e.g. from `--max-open-files`) and return it."""
+    pool = get_shared_pool()
+    if max_open is not None:
+        pool.resize(max_open)
+    return pool
@@ -0,0 +1,151 @@
+"""Separable NumPy warp from geographic sources onto Web Mercator tiles.
+
+GSI DEMs are north-up grids in a geographic CRS (JGD2011). Between such a
+grid and EPSG:3857, x depends only on longitude and y only on latitude, so
+the source pixel under every output pixel is fixed by two 1-D lookups: the
+output column's longitude picks the source column, the output row's
+latitude the source row. GDAL's `reproject` does not know this and runs its
+general transformer for every tile.
+
+`warp_separable` computes, per tile, the longitudes of the output pixel
+columns and the latitudes of the output pixel rows (cached per tile column
+and tile row, i.e. per zoom and tile index, since they do not depend on the
+source), turns them into fractional source indices with the source's affine
+transform, and samples bilinearly with two gathers: source rows first, then
+columns. Sampling follows GDAL's bilinear source-mask footprint: neighbours
+outside the raster get zero weight and the remaining weights are
+renormalised, but a NaN neighbour inside the raster with a non-zero weight
+makes the output pixel NaN, as does a pixel centre outside the raster.
+
+The datum shift between JGD2011 and WGS84 is taken as zero, as PROJ does.
+When the tile is coarser than the source (GDAL widens the bilinear kernel
+there) or the grid is rotated, `warp_separable` returns None and the caller
+falls back to GDAL. Output agrees with GDAL within its approximate
+transformer's error (see `tests/test_fast_warp.py` and
+`scripts/bench_warp.py`).
+
+Usage:
+    if warp_engine == "numpy" and is_separable(src.crs, src_transform):
+        tile = warp_separable(src_arr, src_transform, tile_bounds, (512, 512))
+"""
+from __future__ import annotations
+
+import functools
+import math
+import os
+from typing import Any, Optional, Tuple
+
+import numpy as np
+
+# Warp engines accepted by --warp-engine
+WARP_ENGINES = ("gdal", "numpy")
+# Spherical Mercator radius (EPSG:3857)
+_RADIUS = 6378137.0
+# Neighbour weights at or below this count as zero (GDAL's divisor epsilon)
+_MIN_WEIGHT = 1e-5
+
+__all__ = ["WARP_ENGINES", "default_warp_engine", "is_separable", "warp_separable"]
+
+
+def default_warp_engine() -> str:
+    """Return the warp engine from env `FUSI_WARP_ENGINE` (default "gdal")."""
+    engine = os.environ.get("FUSI_WARP_ENGINE", "gdal").lower()
+    return engine if engine in WARP_ENGINES else "gdal"
+
+
+def is_separable(crs: Any, transform: Any) -> bool:
+    """True when a source in `crs` with affine `transform` can use `warp_separable`."""
+    if crs is None or transform.b != 0 or transform.d != 0:
+        return False
+    try:
+        return bool(crs.is_geographic)
+    except Exception:
+        return False
+
+
+@functools.lru_cache(maxsize=4096)
+def _lon_centers(left: float, right: float, width: int) -> np.ndarray:
+    """Longitudes of the centres of `width` output columns between Mercator `left` and `right`."""
+    res = (right - left) / width
+    x = left + (np.arange(width, dtype=np.float64) + 0.5) * res
+    out = np.degrees(x / _RADIUS)
+    out.flags.writeable = False
+    return out
+
+
+@functools.lru_cache(maxsize=4096)
+def _lat_centers(bottom: float, top: float, height: int) -> np.ndarray:
+    """Latitudes of the centres of `height` output rows, top down."""
+    res = (top - bottom) / height
+    y = top - (np.arange(height, dtype=np.float64) + 0.5) * res
+    out = np.degrees(np.arctan(np.sinh(y / _RADIUS)))
+    out.flags.writeable = False
+    return out
+
+
+def _axis(edge: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Bilinear neighbours along one axis for fractional pixel-edge coordinates `edge`.
+
+    Returns clipped indices `i0`, `i1`, their weights (zero for neighbours
+    outside the raster) and the mask of positions whose containing source
+    pixel lies inside the raster (GDAL drops the others).
+    """
+    centre = edge - 0.5
+    i0 = np.floor(centre).astype(np.intp)
+    w1 = centre - i0
+    w0 = 1.0 - w1
+    i1 = i0 + 1
+    w0[(i0 < 0) | (i0 >= n)] = 0.0
+    w1[(i1 < 0) | (i1 >= n)] = 0.0
+    inside = (edge >= 0) & (edge < n)
+    return np.clip(i0, 0, n - 1), np.clip(i1, 0, n - 1), w0, w1, inside
+
+
+def warp_separable(
+    src_arr: np.ndarray,
+    src_transform: Any,
+    tile_bounds_mercator: Any,
+    out_shape: Tuple[int, int],
+) -> Optional[np.ndarray]:
+    """Bilinearly resample a geographic float32 grid (NaN = nodata) onto a Mercator tile.
+
+    Returns the float32 tile, or None when the tile is coarser than the
+    source or the grid is rotated (use GDAL then).
+    """
+    t = src_transform
+    if t.b != 0 or t.d != 0:
+        return None
+    height, width = out_shape
+    b = tile_bounds_mercator
+    lon = _lon_centers(b.left, b.right, width)
+    lat = _lat_centers(b.bottom, b.top, height)
+    cols = (lon - t.c) / t.a
+    rows = (lat - t.f) / t.e
+    # Downsampling: GDAL widens the kernel, which plain bilinear does not match
+    step = max(abs(cols[-1] - cols[0]) / max(width - 1, 1), float(np.abs(np.diff(rows)).max(initial=0.0)))
+    if step > 1.0 + 1e-9 or not math.isfinite(step):
+        return None
+
+    src_h, src_w = src_arr.shape
+    c0, c1, cw0, cw1, col_in = _axis(cols, src_w)
+    r0, r1, rw0, rw1, row_in = _axis(rows, src_h)
+
+    num = np.zeros(out_shape, dtype=np.float64)
+    den = np.zeros(out_shape, dtype=np.float64)
+    masked = np.zeros(out_shape, dtype=bool)
+    for r, rw in ((r0, rw0), (r1, rw1)):
+        band = src_arr[r]
+        for c, cw in ((c0, cw0), (c1, cw1)):
+            values = band[:, c]
+            weight = rw[:, None] * cw[None, :]
+            invalid = np.isnan(values)
+            # A masked neighbour that contributes voids the sample, as in GDAL
+            masked |= invalid & (weight > _MIN_WEIGHT)
+            weight[invalid] = 0.0
+            num += np.where(invalid, 0.0, values) * weight
+            den += weight
+
+    out = np.full(out_shape, np.nan, dtype=np.float32)
+    ok = ~masked & (den > _MIN_WEIGHT) & row_in[:, None] & col_in[None, :]
+    np.divide(num, den, out=out, where=ok, casting="unsafe")
+    return out
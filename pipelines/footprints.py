@@ -0,0 +1,453 @@
+"""Valid-data footprints of source GeoTIFFs and occlusion planning.
+
+A record's bbox overstates where it has data (nodata margins, irregular
+coverage), so bboxes alone cannot tell whether a low-priority sheet is
+hidden under higher-priority data. A `Footprint` rasterises the record's
+valid-data mask onto a global Web Mercator pixel grid: pixel (x, y) of the
+grid is the XYZ tile x/y at `FOOTPRINT_ZOOM` (~250 m at Japan's latitudes).
+Two masks are kept, both warped from the full-resolution mask: `data` (a
+valid source pixel falls in the grid pixel) and `full` (no nodata source
+pixel does).
+
+`source_bounds.py --footprints` stores every file's footprint in
+`footprints.npz` next to bounds.csv. The aggregator loads them
+(`load_stored_footprints`) and drops a candidate from a tile before any
+read when its footprint has no data near the tile (`footprint_touches`),
+so coastal sheets are not read and warped for tiles in their nodata area.
+
+`plan_occlusion` walks every coarse bucket of the aggregator's candidate
+index. Within a bucket, records are taken in merge order `(priority,
+pixel_size)`. A record is occluded in the bucket when every grid pixel of
+the bucket where it has data is covered by records merged before it. Such
+a record can never fill a NaN pixel of that bucket, so it is dropped from
+the bucket's candidates and never opened for its tiles.
+
+A grid pixel is covered when it lies inside one earlier record's bbox and
+is `full` there, or, on sheet edges and seams, when the bboxes of the
+earlier records that are `full` there tile the part of it inside the
+record's own bbox exactly. Mercator bboxes are exact for sheets in
+geographic CRSs (JGD2011), so sheets cut along lat/lon lines join up
+without gaps.
+"""
+from __future__ import annotations
+
+import functools
+import os
+from pathlib import Path
+from typing import Dict, Hashable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+try:
+    import mercantile
+except Exception:  # pragma: no cover - optional
+    mercantile = None
+
+try:
+    from rasterio.crs import CRS
+    from rasterio.enums import Resampling
+    from rasterio.transform import from_bounds
+    from rasterio.warp import reproject
+except Exception:  # pragma: no cover - optional runtime dependency
+    CRS = None
+    Resampling = None
+    from_bounds = None
+    reproject = None
+
+# Zoom of the XYZ tile grid whose tiles serve as footprint pixels
+FOOTPRINT_ZOOM = 17
+# Half the Web Mercator world width in metres
+_ORIGIN_M = 20037508.342789244
+# Slivers narrower than this (metres) between adjacent bboxes are ignored
+_SEAM_EPS_M = 1e-6
+# Stored footprints of a source, written next to bounds.csv by source_bounds.py
+FOOTPRINTS_FILENAME = "footprints.npz"
+
+Box = Tuple[int, int, int, int]
+Rect = Tuple[float, float, float, float]
+
+__all__ = [
+    "FOOTPRINT_ZOOM",
+    "Footprint",
+    "OcclusionPlan",
+    "FOOTPRINTS_FILENAME",
+    "compute_footprint",
+    "footprint_from_dataset",
+    "footprint_touches",
+    "load_footprints",
+    "load_stored_footprints",
+    "plan_occlusion",
+    "save_footprints",
+]
+
+
+class Footprint(NamedTuple):
+    """Valid-data masks of one record on the global footprint grid.
+
+    `data[r, c]` and `full[r, c]` cover grid pixel `(x0 + c, y0 + r)` at
+    `zoom`; `bounds` is the record's Mercator bbox.
+    """
+
+    zoom: int
+    x0: int
+    y0: int
+    data: np.ndarray
+    full: np.ndarray
+    bounds: Rect
+
+    @property
+    def x1(self) -> int:
+        return self.x0 + self.data.shape[1]
+
+    @property
+    def y1(self) -> int:
+        return self.y0 + self.data.shape[0]
+
+
+class OcclusionPlan(NamedTuple):
+    """Result of `plan_occlusion`.
+
+    `occluded` maps a bucket key to the set of records dropped from it; `eliminated` lists the records dropped from every
+    bucket they appear in, i.e. never opened at all.
+    """
+
+    occluded: Dict[Hashable, Set]
+    dropped_entries: int
+    eliminated: List
+    eliminated_bytes: int
+
+    def format_summary(self) -> str:
+        return (
+            f"occlusion: {len(self.eliminated)} records never read "
+            f"({self.eliminated_bytes / (1024 * 1024):.1f} MiB of source data); "
+            f"{self.dropped_entries} bucket entries dropped"
+        )
+
+
+def compute_footprint(record, pool=None, zoom: int = FOOTPRINT_ZOOM) -> Optional[Footprint]:
+    """Rasterise `record`'s valid-data mask onto the footprint grid.
+
+    `pool` is a `DatasetPool` (anything with `get(path)`); without one the
+    file is opened and closed here. Returns None when the record has no
+    valid pixel. Records whose rich metadata (`source_bounds.py --rich`)
+    says every pixel is valid in a geographic CRS are rasterised from
+    their bbox without opening the file.
+    """
+    ul, lr = _grid_corners(record, zoom)
+    if getattr(record, "valid_fraction", None) == 1.0 and _is_geographic(getattr(record, "crs", None)):
+        return _footprint_from_bounds(record, zoom, ul, lr)
+    if pool is not None:
+        return _footprint_from_dataset(pool.get(record.path), record, zoom, ul, lr)
+    import rasterio
+
+    with rasterio.open(record.path) as src:
+        return _footprint_from_dataset(src, record, zoom, ul, lr)
+
+
+def footprint_from_dataset(src, record, zoom: int = FOOTPRINT_ZOOM) -> Optional[Footprint]:
+    """`compute_footprint` for a dataset the caller already has open."""
+    return _footprint_from_dataset(src, record, zoom, *_grid_corners(record, zoom))
+
+
+def footprint_touches(fp: Footprint, z: int, x: int, y: int, margin: int = 1) -> bool:
+    """True when `fp` has data in tile z/x/y or within `margin` grid pixels of it.
+
+    The margin keeps tiles whose edge pixels bilinear sampling fills from
+    valid source pixels just outside the tile.
+    """
+    shift = fp.zoom - z
+    if shift >= 0:
+        box = (x << shift, y << shift, (x + 1) << shift, (y + 1) << shift)
+    else:
+        box = (x >> -shift, y >> -shift, (x >> -shift) + 1, (y >> -shift) + 1)
+    box = (box[0] - margin, box[1] - margin, box[2] + margin, box[3] + margin)
+    window = _intersect(box, (fp.x0, fp.y0, fp.x1, fp.y1))
+    if window is None:
+        return False
+    wx0, wy0, wx1, wy1 = window
+    return bool(fp.data[wy0 - fp.y0 : wy1 - fp.y0, wx0 - fp.x0 : wx1 - fp.x0].any())
+
+
+def _grid_corners(record, zoom: int):
+    """Upper-left and lower-right grid tiles of `record`'s bbox."""
+    west, south = mercantile.lnglat(record.left, record.bottom)
+    east, north = mercantile.lnglat(record.right, record.top)
+    return mercantile.tile(west, north, zoom), mercantile.tile(east - 1e-11, south + 1e-11, zoom)
+
+
+def _footprint_from_dataset(src, record, zoom: int, ul, lr) -> Optional[Footprint]:
+    width, height = lr.x - ul.x + 1, lr.y - ul.y + 1
+    xs, ys = _pixel_edges(zoom, ul.x, lr.x + 1), _pixel_edges(zoom, ul.y, lr.y + 1, rows=True)
+    dst_transform = from_bounds(xs[0], ys[-1], xs[-1], ys[0], width, height)
+
+    # GDAL reads only support averaging filters, so max/min run in the warp
+    src_mask = src.read_masks(1)
+    masks = []
+    for resampling in (Resampling.max, Resampling.min):
+        grid = np.zeros((height, width), dtype=np.uint8)
+        reproject(
+            source=src_mask,
+            destination=grid,
+            src_transform=src.transform,
+            src_crs=src.crs,
+            dst_transform=dst_transform,
+            dst_crs="EPSG:3857",
+            resampling=resampling,
+        )
+        masks.append(grid > 0)
+    data, full = masks
+    if not data.any():
+        return None
+    return Footprint(zoom, ul.x, ul.y, data, full & data, tuple(record.bounds_mercator))
+
+
+@functools.lru_cache(maxsize=64)
+def _is_geographic(crs: Optional[str]) -> bool:
+    if not crs or CRS is None:
+        return False
+    try:
+        return bool(CRS.from_user_input(crs).is_geographic)
+    except Exception:
+        return False
+
+
+def _footprint_from_bounds(record, zoom: int, ul, lr) -> Footprint:
+    """Footprint of a fully valid lat/lon-aligned raster, whose Mercator bbox is exact.
+
+    Every grid pixel the bbox touches holds only valid source pixels, so
+    `data` and `full` are both all True; edges are settled by the bbox.
+    """
+    data = np.ones((lr.y - ul.y + 1, lr.x - ul.x + 1), dtype=bool)
+    return Footprint(zoom, ul.x, ul.y, data, data.copy(), tuple(record.bounds_mercator))
+
+
+def _pixel_edges(zoom: int, start: int, stop: int, rows: bool = False) -> np.ndarray:
+    """Mercator edges of grid columns (or rows, top down) `start..stop`."""
+    size = 2 * _ORIGIN_M / (1 << zoom)
+    edges = np.arange(start, stop + 1, dtype=np.float64) * size
+    return _ORIGIN_M - edges if rows else edges - _ORIGIN_M
+
+
+def _intersect(a: Box, b: Box) -> Optional[Box]:
+    x0, y0 = max(a[0], b[0]), max(a[1], b[1])
+    x1, y1 = min(a[2], b[2]), min(a[3], b[3])
+    if x0 >= x1 or y0 >= y1:
+        return None
+    return x0, y0, x1, y1
+
+
+def _crop(fp: Footprint, mask: np.ndarray, region: Box) -> np.ndarray:
+    """Return `mask` (one of `fp`'s) over grid box `region`, False outside the footprint."""
+    out = np.zeros((region[3] - region[1], region[2] - region[0]), dtype=bool)
+    window = _intersect((fp.x0, fp.y0, fp.x1, fp.y1), region)
+    if window is not None:
+        wx0, wy0, wx1, wy1 = window
+        out[wy0 - region[1] : wy1 - region[1], wx0 - region[0] : wx1 - region[0]] = mask[
+            wy0 - fp.y0 : wy1 - fp.y0, wx0 - fp.x0 : wx1 - fp.x0
+        ]
+    return out
+
+
+def _rects_cover(cell: Rect, rects: Sequence[Rect]) -> bool:
+    """True when the union of `rects` contains the rectangle `cell`."""
+    left, bottom, right, top = cell
+    xs = sorted({left, right, *(min(max(x, left), right) for r in rects for x in (r[0], r[2]))})
+    ys = sorted({bottom, top, *(min(max(y, bottom), top) for r in rects for y in (r[1], r[3]))})
+    for x0, x1 in zip(xs, xs[1:]):
+        if x1 - x0 < _SEAM_EPS_M:
+            continue
+        cx = (x0 + x1) / 2
+        for y0, y1 in zip(ys, ys[1:]):
+            if y1 - y0 < _SEAM_EPS_M:
+                continue
+            cy = (y0 + y1) / 2
+            if not any(r[0] <= cx <= r[2] and r[1] <= cy <= r[3] for r in rects):
+                return False
+    return True
+
+
+def _is_covered(fp: Footprint, earlier: Sequence[Footprint], region: Box) -> bool:
+    """True when every `data` pixel of `fp` in `region` is covered by `earlier`."""
+    need = _crop(fp, fp.data, region)
+    xs = _pixel_edges(fp.zoom, region[0], region[2])
+    ys = _pixel_edges(fp.zoom, region[1], region[3], rows=True)
+    edge_masks = []
+    for other in earlier:
+        if not need.any():
+            return True
+        left, bottom, right, top = other.bounds
+        col_in = (xs[:-1] >= left) & (xs[1:] <= right)
+        col_touch = (xs[1:] > left) & (xs[:-1] < right)
+        row_in = (ys[1:] >= bottom) & (ys[:-1] <= top)
+        row_touch = (ys[:-1] > bottom) & (ys[1:] < top)
+        full = _crop(other, other.full, region)
+        need &= ~(full & row_in[:, None] & col_in[None, :])
+        edge = full & row_touch[:, None] & col_touch[None, :]
+        if edge.any():
+            edge_masks.append((other.bounds, edge))
+    # Edge and seam pixels: the full bboxes around them must tile the part
+    # of the pixel inside `fp`'s own bbox exactly
+    left, bottom, right, top = fp.bounds
+    for r, c in np.argwhere(need):
+        rects = [bounds for bounds, edge in edge_masks if edge[r, c]]
+        cell = (max(xs[c], left), max(ys[r + 1], bottom), min(xs[c + 1], right), min(ys[r], top))
+        if not rects or not _rects_cover(cell, rects):
+            return False
+    return True
+
+
+def plan_occlusion(
+    buckets: Dict[Tuple[int, int, int], Sequence],
+    footprints: Dict[Hashable, Optional[Footprint]],
+) -> OcclusionPlan:
+    """Find, per bucket `(z, x, y)`, the records hidden under higher-priority data.
+
+    `footprints` maps each record to its footprint (None = no valid data);
+    records are used as keys, so `SourceRecord`s and catalog `SourceRef`
+    views both work.
+    Records without an entry are never dropped and never count as cover.
+    A record can only be covered by records the tile merge reads before it:
+    lower `(priority, pixel_size)`, or an equal key earlier in the bucket.
+    `buckets` is not modified.
+    """
+    occluded: Dict[Hashable, Set] = {}
+    dropped = 0
+    for key, records in buckets.items():
+        bz, bx, by = key
+        # Same stable order as the tile merge, so ties keep bucket order
+        order = sorted(records, key=lambda r: (r.priority, r.pixel_size))
+        hidden: Set = set()
+        earlier: List[Footprint] = []
+        for record in order:
+            fp = footprints.get(record, _MISSING)
+            if fp is _MISSING:
+                continue
+            if fp is None:
+                hidden.add(record)
+                continue
+            shift = fp.zoom - bz
+            bucket_box = (bx << shift, by << shift, (bx + 1) << shift, (by + 1) << shift)
+            region = _intersect(bucket_box, (fp.x0, fp.y0, fp.x1, fp.y1))
+            if region is None or _is_covered(fp, earlier, region):
+                hidden.add(record)
+            earlier.append(fp)
+        if hidden:
+            occluded[key] = hidden
+            dropped += len(hidden)
+
+    # Records dropped from every bucket they are listed in are never opened
+    listed: Dict[Hashable, None] = {}
+    kept: Set = set()
+    for key, records in buckets.items():
+        hidden = occluded.get(key, set())
+        for r in records:
+            listed[r] = None
+            if r not in hidden:
+                kept.add(r)
+    eliminated = [r for r in listed if r not in kept]
+    eliminated_bytes = 0
+    for r in eliminated:
+        try:
+            eliminated_bytes += os.path.getsize(r.path)
+        except OSError:
+            pass
+    return OcclusionPlan(occluded, dropped, eliminated, eliminated_bytes)
+
+
+# Marks a record that has no footprint entry at all
+_MISSING = object()
+
+
+def save_footprints(path: Path, entries: Dict[str, Tuple[Rect, Optional[Footprint]]]) -> None:
+    """Write `{filename: (bounds, footprint)}` to `path` atomically.
+
+    Masks are bit-packed into two flat arrays; `bounds` is kept so loads
+    can reject entries whose file has since changed extent.
+    """
+    names = list(entries)
+    blob = "".join(names).encode("utf-8")
+    name_offsets = np.cumsum([0] + [len(n.encode("utf-8")) for n in names]).astype(np.int64)
+    bounds = np.array([entries[n][0] for n in names], dtype=np.float64).reshape(-1, 4)
+    boxes = np.zeros((len(names), 4), dtype=np.int64)
+    zooms = np.zeros(len(names), dtype=np.int16)
+    data_parts, full_parts = [], []
+    for i, name in enumerate(names):
+        fp = entries[name][1]
+        if fp is None:
+            zooms[i] = -1
+            continue
+        zooms[i] = fp.zoom
+        boxes[i] = (fp.x0, fp.y0, fp.data.shape[1], fp.data.shape[0])
+        data_parts.append(fp.data.ravel())
+        full_parts.append(fp.full.ravel())
+    flat_data = np.concatenate(data_parts) if data_parts else np.zeros(0, dtype=bool)
+    flat_full = np.concatenate(full_parts) if full_parts else np.zeros(0, dtype=bool)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with tmp.open("wb") as fp_out:
+            np.savez(
+                fp_out,
+                names=np.frombuffer(blob, dtype=np.uint8),
+                name_offsets=name_offsets,
+                bounds=bounds,
+                boxes=boxes,
+                zooms=zooms,
+                data=np.packbits(flat_data),
+                full=np.packbits(flat_full),
+                bits=np.int64(len(flat_data)),
+            )
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def load_footprints(path: Path) -> Dict[str, Tuple[Rect, Optional[Footprint]]]:
+    """Read a file written by `save_footprints`."""
+    with np.load(path) as f:
+        blob = f["names"].tobytes()
+        offsets = f["name_offsets"]
+        bounds, boxes, zooms = f["bounds"], f["boxes"], f["zooms"]
+        bits = int(f["bits"])
+        flat_data = np.unpackbits(f["data"], count=bits).astype(bool)
+        flat_full = np.unpackbits(f["full"], count=bits).astype(bool)
+    out: Dict[str, Tuple[Rect, Optional[Footprint]]] = {}
+    pos = 0
+    for i in range(len(zooms)):
+        name = blob[offsets[i] : offsets[i + 1]].decode("utf-8")
+        rect = tuple(bounds[i].tolist())
+        fp = None
+        if zooms[i] >= 0:
+            x0, y0, w, h = (int(v) for v in boxes[i])
+            data = flat_data[pos : pos + w * h].reshape(h, w)
+            full = flat_full[pos : pos + w * h].reshape(h, w)
+            pos += w * h
+            fp = Footprint(int(zooms[i]), x0, y0, data, full, rect)
+        out[name] = (rect, fp)
+    return out
+
+
+def load_stored_footprints(records: Sequence) -> Dict[Hashable, Optional[Footprint]]:
+    """Map records to the footprints stored next to their bounds.csv.
+
+    Records without a stored entry, or whose bbox differs from the stored
+    one, are left out (callers treat them as unknown, never as empty).
+    """
+    by_dir: Dict[Path, List] = {}
+    for record in records:
+        by_dir.setdefault(Path(record.path).parent, []).append(record)
+    out: Dict[Hashable, Optional[Footprint]] = {}
+    for directory, members in by_dir.items():
+        path = directory / FOOTPRINTS_FILENAME
+        if not path.exists():
+            continue
+        try:
+            stored = load_footprints(path)
+        except Exception as exc:
+            print(f"Warning: ignoring unreadable {path}: {exc}")
+            continue
+        for record in members:
+            entry = stored.get(Path(record.path).name)
+            if entry is not None and entry[0] == tuple(record.bounds_mercator):
+                out[record] = entry[1]
+    return out
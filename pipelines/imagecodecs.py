@@ -1,33 +1,362 @@
-"""Minimal shim for imagecodecs.webp_decode used by local tools.
-This shim uses Pillow to decode WebP into a numpy array.
+"""WebP encode/decode for the tile pipelines, with pluggable codec backends.
+
+Pillow is the default backend. When the `imagecodecs` package (libwebp
+bindings with direct NumPy I/O) is installed it can be selected instead
+with env `FUSI_WEBP_BACKEND` or `--codec-backend` on the aggregate and
+merge tools; backends whose library is missing are not offered. Every
+backend writes lossless WebP, so decoded Terrarium elevations do not depend
+on the choice, only speed and tile size do.
+
+`python -m pipelines.imagecodecs --bench` encodes real Terrarium tiles
+(from `--mbtiles`, or synthetic relief encoded with `encode_terrarium`)
+with every available backend and effort (`method`) and reports tiles/s,
+bytes/tile and whether the decoded elevations are identical.
 """
+import os
+import threading
 from io import BytesIO
 
-from PIL import Image
-import os
 import numpy as np
+from PIL import Image
+
+# Backend used when neither --codec-backend nor FUSI_WEBP_BACKEND is given
+DEFAULT_BACKEND = 'pillow'
+
+
+class PillowBackend:
+    """libwebp through Pillow (always available)."""
+
+    name = 'pillow'
+
+    def encode(self, arr, lossless=True, method=6):
+        img = Image.fromarray(np.asarray(arr, dtype=np.uint8))
+        buf = BytesIO()
+        # Pillow accepts `method` for WebP to trade CPU for compression.
+        img.save(buf, format='WEBP', lossless=lossless, method=method)
+        return buf.getvalue()
+
+    def decode(self, blob, channels=4, out=None):
+        mode = 'RGBA' if channels == 4 else 'RGB'
+        with Image.open(BytesIO(blob)) as img:
+            if img.mode != mode:
+                img = img.convert(mode)
+            if out is None or out.shape != (img.height, img.width, channels):
+                return np.array(img)
+            np.copyto(out, np.asarray(img))
+        return out
+
+
+class ImagecodecsBackend:
+    """libwebp through the `imagecodecs` package (NumPy in, NumPy out)."""
+
+    name = 'imagecodecs'
+
+    def __init__(self):
+        import importlib
+
+        lib = importlib.import_module('imagecodecs')
+        # Run as a script from pipelines/, `import imagecodecs` finds this shim
+        if os.path.abspath(getattr(lib, '__file__', '')) == os.path.abspath(__file__):
+            raise ImportError('imagecodecs package is not installed')
+        if not hasattr(lib, 'webp_encode'):
+            raise ImportError('imagecodecs was built without WebP support')
+        self._lib = lib
+
+    def encode(self, arr, lossless=True, method=6):
+        data = np.ascontiguousarray(arr, dtype=np.uint8)
+        return bytes(self._lib.webp_encode(data, lossless=lossless, method=method))
+
+    def decode(self, blob, channels=4, out=None):
+        arr = self._lib.webp_decode(blob, hasalpha=channels == 4)
+        if arr.shape[-1] != channels:
+            # Alpha-less tiles decoded to RGBA (or the reverse)
+            arr = arr[..., :3] if channels == 3 else np.dstack((arr, np.full(arr.shape[:2], 255, np.uint8)))
+        if out is None or out.shape != arr.shape:
+            return arr
+        np.copyto(out, arr)
+        return out
+
+
+# Registered backends by name, in the order --bench reports them
+BACKENDS = {
+    PillowBackend.name: PillowBackend,
+    ImagecodecsBackend.name: ImagecodecsBackend,
+}
+CODEC_BACKENDS = tuple(BACKENDS)
+
+_instances = {}
+_selected = None
+_lock = threading.Lock()
+
+
+def load_backend(name):
+    """Return the (shared) instance of backend `name`; ImportError when its library is missing."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown codec backend {name!r}; choose from {', '.join(CODEC_BACKENDS)}")
+    with _lock:
+        backend = _instances.get(name)
+        if backend is None:
+            backend = _instances[name] = BACKENDS[name]()
+    return backend
+
+
+def available_backends():
+    """Names of the backends whose library can be imported here."""
+    names = []
+    for name in CODEC_BACKENDS:
+        try:
+            load_backend(name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def default_backend_name():
+    """Return the backend from env `FUSI_WEBP_BACKEND` (default "pillow")."""
+    name = os.environ.get('FUSI_WEBP_BACKEND', DEFAULT_BACKEND).lower()
+    return name if name in BACKENDS else DEFAULT_BACKEND
+
+
+def set_backend(name):
+    """Select the backend used by `webp_encode`/`webp_decode*` in this process.
+
+    With a falsy `name` the selection is reset to the `FUSI_WEBP_BACKEND`
+    default, resolved (with its Pillow fallback) by `get_backend`.
+    """
+    global _selected
+    if not name:
+        with _lock:
+            _selected = None
+        return get_backend()
+    _selected = load_backend(name)
+    return _selected
+
+
+def get_backend():
+    """Return the selected backend, resolving `FUSI_WEBP_BACKEND` on first use.
+
+    A backend named only in the environment whose library is missing falls
+    back to Pillow with a warning; `set_backend` raises instead.
+    """
+    global _selected
+    if _selected is None:
+        name = default_backend_name()
+        try:
+            _selected = load_backend(name)
+        except ImportError as exc:
+            print(f"Warning: codec backend {name!r} unavailable ({exc}); using {DEFAULT_BACKEND}")
+            _selected = load_backend(DEFAULT_BACKEND)
+    return _selected
+
+
+def default_method():
+    """Return the WebP effort from env `FUSI_WEBP_METHOD` (default 6, the strongest)."""
+    try:
+        return int(os.environ.get('FUSI_WEBP_METHOD', '6'))
+    except (TypeError, ValueError):
+        return 6
 
 
 def webp_decode(blob: bytes):
-    img = Image.open(BytesIO(blob)).convert("RGBA")
-    arr = np.array(img)
-    return arr
+    """Decode WebP to an (H, W, 4) uint8 RGBA array."""
+    return get_backend().decode(blob, channels=4)
+
+
+def webp_decode_rgb(blob: bytes, out=None):
+    """Decode WebP to an (H, W, 3) uint8 array, skipping the RGBA conversion.
+
+    With `out` of the decoded shape the pixels are copied into it and `out`
+    is returned, so callers can keep one buffer across tiles.
+    """
+    return get_backend().decode(blob, channels=3, out=out)
 
 
 def webp_encode(arr, lossless=True, method=None):
-    # Wrapper for WebP encoding using Pillow.
+    # WebP encoding with the selected backend.
     # The encoding effort (`method`) can be set via env `FUSI_WEBP_METHOD`.
     # Default behavior: use the strongest effort (6) unless overridden.
-    from PIL import Image
-    img = Image.fromarray(arr.astype('uint8'))
-    buf = BytesIO()
-
     if method is None:
+        method = default_method()
+    return get_backend().encode(arr, lossless=lossless, method=method)
+
+
+def default_encode_threads() -> int:
+    """Return the encoder thread count from env `FUSI_ENCODE_THREADS` (default 2)."""
+    try:
+        return max(1, int(os.environ.get('FUSI_ENCODE_THREADS', '2')))
+    except (TypeError, ValueError):
+        return 2
+
+
+class WebPEncoder:
+    """Thread pool for WebP encoding; results come back in input order.
+
+    The WebP backends release the GIL while encoding, so encoding on
+    several threads overlaps with the caller producing the next tiles. `map`
+    runs any per-tile function (e.g. Terrarium + WebP) on the pool lazily,
+    with at most `max_in_flight` items pending. With one thread everything runs
+    inline on the calling thread.
+
+    Usage:
+        with WebPEncoder(threads=4) as encoder:
+            for blob in encoder.encode_many(arrays):
+                ...
+    """
+
+    def __init__(self, threads=None, lossless=True, method=None, max_in_flight=None):
+        self.threads = max(1, int(threads)) if threads else default_encode_threads()
+        self.lossless = lossless
+        self.method = method
+        self.max_in_flight = int(max_in_flight) if max_in_flight else 2 * self.threads
+        self._executor = None
+
+    def encode(self, arr):
+        return webp_encode(arr, lossless=self.lossless, method=self.method)
+
+    def map(self, fn, items):
+        """Yield `fn(item)` for every item, in order."""
+        if self.threads == 1:
+            return map(fn, items)
+        if self._executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='webp-encode')
         try:
-            method = int(os.environ.get('FUSI_WEBP_METHOD', '6'))
-        except (TypeError, ValueError):
-            method = 6
+            from .tile_workers import ordered_map
+        except ImportError:  # pragma: no cover - fallback for direct execution
+            from tile_workers import ordered_map
+        return ordered_map(self._executor, fn, items, self.max_in_flight)
+
+    def encode_many(self, arrays):
+        """Yield the WebP bytes of every array, in order."""
+        return self.map(self.encode, arrays)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def webp_encode_many(arrays, lossless=True, method=None, threads=None):
+    """Encode `arrays` on a thread pool and return their WebP bytes in order."""
+    with WebPEncoder(threads=threads, lossless=lossless, method=method) as encoder:
+        return list(encoder.encode_many(arrays))
+
+
+def _synthetic_tiles(count, zooms=(10, 13, 15)):
+    """Terrarium RGB tiles of smooth relief with noise and a nodata corner."""
+    try:
+        from .convert_terrarium import encode_terrarium
+    except ImportError:  # pragma: no cover - fallback for direct execution
+        from convert_terrarium import encode_terrarium
+    rng = np.random.default_rng(0)
+    yy, xx = np.mgrid[0:512, 0:512].astype(np.float32)
+    tiles = []
+    for i in range(count):
+        z = zooms[i % len(zooms)]
+        ox, oy = rng.uniform(0, 1000, size=2)
+        dem = 300.0 + 120.0 * np.sin((xx + ox) / 37.0) + 80.0 * np.cos((yy + oy) / 53.0)
+        dem += rng.normal(0.0, 0.4, dem.shape)
+        dem = dem.astype(np.float32)
+        if i % 4 == 0:
+            dem[:128, :128] = np.nan
+        tiles.append(np.array(encode_terrarium(dem, z)))
+    return tiles
+
+
+def _mbtiles_tiles(path, count):
+    """RGB arrays of the first `count` tiles of a Terrarium MBTiles."""
+    import sqlite3
+
+    reference = load_backend(DEFAULT_BACKEND)
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute('SELECT tile_data FROM tiles LIMIT ?', (int(count),)).fetchall()
+    finally:
+        conn.close()
+    return [reference.decode(bytes(row[0]), channels=3) for row in rows]
+
+
+def bench(tiles, backends=None, methods=(0, 2, 4, 6)):
+    """Encode `tiles` with each backend and method; one result dict per combination.
+
+    Blobs are decoded with Pillow (the reference libwebp decoder) and
+    compared as Terrarium elevations against the input tiles.
+    """
+    import time
+
+    try:
+        from .terrarium_decode import rgb_to_elevation
+    except ImportError:  # pragma: no cover - fallback for direct execution
+        from terrarium_decode import rgb_to_elevation
+
+    reference = load_backend(DEFAULT_BACKEND)
+    expected = [rgb_to_elevation(t) for t in tiles]
+    results = []
+    for name in backends or available_backends():
+        backend = load_backend(name)
+        for method in methods:
+            t0 = time.perf_counter()
+            blobs = [backend.encode(t, lossless=True, method=method) for t in tiles]
+            encode_s = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            decoded = [backend.decode(b, channels=3) for b in blobs]
+            decode_s = time.perf_counter() - t0
+            identical = all(
+                np.array_equal(rgb_to_elevation(reference.decode(b, channels=3)), e)
+                and np.array_equal(rgb_to_elevation(d), e)
+                for b, d, e in zip(blobs, decoded, expected)
+            )
+            results.append(
+                {
+                    "backend": name,
+                    "method": method,
+                    "encode_tiles_per_s": round(len(tiles) / max(encode_s, 1e-9), 1),
+                    "decode_tiles_per_s": round(len(tiles) / max(decode_s, 1e-9), 1),
+                    "bytes_per_tile": round(sum(len(b) for b in blobs) / max(len(blobs), 1)),
+                    "identical": identical,
+                }
+            )
+    return results
+
+
+def main(argv=None):
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="WebP codec backends for Terrarium tiles")
+    parser.add_argument('--bench', action='store_true', help="Benchmark every available backend and effort")
+    parser.add_argument('--mbtiles', help="Take the benchmark tiles from this Terrarium MBTiles")
+    parser.add_argument('--tiles', type=int, default=32, help="Number of tiles to encode per combination")
+    parser.add_argument('--methods', default='0,2,4,6', help="Comma-separated WebP efforts to try")
+    parser.add_argument('--backend', action='append', choices=available_backends(), help="Limit to these backends")
+    args = parser.parse_args(argv)
+
+    if not args.bench:
+        print(json.dumps({"available": available_backends(), "selected": get_backend().name}))
+        return 0
+    tiles = _mbtiles_tiles(args.mbtiles, args.tiles) if args.mbtiles else _synthetic_tiles(args.tiles)
+    if not tiles:
+        raise SystemExit("No tiles to benchmark")
+    methods = [int(m) for m in args.methods.split(',') if m.strip()]
+    results = bench(tiles, args.backend, methods)
+    identical = [r for r in results if r["identical"]]
+    report = {
+        "tiles": len(tiles),
+        "source": args.mbtiles or "synthetic",
+        "results": results,
+        # Fastest encoder whose tiles decode to the input elevations
+        "fastest_identical": max(identical, key=lambda r: r["encode_tiles_per_s"]) if identical else None,
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
 
-    # Pillow accepts `method` for WebP to trade CPU for compression.
-    img.save(buf, format='WEBP', lossless=lossless, method=method)
-    return buf.getvalue()
+if __name__ == "__main__":
+    raise SystemExit(main())
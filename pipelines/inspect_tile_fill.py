@@ -8,7 +8,6 @@ The functions are suitable for import in tests or other tooling.
 from __future__ import annotations
 
 import sqlite3
-from io import BytesIO
 from pathlib import Path
 import argparse
 from typing import Optional
@@ -20,23 +19,12 @@ except Exception:  # pragma: no cover - optional
     mercantile = None
 
 from .aggregate_pmtiles import load_bounds, read_tile_from_source, merge_tile_candidates
-from . import imagecodecs
-from PIL import Image
+from .dataset_pool import DatasetPool, get_shared_pool
+from .terrarium_decode import decode_terrarium
 
 
 def decode_webp_to_elevation(webp_bytes: bytes) -> np.ndarray:
-    try:
-        arr = imagecodecs.webp_decode(webp_bytes)
-        rgb = arr[:, :, :3]
-    except Exception:
-        img = Image.open(BytesIO(webp_bytes)).convert("RGB")
-        rgb = np.array(img)
-
-    r = rgb[:, :, 0].astype("float32")
-    g = rgb[:, :, 1].astype("float32")
-    b = rgb[:, :, 2].astype("float32")
-    elev = (r * 256.0 + g + b / 256.0) - 32768.0
-    return elev
+    return decode_terrarium(webp_bytes)
 
 
 def fetch_tile_from_mbtiles(mbtiles_path: Path, z: int, x: int, y: int) -> Optional[bytes]:
@@ -64,7 +52,16 @@ def fetch_tile_from_mbtiles(mbtiles_path: Path, z: int, x: int, y: int) -> Optio
         conn.close()
 
 
-def assemble_source_tile(source_name: str, z: int, x: int, y: int, warp_threads: int = 1):
+def assemble_source_tile(
+    source_name: str,
+    z: int,
+    x: int,
+    y: int,
+    warp_threads: int = 1,
+    pool: Optional[DatasetPool] = None,
+):
+    if pool is None:
+        pool = get_shared_pool()
     records = load_bounds(source_name, priority=0)
     tile_xyz = mercantile.Tile(x=x, y=y, z=z)
     bounds_xyz = mercantile.xy_bounds(tile_xyz)
@@ -79,7 +76,13 @@ def assemble_source_tile(source_name: str, z: int, x: int, y: int, warp_threads:
         if not (overlap_xyz or overlap_tms):
             continue
         try:
-            arr = read_tile_from_source(rec, bounds_xyz if overlap_xyz else bounds_tms, out_shape=(512, 512), warp_threads=warp_threads)
+            arr = read_tile_from_source(
+                rec,
+                bounds_xyz if overlap_xyz else bounds_tms,
+                out_shape=(512, 512),
+                warp_threads=warp_threads,
+                pool=pool,
+            )
         except Exception as exc:
             print(f"Warning reading {rec.path}: {exc}")
             continue
@@ -20,7 +20,6 @@ import numpy as np
 from .aggregate_pmtiles import (
     build_records_from_sources,
     compute_tile_provenance,
-    intersects,
     SourceRecord,
 )
 
@@ -90,7 +89,7 @@ def generate_lineage_tile(
     tile_bounds = mercantile.xy_bounds(tile)
 
     # Filter overlapping records
-    overlapping = [r for r in records if intersects(r.bounds_mercator, (tile_bounds.left, tile_bounds.bottom, tile_bounds.right, tile_bounds.top))]
+    overlapping = records.overlapping((tile_bounds.left, tile_bounds.bottom, tile_bounds.right, tile_bounds.top))
     if not overlapping:
         return None
 
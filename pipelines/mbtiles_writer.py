@@ -20,7 +20,13 @@ import time
 from datetime import datetime
 import json
 
-import mercantile
+try:  # Allow running as a module or script
+    from .tile_grid import lnglat_bounds
+except ImportError:  # pragma: no cover - fallback for direct execution
+    if __package__:
+        # Imported from the package: a real failure (e.g. missing mercantile)
+        raise
+    from tile_grid import lnglat_bounds
 
 
 class MBTilesWriter:
@@ -71,13 +77,11 @@ class MBTilesWriter:
         except Exception:
             self._batch_sleep_sec = 0.0
 
-        # Track basic bounds and zoom range while writing tiles
+        # Track basic bounds and zoom range while writing tiles: per zoom
+        # the inclusive tile index extent, converted to lon/lat on finalize
         self._min_z = math.inf
         self._max_z = -math.inf
-        self._min_lon = math.inf
-        self._min_lat = math.inf
-        self._max_lon = -math.inf
-        self._max_lat = -math.inf
+        self._extents: dict[int, list[int]] = {}
         # Optional extra metadata entries to write at finalize
         self._extra_metadata = extra_metadata or {}
 
@@ -138,13 +142,20 @@ class MBTilesWriter:
             pass
 
     def _update_bounds(self, z: int, x: int, y: int) -> None:
-        self._min_z = min(self._min_z, z)
-        self._max_z = max(self._max_z, z)
-        bounds = mercantile.bounds(x, y, z)
-        self._min_lon = min(self._min_lon, bounds.west)
-        self._min_lat = min(self._min_lat, bounds.south)
-        self._max_lon = max(self._max_lon, bounds.east)
-        self._max_lat = max(self._max_lat, bounds.north)
+        extent = self._extents.get(z)
+        if extent is None:
+            self._extents[z] = [x, y, x, y]
+            self._min_z = min(self._min_z, z)
+            self._max_z = max(self._max_z, z)
+            return
+        if x < extent[0]:
+            extent[0] = x
+        elif x > extent[2]:
+            extent[2] = x
+        if y < extent[1]:
+            extent[1] = y
+        elif y > extent[3]:
+            extent[3] = y
 
     def add_tiles(self, tiles: Iterable[Tuple[int, int, int, bytes]], batch_size: int = 250) -> None:
         """Insert tiles into the MBTiles file.
@@ -255,13 +266,16 @@ class MBTilesWriter:
         max_z = self._max_z if max_zoom is None else max_zoom
 
         center_zoom = int(0.5 * (min_z + max_z))
-        center_lon = 0.5 * (self._min_lon + self._max_lon)
-        center_lat = 0.5 * (self._min_lat + self._max_lat)
+        min_lon, min_lat, max_lon, max_lat = lnglat_bounds(self._extents) or (
+            math.inf, math.inf, -math.inf, -math.inf
+        )
+        center_lon = 0.5 * (min_lon + max_lon)
+        center_lat = 0.5 * (min_lat + max_lat)
 
         metadata = {
             "name": self.path.stem,
             "format": "webp",
-            "bounds": f"{self._min_lon},{self._min_lat},{self._max_lon},{self._max_lat}",
+            "bounds": f"{min_lon},{min_lat},{max_lon},{max_lat}",
             "minzoom": str(int(min_z)),
             "maxzoom": str(int(max_z)),
             "center": f"{center_lon},{center_lat},{center_zoom}",
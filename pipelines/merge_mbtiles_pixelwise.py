@@ -31,6 +31,7 @@ import numpy as np
 from . import imagecodecs
 from .convert_terrarium import encode_terrarium
 from .mbtiles_writer import create_mbtiles_from_tiles
+from .terrarium_decode import decode_terrarium, decode_terrarium_batch
 
 
 def xyz_from_row(z: int, x: int, tms_y: int) -> Tuple[int, int, int]:
@@ -60,27 +61,37 @@ def read_tile_blob(conn: sqlite3.Connection, z: int, x: int, y: int) -> Optional
     return row[0] if row else None
 
 
-def terrarium_to_elevation(arr: np.ndarray) -> np.ndarray:
-    """Convert an RGB(A) uint8 array to elevation float array.
-
-    Expect either (H,W,3) or (H,W,4); use the first three channels.
-    """
-    if arr.ndim != 3 or arr.shape[2] < 3:
-        raise ValueError("Unexpected tile shape for Terrarium decoding")
-    r = arr[..., 0].astype(np.float32)
-    g = arr[..., 1].astype(np.float32)
-    b = arr[..., 2].astype(np.float32)
-    elev = (r * 256.0) + g + (b / 256.0) - 32768.0
-    return elev
-
-
 def merge_tiles_pixelwise(
-    mbtiles_paths: List[Path], mode: str = "max", verbose: bool = True
+    mbtiles_paths: List[Path],
+    mode: str = "max",
+    verbose: bool = True,
+    encode_threads: Optional[int] = None,
 ) -> Iterable[Tuple[int, int, int, bytes]]:
     """Yield merged tiles (z,x,y,webp_bytes) by pixel-wise composition.
 
     mode: 'max' or 'priority'
+    encode_threads: WebP encoder threads (default: FUSI_ENCODE_THREADS)
     """
+    def encode(item: Tuple[int, int, int, np.ndarray]) -> Optional[Tuple[int, int, int, bytes]]:
+        z, x, y, elev = item
+        try:
+            rgb = encode_terrarium(elev, z)
+            return z, x, y, imagecodecs.webp_encode(rgb, lossless=True)
+        except Exception as exc:
+            if verbose:
+                print(f"Warning: failed to encode tile z{z}/x{x}/y{y}: {exc}")
+            return None
+
+    # Tiles are composed on this thread while earlier ones encode on the pool
+    with imagecodecs.WebPEncoder(encode_threads) as encoder:
+        for tile in encoder.map(encode, _merged_elevations(mbtiles_paths, mode, verbose)):
+            if tile is not None:
+                yield tile
+
+
+def _merged_elevations(
+    mbtiles_paths: List[Path], mode: str, verbose: bool
+) -> Iterable[Tuple[int, int, int, np.ndarray]]:
     # Open DB connections
     conns = [sqlite3.connect(str(p)) for p in mbtiles_paths]
 
@@ -97,51 +108,28 @@ def merge_tiles_pixelwise(
 
         # Process tiles in sorted order by z,x,y for determinism
         for z, x, y in sorted(all_keys):
-            tiles_stack: List[np.ndarray] = []
-            for conn in conns:
-                blob = read_tile_blob(conn, z, x, y)
-                if not blob:
-                    tiles_stack.append(None)
-                else:
-                    try:
-                        arr = imagecodecs.webp_decode(blob)
-                        tiles_stack.append(arr)
-                    except Exception:
-                        tiles_stack.append(None)
-
-            # If no tile available at all, skip
-            if all(t is None for t in tiles_stack):
-                continue
+            blobs = [blob for blob in (read_tile_blob(conn, z, x, y) for conn in conns) if blob]
 
             if mode == "priority":
-                # Take first available tile (tile-level priority)
-                chosen = next(t for t in tiles_stack if t is not None)
-                # Convert to elevation and re-encode via Terrarium to normalize
-                elev = terrarium_to_elevation(chosen)
-            else:
-                # 'max' mode: compute per-pixel max elevation
-                elevs = []
-                for t in tiles_stack:
-                    if t is None:
-                        continue
+                # Take first decodable tile (tile-level priority) and
+                # re-encode it via Terrarium to normalize
+                elev = None
+                for blob in blobs:
                     try:
-                        elevs.append(terrarium_to_elevation(t))
+                        elev = decode_terrarium(blob)
+                        break
                     except Exception:
                         continue
-                if not elevs:
+                if elev is None:
+                    continue
+            else:
+                # 'max' mode: compute per-pixel max elevation
+                stacked = decode_terrarium_batch(blobs, skip_errors=True)
+                if stacked is None:
                     continue
-                stacked = np.stack(elevs, axis=0)
                 elev = np.nanmax(stacked, axis=0)
 
-            # Encode Terrarium RGB at this zoom
-            try:
-                rgb = encode_terrarium(elev, z)
-                webp = imagecodecs.webp_encode(rgb, lossless=True)
-                yield z, x, y, webp
-            except Exception as exc:
-                if verbose:
-                    print(f"Warning: failed to encode tile z{z}/x{x}/y{y}: {exc}")
-                continue
+            yield z, x, y, elev
 
     finally:
         for c in conns:
@@ -157,14 +145,30 @@ def main(argv: List[str] | None = None) -> int:
     parser.add_argument("-o", "--output", required=True, help="Output MBTiles path")
     parser.add_argument("--mode", choices=["max", "priority"], default="max", help="Merge mode")
     parser.add_argument("--verbose", action='store_true', help="Verbose output")
+    parser.add_argument(
+        "--encode-threads",
+        type=int,
+        default=imagecodecs.default_encode_threads(),
+        help="WebP encoder threads (env: FUSI_ENCODE_THREADS)",
+    )
+    parser.add_argument(
+        "--codec-backend",
+        choices=imagecodecs.available_backends(),
+        default=None,
+        help="WebP codec library for decoding and encoding (default: env FUSI_WEBP_BACKEND, else pillow)",
+    )
     args = parser.parse_args(argv)
+    if args.codec_backend:
+        imagecodecs.set_backend(args.codec_backend)
 
     inputs = [Path(p) for p in args.inputs]
     out = Path(args.output)
     if out.exists():
         out.unlink()
 
-    tiles_gen = merge_tiles_pixelwise(inputs, mode=args.mode, verbose=args.verbose)
+    tiles_gen = merge_tiles_pixelwise(
+        inputs, mode=args.mode, verbose=args.verbose, encode_threads=args.encode_threads
+    )
     if args.verbose:
         print(f"Writing merged MBTiles: {out}")
     create_mbtiles_from_tiles(tiles_gen, out)
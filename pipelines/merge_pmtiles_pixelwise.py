@@ -16,7 +16,7 @@ from __future__ import annotations
 import argparse
 import sqlite3
 from pathlib import Path
-from typing import List, Optional, Set, Tuple
+from typing import Iterator, List, Optional, Set, Tuple
 
 import numpy as np
 
@@ -30,6 +30,7 @@ from pmtiles.writer import Writer
 
 from . import imagecodecs
 from .convert_terrarium import encode_terrarium
+from .terrarium_decode import decode_terrarium, decode_terrarium_batch
 
 
 def read_tile_blob(conn: sqlite3.Connection, z: int, x: int, y: int) -> Optional[bytes]:
@@ -42,16 +43,6 @@ def read_tile_blob(conn: sqlite3.Connection, z: int, x: int, y: int) -> Optional
     return row[0] if row else None
 
 
-def terrarium_to_elevation(arr: np.ndarray) -> np.ndarray:
-    if arr.ndim != 3 or arr.shape[2] < 3:
-        raise ValueError("Unexpected tile shape for Terrarium decoding")
-    r = arr[..., 0].astype(np.float32)
-    g = arr[..., 1].astype(np.float32)
-    b = arr[..., 2].astype(np.float32)
-    elev = (r * 256.0) + g + (b / 256.0) - 32768.0
-    return elev
-
-
 def gather_zoom_keys(conns: List[sqlite3.Connection], z: int) -> Set[Tuple[int, int, int]]:
     keys = set()
     for conn in conns:
@@ -81,10 +72,55 @@ def get_min_max_zoom(conns: List[sqlite3.Connection]) -> Tuple[int, int]:
     return minz, maxz
 
 
+def merged_zoom_elevations(
+    conns: List[sqlite3.Connection], z: int, keys: Set[Tuple[int, int, int]], mode: str
+) -> Iterator[Tuple[int, int, int, np.ndarray]]:
+    """Yield (z, x, y, elevation) for the merged tiles of one zoom, in key order."""
+    for (_, x, y) in sorted(keys):
+        # Collect tile blobs in input priority order
+        blobs = [read_tile_blob(c, z, x, y) for c in conns]
+        if all(b is None for b in blobs):
+            continue
+
+        if mode == "priority":
+            chosen_blob = next((b for b in blobs if b is not None), None)
+            if chosen_blob is None:
+                continue
+            try:
+                elev = decode_terrarium(chosen_blob)
+            except Exception:
+                # If decode fails, skip
+                continue
+        else:
+            stacked = decode_terrarium_batch([b for b in blobs if b is not None], skip_errors=True)
+            if stacked is None:
+                continue
+            elev = np.nanmax(stacked, axis=0)
+
+        yield z, x, y, elev
+
+
 def write_pmtiles_from_mbtiles(
-    input_paths: List[Path], output_path: Path, mode: str = "priority", verbose: bool = True
+    input_paths: List[Path],
+    output_path: Path,
+    mode: str = "priority",
+    verbose: bool = True,
+    encode_threads: Optional[int] = None,
 ) -> None:
     conns = [sqlite3.connect(str(p)) for p in input_paths]
+
+    def encode(item: Tuple[int, int, int, np.ndarray]) -> Optional[Tuple[int, int, int, bytes]]:
+        z, x, y, elev = item
+        # Encode to Terrarium RGB and write as WebP
+        try:
+            rgb = encode_terrarium(elev, z)
+            return z, x, y, imagecodecs.webp_encode(rgb, lossless=True)
+        except Exception as exc:
+            if verbose:
+                print(f"Warning: failed to encode tile z{z}/x{x}/y{y}: {exc}")
+            return None
+
+    encoder = imagecodecs.WebPEncoder(encode_threads)
     try:
         minz, maxz = get_min_max_zoom(conns)
 
@@ -108,45 +144,11 @@ def write_pmtiles_from_mbtiles(
                 if verbose:
                     print(f"Processing z{z}: {len(keys)} tiles")
 
-                for (_, x, y) in sorted(keys):
-                    # Collect tile blobs in input priority order
-                    blobs = [read_tile_blob(c, z, x, y) for c in conns]
-                    if all(b is None for b in blobs):
-                        continue
-
-                    if mode == "priority":
-                        chosen_blob = next((b for b in blobs if b is not None), None)
-                        if chosen_blob is None:
-                            continue
-                        try:
-                            arr = imagecodecs.webp_decode(chosen_blob)
-                            elev = terrarium_to_elevation(arr)
-                        except Exception:
-                            # If decode fails, skip
-                            continue
-                    else:
-                        elevs = []
-                        for b in blobs:
-                            if b is None:
-                                continue
-                            try:
-                                arr = imagecodecs.webp_decode(b)
-                                elevs.append(terrarium_to_elevation(arr))
-                            except Exception:
-                                continue
-                        if not elevs:
-                            continue
-                        stacked = np.stack(elevs, axis=0)
-                        elev = np.nanmax(stacked, axis=0)
-
-                    # Encode to Terrarium RGB and write as WebP
-                    try:
-                        rgb = encode_terrarium(elev, z)
-                        webp = imagecodecs.webp_encode(rgb, lossless=True)
-                    except Exception as exc:
-                        if verbose:
-                            print(f"Warning: failed to encode tile z{z}/x{x}/y{y}: {exc}")
+                # Tiles are merged on this thread while earlier ones encode on the pool
+                for encoded in encoder.map(encode, merged_zoom_elevations(conns, z, keys, mode)):
+                    if encoded is None:
                         continue
+                    _, x, y, webp = encoded
 
                     # update bounds
                     if mercantile is not None:
@@ -189,6 +191,7 @@ def write_pmtiles_from_mbtiles(
                 print(f"Wrote PMTiles: {output_path}")
 
     finally:
+        encoder.close()
         for c in conns:
             try:
                 c.close()
@@ -202,11 +205,27 @@ def main(argv: List[str] | None = None) -> int:
     parser.add_argument("-o", "--output", required=True, help="Output PMTiles path")
     parser.add_argument("--mode", choices=["priority", "max"], default="priority", help="Merge mode")
     parser.add_argument("--verbose", action='store_true', help="Verbose output")
+    parser.add_argument(
+        "--encode-threads",
+        type=int,
+        default=imagecodecs.default_encode_threads(),
+        help="WebP encoder threads (env: FUSI_ENCODE_THREADS)",
+    )
+    parser.add_argument(
+        "--codec-backend",
+        choices=imagecodecs.available_backends(),
+        default=None,
+        help="WebP codec library for decoding and encoding (default: env FUSI_WEBP_BACKEND, else pillow)",
+    )
     args = parser.parse_args(argv)
+    if args.codec_backend:
+        imagecodecs.set_backend(args.codec_backend)
 
     inputs = [Path(p) for p in args.inputs]
     out = Path(args.output)
-    write_pmtiles_from_mbtiles(inputs, out, mode=args.mode, verbose=args.verbose)
+    write_pmtiles_from_mbtiles(
+        inputs, out, mode=args.mode, verbose=args.verbose, encode_threads=args.encode_threads
+    )
     return 0
 
 
@@ -0,0 +1,215 @@
+"""Build lower-zoom elevation tiles from their children (overview pyramid).
+
+In pyramid mode the aggregator renders only `max_zoom` from the source
+GeoTIFFs. Every z-1 tile is then made from its four z children: the
+children's float32 elevations are stitched into a 2x tile and reduced with
+a NaN-aware 2x2 mean, so a parent pixel averages whichever of its four
+child pixels hold data and stays NaN only when all four are empty. The
+caller re-encodes each parent with its own zoom's vertical resolution.
+
+Children are addressed in XYZ order; child (2x + dx, 2y + dy) lands in the
+parent quadrant (dx, dy) with dy = 0 being the northern half.
+
+`DepthFirstPyramid` walks the quadtree depth-first in Morton (Z) order:
+leaves are rendered, and each parent is reduced and emitted as soon as its
+fourth child is done. At most four tiles per level of the current path are
+buffered, so peak memory is O(depth x 4) tiles regardless of area.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Any, Callable, Dict, Generator, Iterable, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+
+TileKey = Tuple[int, int]
+PyramidTile = Tuple[int, int, int, np.ndarray]
+
+__all__ = [
+    "CHILD_OFFSETS",
+    "downsample_2x2",
+    "combine_children",
+    "build_parent_level",
+    "DepthFirstPyramid",
+    "iter_morton_tiles",
+]
+
+# (dx, dy) of the four children, in NW, NE, SW, SE order
+CHILD_OFFSETS: Tuple[TileKey, ...] = ((0, 0), (1, 0), (0, 1), (1, 1))
+
+
+def downsample_2x2(arr: np.ndarray) -> np.ndarray:
+    """Halve `arr` with a NaN-aware 2x2 mean (float32 in, float32 out)."""
+    h, w = arr.shape
+    if h % 2 or w % 2:
+        raise ValueError("downsample_2x2 needs even dimensions")
+    quads = (arr[0::2, 0::2], arr[0::2, 1::2], arr[1::2, 0::2], arr[1::2, 1::2])
+    total = np.zeros((h // 2, w // 2), dtype=np.float32)
+    count = np.zeros((h // 2, w // 2), dtype=np.float32)
+    for q in quads:
+        valid = ~np.isnan(q)
+        total += np.where(valid, q, np.float32(0.0))
+        count += valid
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = total / count
+    out[count == 0] = np.nan
+    return out
+
+
+def combine_children(children: Sequence[Optional[np.ndarray]], tile_size: int = 512) -> Optional[np.ndarray]:
+    """Build a parent tile from its children given in `CHILD_OFFSETS` order.
+
+    Missing children (None) are treated as all-NaN. Returns None when no
+    child carries data.
+    """
+    if len(children) != 4:
+        raise ValueError("combine_children expects exactly four children")
+    if all(c is None for c in children):
+        return None
+    half = tile_size // 2
+    parent = np.full((tile_size, tile_size), np.nan, dtype=np.float32)
+    for (dx, dy), child in zip(CHILD_OFFSETS, children):
+        if child is None:
+            continue
+        if child.shape != (tile_size, tile_size):
+            raise ValueError(f"child tile has shape {child.shape}, expected {(tile_size, tile_size)}")
+        parent[dy * half : (dy + 1) * half, dx * half : (dx + 1) * half] = downsample_2x2(child)
+    if np.isnan(parent).all():
+        return None
+    return parent
+
+
+def build_parent_level(
+    level: Dict[TileKey, np.ndarray], tile_size: int = 512
+) -> Iterator[Tuple[TileKey, np.ndarray]]:
+    """Yield `((x, y), parent)` for every parent with at least one child in `level`.
+
+    `level` maps child (x, y) to its float32 tile at a single zoom. Parents
+    are produced in row-major order.
+    """
+    parents: Dict[TileKey, list] = defaultdict(lambda: [None, None, None, None])
+    for (x, y), arr in level.items():
+        parents[(x >> 1, y >> 1)][CHILD_OFFSETS.index((x & 1, y & 1))] = arr
+    for key in sorted(parents, key=lambda k: (k[1], k[0])):
+        parent = combine_children(parents[key], tile_size=tile_size)
+        if parent is not None:
+            yield key, parent
+
+
+def iter_morton_tiles(
+    target_zoom: int,
+    root: Tuple[int, int, int] = (0, 0, 0),
+    prune: Optional[Callable[[int, int, int, Any], Any]] = None,
+    state: Any = None,
+) -> Iterator[Tuple[int, int, int, Any]]:
+    """Yield `(z, x, y, state)` for tiles at `target_zoom` under `root` in Morton order.
+
+    `prune` has the same contract as in `DepthFirstPyramid`, so the two
+    visit the same tiles in the same order.
+    """
+    z, x, y = root
+    if prune is not None:
+        state = prune(z, x, y, state)
+        if state is None:
+            return
+    if z >= target_zoom:
+        yield z, x, y, state
+        return
+    for dx, dy in CHILD_OFFSETS:
+        yield from iter_morton_tiles(target_zoom, (z + 1, 2 * x + dx, 2 * y + dy), prune, state)
+
+
+class DepthFirstPyramid:
+    """Post-order quadtree walk that renders leaves and reduces parents on the fly.
+
+    `render_leaf(z, x, y, state)` returns the float32 tile at `max_zoom` (or
+    None). `prune(z, x, y, state)` is called for every node before it is
+    visited and returns the state handed to that node's children and leaf
+    renderer (e.g. the candidate sources narrowed to the node), or None to
+    skip the node's whole subtree.
+
+    Tiles are yielded as `(z, x, y, array)` for every zoom in
+    `[min_zoom, max_zoom]`; consumers must not modify the arrays, which are
+    still needed to build their parent.
+    """
+
+    def __init__(
+        self,
+        max_zoom: int,
+        render_leaf: Callable[[int, int, int, Any], Optional[np.ndarray]],
+        prune: Optional[Callable[[int, int, int, Any], Any]] = None,
+        min_zoom: int = 0,
+        tile_size: int = 512,
+    ) -> None:
+        if min_zoom > max_zoom:
+            raise ValueError("min_zoom cannot be larger than max_zoom")
+        self.max_zoom = max_zoom
+        self.min_zoom = min_zoom
+        self.render_leaf = render_leaf
+        self.prune = prune
+        self.tile_size = tile_size
+        self.visited = 0
+        self.buffered = 0
+        self.peak_buffered = 0
+
+    def _hold(self, n: int) -> None:
+        self.buffered += n
+        self.peak_buffered = max(self.peak_buffered, self.buffered)
+
+    def walk(self, z: int, x: int, y: int, state: Any = None) -> Generator[PyramidTile, None, Optional[np.ndarray]]:
+        """Walk the subtree rooted at z/x/y; the generator returns the root tile."""
+        if self.prune is not None:
+            state = self.prune(z, x, y, state)
+            if state is None:
+                return None
+        self.visited += 1
+
+        if z >= self.max_zoom:
+            tile = self.render_leaf(z, x, y, state)
+            if tile is not None:
+                yield z, x, y, tile
+            return tile
+
+        children: list = [None, None, None, None]
+        held = 0
+        for i, (dx, dy) in enumerate(CHILD_OFFSETS):
+            child = yield from self.walk(z + 1, 2 * x + dx, 2 * y + dy, state)
+            if child is not None:
+                children[i] = child
+                held += 1
+                self._hold(1)
+        parent = combine_children(children, tile_size=self.tile_size)
+        self.buffered -= held
+        if parent is not None and z >= self.min_zoom:
+            yield z, x, y, parent
+        return parent
+
+    def build(self, roots: Iterable[Tuple[int, int, int]], state: Any = None) -> Iterator[PyramidTile]:
+        """Walk every `(z, x, y)` root, then reduce the root tiles up to `min_zoom`.
+
+        Roots must share one zoom. Roots deeper than `min_zoom` (e.g. z6 subtrees
+        with `min_zoom=0`) keep their tiles until all roots are done, which
+        adds one tile per root to the memory ceiling.
+        """
+        level: Dict[TileKey, np.ndarray] = {}
+        root_zoom: Optional[int] = None
+        for z, x, y in roots:
+            if root_zoom is None:
+                root_zoom = z
+            elif z != root_zoom:
+                raise ValueError("all pyramid roots must share one zoom level")
+            tile = yield from self.walk(z, x, y, state)
+            if tile is not None and z > self.min_zoom:
+                level[(x, y)] = tile
+                self._hold(1)
+        if root_zoom is None:
+            return
+        for z in range(root_zoom - 1, self.min_zoom - 1, -1):
+            parents: Dict[TileKey, np.ndarray] = {}
+            for (x, y), tile in build_parent_level(level, tile_size=self.tile_size):
+                parents[(x, y)] = tile
+                yield z, x, y, tile
+            self.buffered -= len(level)
+            self._hold(len(parents))
+            level = parents
+        self.buffered -= len(level)
@@ -4,86 +4,288 @@ Generate bounds.csv for GeoTIFF files in a source directory.
 Following mapterhorn methodology - extracts bounding box in EPSG:3857 and raster dimensions.
 
 Usage:
-    python pipelines/source_bounds.py <source_name>
+    python pipelines/source_bounds.py <source_name> [--jobs N] [--incremental] [--rich] [--footprints]
 
 Example:
-    python pipelines/source_bounds.py japan_dem
+    python pipelines/source_bounds.py japan_dem --jobs 8 --incremental
 
 Output:
     source-store/<source_name>/bounds.csv
+
+Each row also records the file's size and mtime (`size`, `mtime_ns`).
+With --footprints, each file's valid-data footprint (see
+`footprints.py`) is stored in footprints.npz next to bounds.csv, so the
+aggregator can skip tiles in a file's nodata area without reading it;
+without it, a stale footprints.npz is removed.
+With --rich, rows additionally carry CRS, nodata, dtype, internal block
+size, overview count, valid-pixel fraction and elevation range (see
+`source_catalog.RICH_FIELDS`); computing the last three reads every pixel.
+With --incremental, rows of the existing bounds.csv whose filename, size
+and mtime are unchanged are reused and only new or modified files are
+opened. The CSV is written to a temporary file and renamed into place,
+so readers never see a partial file.
 """
 
-import sys
+import argparse
+import csv
 import math
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from glob import glob
+from typing import Dict, List, Optional, Sequence, Tuple
 
+import numpy as np
 import rasterio
 from rasterio.warp import transform_bounds
+from rasterio.windows import Window
 
+try:  # Allow running as a module or script
+    from .footprints import FOOTPRINTS_FILENAME, footprint_from_dataset, load_footprints, save_footprints
+    from .source_catalog import RICH_FIELDS, SourceRecord
+except ImportError:  # pragma: no cover - fallback for direct execution
+    from footprints import FOOTPRINTS_FILENAME, footprint_from_dataset, load_footprints, save_footprints
+    from source_catalog import RICH_FIELDS, SourceRecord
 
-def main():
-    if len(sys.argv) < 2:
-        print('Usage: python pipelines/source_bounds.py <source_name>')
-        print('Example: python pipelines/source_bounds.py japan_dem')
-        sys.exit(1)
-    
-    source = sys.argv[1]
+FIELDS = ['filename', 'left', 'bottom', 'right', 'top', 'width', 'height', 'size', 'mtime_ns']
+# Pixels per read when scanning a file for valid-data statistics
+STATS_CHUNK_PIXELS = 1 << 22
+
+
+def fields_for(rich: bool = False) -> List[str]:
+    return FIELDS + list(RICH_FIELDS) if rich else list(FIELDS)
+
+
+def read_bounds(filepath: str, rich: bool = False, footprint: bool = False) -> Tuple[List[str], List[str], Optional[tuple]]:
+    """Return the bounds.csv values for one GeoTIFF, without size/mtime.
+
+    The second list holds the `RICH_FIELDS` values when `rich` is set; the
+    third item is `(bounds, footprint)` when `footprint` is set.
+    """
+    with rasterio.open(filepath) as src:
+        if src.crs is None:
+            raise ValueError(f'CRS not defined on {filepath}')
+
+        # Transform bounds to EPSG:3857 (Web Mercator)
+        left, bottom, right, top = transform_bounds(
+            src.crs, 'EPSG:3857', *src.bounds
+        )
+
+        # Check for valid bounds
+        for num in [left, bottom, right, top]:
+            if not math.isfinite(num):
+                raise ValueError(
+                    f'Number in bounds is not finite. '
+                    f'src.bounds={src.bounds} src.crs={src.crs} '
+                    f'bounds={(left, bottom, right, top)}'
+                )
+
+        row = [Path(filepath).name, str(left), str(bottom), str(right), str(top), str(src.width), str(src.height)]
+        entry = None
+        if footprint:
+            record = SourceRecord(Path(filepath), left, bottom, right, top, src.width, src.height, 0.0, '', 0)
+            entry = ((left, bottom, right, top), footprint_from_dataset(src, record))
+        return row, (read_rich_metadata(src) if rich else []), entry
+
+
+def read_rich_metadata(src) -> List[str]:
+    """CRS, nodata, dtype, block size, overview count and valid-data stats of band 1."""
+    block_height, block_width = src.block_shapes[0]
+    # Whole blocks per read, so strip-organised files are not decoded twice
+    rows = max(block_height, STATS_CHUNK_PIXELS // max(src.width, 1) // block_height * block_height)
+    valid = 0
+    lo, hi = math.inf, -math.inf
+    for row_off in range(0, src.height, rows):
+        window = Window(0, row_off, src.width, min(rows, src.height - row_off))
+        data = src.read(1, window=window, masked=True)
+        values = data.compressed()
+        values = values[np.isfinite(values)]
+        if values.size:
+            valid += values.size
+            lo = min(lo, float(values.min()))
+            hi = max(hi, float(values.max()))
+    total = src.width * src.height
+    crs = src.crs.to_string() if src.crs is not None else ''
+    return [
+        crs,
+        '' if src.nodata is None else str(src.nodata),
+        src.dtypes[0],
+        str(block_width),
+        str(block_height),
+        str(len(src.overviews(1))),
+        str(valid / total if total else 0.0),
+        str(lo) if valid else '',
+        str(hi) if valid else '',
+    ]
+
+
+def _probe(filepath: str, rich: bool = False, footprint: bool = False) -> Tuple[Optional[List[str]], Optional[tuple], Optional[str]]:
+    """Pool task: (row, footprint entry, None) on success, (None, None, error message) on failure."""
+    try:
+        row, extra, entry = read_bounds(filepath, rich, footprint)
+        return row + extra, entry, None
+    except Exception as e:
+        return None, None, str(e)
+
+
+def load_existing_rows(bounds_file: Path, rich: bool = False) -> Dict[str, Dict[str, str]]:
+    """Rows of an existing bounds.csv that carry every needed column, keyed by filename."""
+    if not bounds_file.exists():
+        return {}
+    with bounds_file.open(newline='') as f:
+        reader = csv.DictReader(f)
+        if not set(fields_for(rich)).issubset(reader.fieldnames or []):
+            return {}
+        return {row['filename']: row for row in reader}
+
+
+def write_bounds_csv(bounds_file: Path, rows: Sequence[Sequence[str]], fields: Sequence[str] = FIELDS) -> None:
+    """Write `rows` under the bounds.csv header atomically (temp file + rename)."""
+    tmp = bounds_file.with_name(f'.{bounds_file.name}.{os.getpid()}.tmp')
+    try:
+        with tmp.open('w', newline='') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(fields)
+            writer.writerows(rows)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, bounds_file)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def build_bounds(
+    source_dir: Path, jobs: int = 1, incremental: bool = False, rich: bool = False, footprints: bool = False
+) -> Tuple[int, int]:
+    """Regenerate `source_dir/bounds.csv`; returns (rows written, files opened)."""
+    filepaths = sorted(glob(str(source_dir / '*.tif')))
+    if not filepaths:
+        return 0, 0
+    print(f'Found {len(filepaths)} GeoTIFF files')
+
+    bounds_file = source_dir / 'bounds.csv'
+    existing = load_existing_rows(bounds_file, rich) if incremental else {}
+    fields = fields_for(rich)
+    footprints_file = source_dir / FOOTPRINTS_FILENAME
+    stored = {}
+    if footprints and incremental and footprints_file.exists():
+        try:
+            stored = load_footprints(footprints_file)
+        except Exception as e:
+            print(f'Warning: ignoring unreadable {footprints_file}: {e}')
+    entries = {}
+
+    rows: List[Optional[List[str]]] = [None] * len(filepaths)
+    stats = []
+    todo = []
+    for j, filepath in enumerate(filepaths):
+        # Stat before opening, so a file changed while being read is re-read next time
+        st = os.stat(filepath)
+        stat_values = [str(st.st_size), str(st.st_mtime_ns)]
+        stats.append(stat_values)
+        name = Path(filepath).name
+        old = existing.get(name)
+        if old is not None and footprints and name not in stored:
+            old = None
+        if old is not None and [old['size'], old['mtime_ns']] == stat_values:
+            rows[j] = [old[field] for field in fields]
+            if footprints:
+                entries[name] = stored[name]
+        else:
+            todo.append(j)
+    if incremental:
+        print(f'Reusing {len(filepaths) - len(todo)} rows; opening {len(todo)} new or modified files')
+
+    def results():
+        paths = [filepaths[j] for j in todo]
+        if jobs > 1 and len(paths) > 1:
+            # spawn: GDAL state is not fork-safe
+            with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context('spawn')) as pool:
+                chunksize = max(1, min(256, len(paths) // (jobs * 4)))
+                n = len(paths)
+                yield from pool.map(_probe, paths, [rich] * n, [footprints] * n, chunksize=chunksize)
+        else:
+            yield from (_probe(path, rich, footprints) for path in paths)
+
+    for done, (j, (row, entry, error)) in enumerate(zip(todo, results()), 1):
+        if error is not None:
+            print(f'Error processing {filepaths[j]}: {error}')
+        else:
+            rows[j] = row[:7] + stats[j] + row[7:]
+            if footprints:
+                entries[row[0]] = entry
+        if done % 100 == 0:
+            print(f'Processed {done} / {len(todo)}')
+
+    written = [row for row in rows if row is not None]
+    if footprints:
+        # Footprints first: bounds.csv never lists a file whose entry is missing
+        save_footprints(footprints_file, {row[0]: entries[row[0]] for row in written})
+    elif footprints_file.exists():
+        print(f'Removing {footprints_file} (not regenerated)')
+        footprints_file.unlink()
+    write_bounds_csv(bounds_file, written, fields)
+    return len(written), len(todo)
+
+
+def default_jobs() -> int:
+    """Return the worker process count from env `FUSI_BOUNDS_JOBS` (default 1)."""
+    try:
+        return max(1, int(os.environ.get('FUSI_BOUNDS_JOBS', '1')))
+    except (TypeError, ValueError):
+        return 1
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='Generate bounds.csv for the GeoTIFFs of a source')
+    parser.add_argument('source', help='Source name (directory under source-store/)')
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=default_jobs(),
+        help='Processes used to open GeoTIFFs (env FUSI_BOUNDS_JOBS, default 1)',
+    )
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Reuse rows of the existing bounds.csv whose file size and mtime are unchanged',
+    )
+    parser.add_argument(
+        '--rich',
+        action='store_true',
+        help='Also record CRS, nodata, dtype, block size, overviews and valid-data stats (reads every pixel)',
+    )
+    parser.add_argument(
+        '--footprints',
+        action='store_true',
+        help=f'Store valid-data footprints in {FOOTPRINTS_FILENAME} for skipping nodata areas (reads every mask)',
+    )
+    args = parser.parse_args(argv)
+
+    source = args.source
     print(f'Creating bounds for {source}...')
-    
+
     source_dir = Path(f'source-store/{source}')
     if not source_dir.exists():
         print(f'Error: source-store/{source}/ does not exist')
         sys.exit(1)
-    
-    filepaths = sorted(glob(f'source-store/{source}/*.tif'))
-    
-    if not filepaths:
+
+    written, opened = build_bounds(
+        source_dir,
+        jobs=max(1, args.jobs),
+        incremental=args.incremental,
+        rich=args.rich,
+        footprints=args.footprints,
+    )
+    if not opened and not written:
         print(f'Warning: No .tif files found in source-store/{source}/')
         sys.exit(1)
-    
-    print(f'Found {len(filepaths)} GeoTIFF files')
-    
-    bounds_file_lines = ['filename,left,bottom,right,top,width,height\n']
-    
-    for j, filepath in enumerate(filepaths):
-        try:
-            with rasterio.open(filepath) as src:
-                if src.crs is None:
-                    raise ValueError(f'CRS not defined on {filepath}')
-                
-                # Transform bounds to EPSG:3857 (Web Mercator)
-                left, bottom, right, top = transform_bounds(
-                    src.crs, 'EPSG:3857', *src.bounds
-                )
-                
-                # Check for valid bounds
-                for num in [left, bottom, right, top]:
-                    if not math.isfinite(num):
-                        raise ValueError(
-                            f'Number in bounds is not finite. '
-                            f'src.bounds={src.bounds} src.crs={src.crs} '
-                            f'bounds={(left, bottom, right, top)}'
-                        )
-                
-                filename = Path(filepath).name
-                bounds_file_lines.append(
-                    f'{filename},{left},{bottom},{right},{top},{src.width},{src.height}\n'
-                )
-                
-                if (j + 1) % 100 == 0:
-                    print(f'Processed {j + 1} / {len(filepaths)}')
-        
-        except Exception as e:
-            print(f'Error processing {filepath}: {e}')
-            continue
-    
-    bounds_file = source_dir / 'bounds.csv'
-    with open(bounds_file, 'w') as f:
-        f.writelines(bounds_file_lines)
-    
-    print(f'Successfully created {bounds_file}')
-    print(f'Total files processed: {len(bounds_file_lines) - 1}')
+
+    print(f'Successfully created {source_dir / "bounds.csv"}')
+    print(f'Total files processed: {written}')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,283 @@
+"""Byte-budgeted cache of decoded source blocks shared by all tile reads.
+
+Adjacent output tiles at the same zoom read overlapping windows of the same
+GeoTIFFs. GDAL's block cache (`GDAL_CACHEMAX`) holds raw, still-typed
+blocks and is small by default, so the same data is re-decoded, converted
+to float32 and NaN-normalised over and over. `SourceBlockCache` keeps those
+decoded float32 blocks instead.
+
+Blocks live on a per-source "level" grid: level L samples the source with a
+decimation factor of 2**L (level 0 is full resolution), so a block key is
+`(source path, level, block_row, block_col)`. Decimated blocks are read with
+GDAL average resampling on windows aligned to the factor, so every level
+pixel is the nodata-aware mean of its 2**L x 2**L source pixels.
+
+The cache evicts least-recently-used blocks once `max_bytes` is exceeded and
+keeps hit/miss counters per zoom so its size can be tuned per machine.
+"""
+from __future__ import annotations
+
+import math
+import os
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from rasterio.enums import Resampling
+    from rasterio.transform import Affine
+    from rasterio.windows import Window
+except Exception:  # pragma: no cover - optional runtime dependency
+    Resampling = None
+    Affine = None
+    Window = None
+
+DEFAULT_SOURCE_CACHE_MB = 256
+CACHE_BLOCK_SIZE = 512
+
+__all__ = [
+    "SourceBlockCache",
+    "DEFAULT_SOURCE_CACHE_MB",
+    "CACHE_BLOCK_SIZE",
+    "default_source_cache_mb",
+    "get_shared_cache",
+    "configure_shared_cache",
+    "read_level_window",
+]
+
+
+def default_source_cache_mb() -> int:
+    """Return the cache budget from env `FUSI_SOURCE_CACHE_MB` (default 256)."""
+    try:
+        return max(0, int(os.environ.get("FUSI_SOURCE_CACHE_MB", str(DEFAULT_SOURCE_CACHE_MB))))
+    except (TypeError, ValueError):
+        return DEFAULT_SOURCE_CACHE_MB
+
+
+class SourceBlockCache:
+    """LRU cache of float32 arrays bounded by total `nbytes`.
+
+    A budget of 0 disables caching: `get` always misses and `put` is a no-op.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        if max_bytes < 0:
+            raise ValueError("max_bytes must be >= 0")
+        self.max_bytes = int(max_bytes)
+        self._blocks: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.evictions = 0
+        # zoom -> [hits, misses]; None collects reads made outside a zoom loop
+        self._zoom_stats: Dict[Optional[int], List[int]] = defaultdict(lambda: [0, 0])
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def __len__(self) -> int:
+        return len(self._blocks)
+
+    def get(self, key: Hashable, zoom: Optional[int] = None) -> Optional[np.ndarray]:
+        with self._lock:
+            block = self._blocks.get(key)
+            if block is None:
+                self._zoom_stats[zoom][1] += 1
+                return None
+            self._blocks.move_to_end(key)
+            self._zoom_stats[zoom][0] += 1
+            return block
+
+    def put(self, key: Hashable, block: np.ndarray) -> None:
+        size = int(block.nbytes)
+        if size > self.max_bytes:
+            return
+        # Cached blocks are shared between readers; guard against mutation
+        block.setflags(write=False)
+        with self._lock:
+            old = self._blocks.pop(key, None)
+            if old is not None:
+                self.current_bytes -= int(old.nbytes)
+            self._blocks[key] = block
+            self.current_bytes += size
+            self._evict_locked()
+
+    def resize(self, max_bytes: int) -> None:
+        if max_bytes < 0:
+            raise ValueError("max_bytes must be >= 0")
+        with self._lock:
+            self.max_bytes = int(max_bytes)
+            self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        while self.current_bytes > self.max_bytes and self._blocks:
+            _, old = self._blocks.popitem(last=False)
+            self.current_bytes -= int(old.nbytes)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._blocks.clear()
+            self.current_bytes = 0
+
+    def zoom_stats(self) -> Dict[Optional[int], Tuple[int, int]]:
+        """Return {zoom: (hits, misses)} for every zoom that touched the cache."""
+        with self._lock:
+            return {z: (v[0], v[1]) for z, v in self._zoom_stats.items()}
+
+    def format_stats(self, zoom: Optional[int] = None) -> str:
+        """One-line summary; restricted to `zoom` when given."""
+        stats = self.zoom_stats()
+        if zoom is not None:
+            hits, misses = stats.get(zoom, (0, 0))
+        else:
+            hits = sum(h for h, _ in stats.values())
+            misses = sum(m for _, m in stats.values())
+        total = hits + misses
+        rate = (hits / total * 100.0) if total else 0.0
+        return (
+            f"cache hit={hits} miss={misses} ({rate:.1f}% hits, "
+            f"{self.current_bytes / (1024 * 1024):.0f}/{self.max_bytes / (1024 * 1024):.0f} MiB, "
+            f"evict={self.evictions})"
+        )
+
+
+_shared_cache: Optional[SourceBlockCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_cache() -> SourceBlockCache:
+    """Return the process-wide block cache used by default by the tile readers."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = SourceBlockCache(default_source_cache_mb() * 1024 * 1024)
+        return _shared_cache
+
+
+def configure_shared_cache(max_mb: Optional[int] = None) -> SourceBlockCache:
+    """Resize the shared cache (e.g. from `--source-cache-mb`) and return it."""
+    cache = get_shared_cache()
+    if max_mb is not None:
+        cache.resize(int(max_mb) * 1024 * 1024)
+    return cache
+
+
+def _normalise(src, data: np.ndarray, window, out_shape) -> np.ndarray:
+    """Convert a raw read to float32 with invalid pixels set to NaN."""
+    arr = data.astype(np.float32, copy=False)
+    if src.nodata is not None:
+        if not (isinstance(src.nodata, float) and math.isnan(src.nodata)):
+            arr[arr == np.float32(src.nodata)] = np.nan
+    else:
+        try:
+            mask = src.read_masks(1, window=window, out_shape=out_shape)
+            arr[mask == 0] = np.nan
+        except Exception:
+            pass
+    return arr
+
+
+def _read_level_region(src, factor: int, r0: int, r1: int, c0: int, c1: int) -> np.ndarray:
+    """Read level-space rows [r0, r1) and cols [c0, c1) as NaN-normalised float32.
+
+    Level pixels that are fully inside the source are read from windows
+    aligned to `factor`; the trailing partial row/column (when the source
+    size is not a multiple of the factor) is read separately so it cannot
+    shift the alignment of its neighbours.
+    """
+    out = np.empty((r1 - r0, c1 - c0), dtype=np.float32)
+    full_rows = src.height // factor
+    full_cols = src.width // factor
+    row_parts = [(r0, min(r1, full_rows)), (max(r0, full_rows), r1)]
+    col_parts = [(c0, min(c1, full_cols)), (max(c0, full_cols), c1)]
+    for ra, rb in row_parts:
+        if ra >= rb:
+            continue
+        for ca, cb in col_parts:
+            if ca >= cb:
+                continue
+            row_start = ra * factor
+            col_start = ca * factor
+            window = Window(
+                col_start,
+                row_start,
+                min(cb * factor, src.width) - col_start,
+                min(rb * factor, src.height) - row_start,
+            )
+            shape = (rb - ra, cb - ca)
+            if factor == 1:
+                data = src.read(1, window=window, masked=False)
+                part = _normalise(src, data, window, None)
+            else:
+                data = src.read(1, window=window, out_shape=shape, resampling=Resampling.average, masked=False)
+                part = _normalise(src, data, window, shape)
+            out[ra - r0 : rb - r0, ca - c0 : cb - c0] = part
+    return out
+
+
+def read_level_window(
+    src,
+    path_key: str,
+    window,
+    factor: int = 1,
+    cache: Optional[SourceBlockCache] = None,
+    zoom: Optional[int] = None,
+    block_size: int = CACHE_BLOCK_SIZE,
+) -> Tuple[np.ndarray, "Affine"]:
+    """Read `window` (full-resolution pixel window) at decimation `factor`.
+
+    Returns `(array, transform)` where `array` is float32 with NaN for
+    nodata and `transform` maps the returned array into the source CRS.
+    The window is expanded outward to the level grid and read block by
+    block, so results are identical whether they come from the cache or
+    straight from the file.
+    """
+    if factor < 1 or (factor & (factor - 1)) != 0:
+        raise ValueError("factor must be a power of two")
+    level = int(math.log2(factor))
+    level_height = -(-src.height // factor)
+    level_width = -(-src.width // factor)
+
+    r0 = max(0, int(window.row_off) // factor)
+    c0 = max(0, int(window.col_off) // factor)
+    r1 = min(level_height, -(-int(window.row_off + window.height) // factor))
+    c1 = min(level_width, -(-int(window.col_off + window.width) // factor))
+
+    t = src.transform
+    transform = Affine(
+        t.a * factor, t.b, t.c + c0 * factor * t.a, t.d, t.e * factor, t.f + r0 * factor * t.e
+    )
+
+    use_cache = cache is not None and cache.enabled
+    out = np.empty((r1 - r0, c1 - c0), dtype=np.float32)
+    # Whole blocks are read even when nothing is cached: GDAL's decimated
+    # average is not stable across window shapes (rounding and nodata edges
+    # shift), so sharing the block grid keeps cached and uncached output
+    # bit-identical.
+    for br in range(r0 // block_size, (r1 - 1) // block_size + 1):
+        for bc in range(c0 // block_size, (c1 - 1) // block_size + 1):
+            key = (path_key, level, br, bc)
+            block = cache.get(key, zoom=zoom) if use_cache else None
+            b_r0 = br * block_size
+            b_c0 = bc * block_size
+            if block is None:
+                if factor == 1 and not use_cache:
+                    # Plain reads have no such issue; read just the overlap
+                    block_rows = (max(r0, b_r0), min(r1, b_r0 + block_size))
+                    block_cols = (max(c0, b_c0), min(c1, b_c0 + block_size))
+                else:
+                    block_rows = (b_r0, min(b_r0 + block_size, level_height))
+                    block_cols = (b_c0, min(b_c0 + block_size, level_width))
+                block = _read_level_region(src, factor, *block_rows, *block_cols)
+                if use_cache:
+                    cache.put(key, block)
+                b_r0, b_c0 = block_rows[0], block_cols[0]
+            rs0 = max(r0, b_r0)
+            rs1 = min(r1, b_r0 + block.shape[0])
+            cs0 = max(c0, b_c0)
+            cs1 = min(c1, b_c0 + block.shape[1])
+            out[rs0 - r0 : rs1 - r0, cs0 - c0 : cs1 - c0] = block[rs0 - b_r0 : rs1 - b_r0, cs0 - b_c0 : cs1 - b_c0]
+    return out, transform
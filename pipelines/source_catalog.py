@@ -0,0 +1,587 @@
+"""Columnar catalog of source GeoTIFFs (bounds.csv rows).
+
+Holding one `SourceRecord` NamedTuple plus a `Path` per GeoTIFF costs a
+few hundred bytes per file, which adds up to gigabytes for national
+1 m / 5 m DEM collections. `SourceCatalog` keeps the same fields in NumPy
+columns instead (bounds, width, height, pixel size, priority, source id)
+and stores filenames in one bytes blob, resolving them against an interned
+per-source directory. That is about 60 bytes plus the filename per record.
+
+`SourceCatalog.cached` compiles a source's bounds.csv once into a
+directory of `.npy` columns next to it (`bounds.catalog/`), keyed by the
+CSV's size and mtime. Later loads memory-map the columns instead of
+parsing the CSV and stat-ing every GeoTIFF, so spawned workers start in
+milliseconds and share one page-cache copy of the columns. A catalog
+loaded this way pickles as a reference to its cache files.
+
+A bounds.csv written by `source_bounds.py --rich` also carries the
+`RICH_FIELDS` (CRS, nodata, dtype, block size, overview count, valid-pixel
+fraction and elevation range). They are kept in `extra` columns and
+exposed on records (None when not recorded), so planning can use them
+without opening files. Rows with no valid pixel are skipped on load.
+
+The catalog is a read-only sequence: `catalog[i]` returns a `SourceRef`,
+a two-slot view with the attributes of `SourceRecord` (`path`, `left`,
+`bounds_mercator`, ...), so code written against records keeps working.
+Views are created on access; two views of the same row compare and hash
+equal, so use the view itself (not `id()`) as a dict/set key.
+
+Usage:
+    catalog = SourceCatalog.from_bounds_csv(Path("source-store/dem1a/bounds.csv"), "dem1a", priority=0)
+    merged = SourceCatalog.concat([catalog, other])
+    for ref in merged:
+        print(ref.path, ref.bounds_mercator)
+"""
+from __future__ import annotations
+
+import csv
+import json
+import math
+import os
+from array import array
+from collections import abc
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# Bump when the cache layout changes; stale caches are then rebuilt
+CACHE_VERSION = 2
+
+# Optional bounds.csv columns written by `source_bounds.py --rich`
+RICH_FIELDS = (
+    "crs",
+    "nodata",
+    "dtype",
+    "block_width",
+    "block_height",
+    "overviews",
+    "valid_fraction",
+    "min_elevation",
+    "max_elevation",
+)
+# Storage dtype per rich column; text columns hold ids into `labels`
+_EXTRA_DTYPES = {
+    "crs": np.uint16,
+    "nodata": np.float64,
+    "dtype": np.uint16,
+    "block_width": np.int32,
+    "block_height": np.int32,
+    "overviews": np.int16,
+    "valid_fraction": np.float64,
+    "min_elevation": np.float32,
+    "max_elevation": np.float32,
+}
+_LABELLED = ("crs", "dtype")
+
+_CACHE_COLUMNS = ("bounds", "width", "height", "pixel_size", "name_offsets", "names")
+
+__all__ = ["CACHE_VERSION", "RICH_FIELDS", "SourceCatalog", "SourceRecord", "SourceRef", "catalog_cache_dir"]
+
+
+class SourceRecord(NamedTuple):
+    """Lightweight tuple-like record for a single GeoTIFF derived from bounds.csv.
+
+    Using NamedTuple reduces per-record memory compared to a full dataclass
+    while preserving attribute access (e.g. `r.left`). Catalogs of many
+    files use `SourceCatalog` instead; `SourceRef.record()` converts.
+    The trailing fields are the optional `RICH_FIELDS` (None = unknown).
+    """
+
+    path: Path
+    left: float
+    bottom: float
+    right: float
+    top: float
+    width: int
+    height: int
+    pixel_size: float
+    source: str
+    priority: int
+    crs: Optional[str] = None
+    nodata: Optional[float] = None
+    dtype: Optional[str] = None
+    block_width: Optional[int] = None
+    block_height: Optional[int] = None
+    overviews: Optional[int] = None
+    valid_fraction: Optional[float] = None
+    min_elevation: Optional[float] = None
+    max_elevation: Optional[float] = None
+
+    @property
+    def bounds_mercator(self) -> Tuple[float, float, float, float]:
+        return self.left, self.bottom, self.right, self.top
+
+
+class SourceRef:
+    """View of one catalog row with the attributes of `SourceRecord`."""
+
+    __slots__ = ("catalog", "index")
+
+    def __init__(self, catalog: "SourceCatalog", index: int) -> None:
+        self.catalog = catalog
+        self.index = index
+
+    @property
+    def path(self) -> Path:
+        return self.catalog.path(self.index)
+
+    @property
+    def left(self) -> float:
+        return float(self.catalog.bounds[self.index, 0])
+
+    @property
+    def bottom(self) -> float:
+        return float(self.catalog.bounds[self.index, 1])
+
+    @property
+    def right(self) -> float:
+        return float(self.catalog.bounds[self.index, 2])
+
+    @property
+    def top(self) -> float:
+        return float(self.catalog.bounds[self.index, 3])
+
+    @property
+    def bounds_mercator(self) -> Tuple[float, float, float, float]:
+        left, bottom, right, top = self.catalog.bounds[self.index].tolist()
+        return left, bottom, right, top
+
+    @property
+    def width(self) -> int:
+        return int(self.catalog.width[self.index])
+
+    @property
+    def height(self) -> int:
+        return int(self.catalog.height[self.index])
+
+    @property
+    def pixel_size(self) -> float:
+        return float(self.catalog.pixel_size[self.index])
+
+    @property
+    def source(self) -> str:
+        return self.catalog.sources[self.catalog.source_id[self.index]]
+
+    @property
+    def priority(self) -> int:
+        return int(self.catalog.priority[self.index])
+
+    def record(self) -> SourceRecord:
+        """Materialise this row as a standalone `SourceRecord`."""
+        return SourceRecord(
+            self.path,
+            self.left,
+            self.bottom,
+            self.right,
+            self.top,
+            self.width,
+            self.height,
+            self.pixel_size,
+            self.source,
+            self.priority,
+            *(getattr(self, name) for name in RICH_FIELDS),
+        )
+
+    def _replace(self, **changes) -> SourceRecord:
+        return self.record()._replace(**changes)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, SourceRef):
+            return NotImplemented
+        return self.catalog is other.catalog and self.index == other.index
+
+    def __hash__(self) -> int:
+        return hash((id(self.catalog), self.index))
+
+    def __repr__(self) -> str:
+        return f"SourceRef({self.index}, path={str(self.path)!r}, priority={self.priority})"
+
+
+def _extra_property(name: str) -> property:
+    return property(lambda self: self.catalog.extra_value(name, self.index))
+
+
+for _name in RICH_FIELDS:
+    setattr(SourceRef, _name, _extra_property(_name))
+
+
+class _Builder:
+    """Append-only column buffers used while reading bounds.csv files."""
+
+    def __init__(self, rich: bool = False) -> None:
+        self.extra: Optional[Dict[str, list]] = {name: [] for name in RICH_FIELDS} if rich else None
+        self.labels: Dict[str, Dict[str, int]] = {name: {} for name in _LABELLED}
+        self.bounds = array("d")
+        self.width = array("i")
+        self.height = array("i")
+        self.pixel_size = array("d")
+        self.names = bytearray()
+        self.offsets = array("Q", [0])
+
+    def add(self, name: str, left: float, bottom: float, right: float, top: float, width: int, height: int, pixel_size: float) -> None:
+        self.bounds.extend((left, bottom, right, top))
+        self.width.append(width)
+        self.height.append(height)
+        self.pixel_size.append(pixel_size)
+        self.names += name.encode("utf-8")
+        self.offsets.append(len(self.names))
+
+    def add_extra(self, row: Dict[str, str]) -> None:
+        for name in RICH_FIELDS:
+            text = row[name].strip()
+            if name in _LABELLED:
+                value = self.labels[name].setdefault(text, len(self.labels[name]))
+            elif not text:
+                value = math.nan
+            elif name in ("block_width", "block_height", "overviews"):
+                value = int(text)
+            else:
+                value = float(text)
+            self.extra[name].append(value)
+
+    def extra_columns(self) -> Tuple[Optional[Dict[str, np.ndarray]], Optional[Dict[str, List[str]]]]:
+        if self.extra is None:
+            return None, None
+        columns = {name: np.asarray(values, dtype=_EXTRA_DTYPES[name]) for name, values in self.extra.items()}
+        return columns, {name: list(table) for name, table in self.labels.items()}
+
+    def __len__(self) -> int:
+        return len(self.width)
+
+
+class SourceCatalog(abc.Sequence):
+    """Read-only columnar table of source GeoTIFFs; items are `SourceRef` views.
+
+    Columns are public NumPy arrays: `bounds` (N, 4) Mercator
+    left/bottom/right/top, `width`, `height`, `pixel_size`, `priority` and
+    `source_id` (index into `sources` / `directories`). `extra` maps each
+    of the `RICH_FIELDS` to a column (None when bounds.csv has none); the
+    text columns `crs` and `dtype` hold ids into `labels[name]`, and NaN
+    marks missing numbers.
+    """
+
+    def __init__(
+        self,
+        bounds: np.ndarray,
+        width: np.ndarray,
+        height: np.ndarray,
+        pixel_size: np.ndarray,
+        priority: np.ndarray,
+        source_id: np.ndarray,
+        names: bytes,
+        name_offsets: np.ndarray,
+        sources: Sequence[str],
+        directories: Sequence[Union[str, Path]],
+        extra: Optional[Dict[str, np.ndarray]] = None,
+        labels: Optional[Dict[str, List[str]]] = None,
+    ) -> None:
+        self.bounds = np.ascontiguousarray(bounds, dtype=np.float64).reshape(-1, 4)
+        self.width = np.asarray(width, dtype=np.int32)
+        self.height = np.asarray(height, dtype=np.int32)
+        self.pixel_size = np.asarray(pixel_size, dtype=np.float64)
+        self.priority = np.asarray(priority, dtype=np.int32)
+        self.source_id = np.asarray(source_id, dtype=np.uint16)
+        if isinstance(names, (bytes, bytearray)):
+            names = np.frombuffer(bytes(names), dtype=np.uint8)
+        self._names = np.asarray(names, dtype=np.uint8)
+        self._offsets = np.asarray(name_offsets, dtype=np.uint64)
+        self.sources = list(sources)
+        self.directories = [Path(d) for d in directories]
+        self.extra = None
+        self.labels: Dict[str, List[str]] = {}
+        if extra is not None:
+            self.extra = {name: np.asarray(extra[name], dtype=_EXTRA_DTYPES[name]) for name in RICH_FIELDS}
+            self.labels = {name: list(labels[name]) for name in _LABELLED}
+        # (bounds_path, source, priority, cache key) per part when memory-mapped
+        self._origin: Optional[Tuple[Tuple[Path, str, int, Dict[str, int]], ...]] = None
+
+    @classmethod
+    def empty(cls) -> "SourceCatalog":
+        return cls(np.empty((0, 4)), [], [], [], [], [], b"", [0], [], [])
+
+    @classmethod
+    def from_bounds_csv(cls, bounds_path: Path, source_name: str, priority: int = 0) -> "SourceCatalog":
+        """Read one source's bounds.csv, skipping missing files and invalid bounds."""
+        empty = 0
+        with bounds_path.open() as fp:
+            reader = csv.DictReader(fp)
+            required = {"filename", "left", "bottom", "right", "top", "width", "height"}
+            missing = required.difference(reader.fieldnames or [])
+            if missing:
+                raise ValueError(f"bounds.csv is missing columns: {sorted(missing)}")
+            builder = _Builder(rich=set(RICH_FIELDS).issubset(reader.fieldnames))
+
+            for row in reader:
+                tif_path = bounds_path.parent / row["filename"]
+                if not tif_path.exists():
+                    print(f"Warning: Skipping missing file {tif_path}")
+                    continue
+
+                width = int(row["width"])
+                height = int(row["height"])
+                left = float(row["left"])
+                bottom = float(row["bottom"])
+                right = float(row["right"])
+                top = float(row["top"])
+
+                if not (math.isfinite(left) and math.isfinite(bottom) and math.isfinite(right) and math.isfinite(top)):
+                    print(f"Warning: Skipping invalid bounds for {tif_path}")
+                    continue
+
+                span_x = max(abs(right - left), 1e-6)
+                span_y = max(abs(top - bottom), 1e-6)
+                pixel_size = max(span_x / max(width, 1), span_y / max(height, 1))
+                if builder.extra is not None:
+                    if row["valid_fraction"].strip() and float(row["valid_fraction"]) == 0.0:
+                        empty += 1
+                        continue
+                    builder.add_extra(row)
+                builder.add(row["filename"], left, bottom, right, top, width, height, pixel_size)
+
+        if empty:
+            print(f"Skipping {empty} files without valid data in {bounds_path}")
+        n = len(builder)
+        return cls(
+            np.frombuffer(builder.bounds, dtype=np.float64),
+            np.frombuffer(builder.width, dtype=np.int32),
+            np.frombuffer(builder.height, dtype=np.int32),
+            np.frombuffer(builder.pixel_size, dtype=np.float64),
+            np.full(n, priority, dtype=np.int32),
+            np.zeros(n, dtype=np.uint16),
+            bytes(builder.names),
+            np.frombuffer(builder.offsets, dtype=np.uint64),
+            [source_name],
+            [bounds_path.parent],
+            *builder.extra_columns(),
+        )
+
+    @classmethod
+    def cached(cls, bounds_path: Path, source_name: str, priority: int = 0) -> "SourceCatalog":
+        """Like `from_bounds_csv`, but through the compiled cache next to bounds.csv.
+
+        The cache is rebuilt when bounds.csv changes size or mtime. Files
+        added or removed without touching bounds.csv are not noticed.
+        """
+        key = _cache_key(bounds_path)
+        catalog = _read_cache(bounds_path, source_name, priority, key)
+        if catalog is not None:
+            return catalog
+        catalog = cls.from_bounds_csv(bounds_path, source_name, priority)
+        try:
+            _write_cache(catalog, catalog_cache_dir(bounds_path), key)
+        except OSError as exc:
+            print(f"Warning: could not write catalog cache for {bounds_path}: {exc}")
+            return catalog
+        # Re-open memory-mapped so this process shares the pages too
+        return _read_cache(bounds_path, source_name, priority, key) or catalog
+
+    @classmethod
+    def concat(cls, catalogs: Sequence["SourceCatalog"]) -> "SourceCatalog":
+        """Join catalogs in order; their source tables are appended."""
+        if not catalogs:
+            return cls.empty()
+        if len(catalogs) == 1:
+            return catalogs[0]
+        source_ids, offsets, sources, directories = [], [], [], []
+        base = 0
+        for catalog in catalogs:
+            source_ids.append(catalog.source_id.astype(np.int64) + len(sources))
+            offsets.append(catalog._offsets[1:] + np.uint64(base))
+            base += len(catalog._names)
+            sources.extend(catalog.sources)
+            directories.extend(catalog.directories)
+        if len(sources) > np.iinfo(np.uint16).max:
+            raise ValueError("too many sources for one catalog")
+        extra, labels = None, None
+        if all(c.extra is not None for c in catalogs):
+            extra, labels = _concat_extra(catalogs)
+        catalog = cls(
+            np.concatenate([c.bounds for c in catalogs]),
+            np.concatenate([c.width for c in catalogs]),
+            np.concatenate([c.height for c in catalogs]),
+            np.concatenate([c.pixel_size for c in catalogs]),
+            np.concatenate([c.priority for c in catalogs]),
+            np.concatenate(source_ids),
+            np.concatenate([c._names for c in catalogs]),
+            np.concatenate([np.zeros(1, dtype=np.uint64)] + offsets),
+            sources,
+            directories,
+            extra,
+            labels,
+        )
+        if all(c._origin for c in catalogs):
+            catalog._origin = sum((c._origin for c in catalogs), ())
+        return catalog
+
+    def __reduce_ex__(self, protocol):
+        if self._origin:
+            return _load_origin, (self._origin,)
+        return super().__reduce_ex__(protocol)
+
+    def __len__(self) -> int:
+        return len(self.width)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [SourceRef(self, i) for i in range(*index.indices(len(self)))]
+        n = len(self)
+        index = int(index)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("catalog index out of range")
+        return SourceRef(self, index)
+
+    def __iter__(self) -> Iterator[SourceRef]:
+        for i in range(len(self)):
+            yield SourceRef(self, i)
+
+    def filename(self, index: int) -> str:
+        start, stop = int(self._offsets[index]), int(self._offsets[index + 1])
+        return self._names[start:stop].tobytes().decode("utf-8")
+
+    def path(self, index: int) -> Path:
+        return self.directories[self.source_id[index]] / self.filename(index)
+
+    def records(self) -> List[SourceRecord]:
+        """Materialise every row as a `SourceRecord` (for small catalogs)."""
+        return [ref.record() for ref in self]
+
+    def extra_value(self, name: str, index: int) -> Any:
+        """Value of rich column `name` for row `index`, or None when unknown."""
+        if self.extra is None:
+            return None
+        value = self.extra[name][index]
+        if name in self.labels:
+            return self.labels[name][value] or None
+        value = value.item()
+        if isinstance(value, float) and math.isnan(value):
+            return None
+        return value
+
+    def union_bounds(self) -> Tuple[float, float, float, float]:
+        if not len(self):
+            raise ValueError("empty catalog has no bounds")
+        left, bottom = self.bounds[:, :2].min(axis=0).tolist()
+        right, top = self.bounds[:, 2:].max(axis=0).tolist()
+        return left, bottom, right, top
+
+    def overlapping(self, box: Tuple[float, float, float, float]) -> List[SourceRef]:
+        """Rows whose bounds overlap `box` (touching edges do not), in catalog order."""
+        left, bottom, right, top = box
+        b = self.bounds
+        hit = (b[:, 2] > left) & (b[:, 0] < right) & (b[:, 3] > bottom) & (b[:, 1] < top)
+        return [SourceRef(self, int(i)) for i in np.flatnonzero(hit)]
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns and the filename blob."""
+        arrays = [self.bounds, self.width, self.height, self.pixel_size, self.priority, self.source_id, self._offsets]
+        arrays += list((self.extra or {}).values())
+        return sum(a.nbytes for a in arrays) + self._names.nbytes
+
+
+def catalog_cache_dir(bounds_path: Path) -> Path:
+    """Directory holding the compiled catalog of `bounds_path`."""
+    return bounds_path.with_suffix(".catalog")
+
+
+def _cache_key(bounds_path: Path) -> Dict[str, int]:
+    st = bounds_path.stat()
+    return {"version": CACHE_VERSION, "csv_size": st.st_size, "csv_mtime_ns": st.st_mtime_ns}
+
+
+def _read_cache(bounds_path: Path, source_name: str, priority: int, key: Dict[str, int]) -> Optional[SourceCatalog]:
+    """Memory-map a compiled catalog, or return None if it is missing or stale."""
+    cache_dir = catalog_cache_dir(bounds_path)
+    try:
+        meta = json.loads((cache_dir / "meta.json").read_text())
+        if any(meta.get(k) != v for k, v in key.items()):
+            return None
+        cols = {name: np.load(cache_dir / f"{name}.npy", mmap_mode="r") for name in _CACHE_COLUMNS}
+        labels = meta.get("labels")
+        extra = None
+        if labels is not None:
+            extra = {name: np.load(cache_dir / f"extra_{name}.npy", mmap_mode="r") for name in RICH_FIELDS}
+    except (OSError, ValueError):
+        return None
+    n = int(meta.get("count", -1))
+    if len(cols["width"]) != n or len(cols["name_offsets"]) != n + 1:
+        return None
+    catalog = SourceCatalog(
+        cols["bounds"],
+        cols["width"],
+        cols["height"],
+        cols["pixel_size"],
+        np.full(n, priority, dtype=np.int32),
+        np.zeros(n, dtype=np.uint16),
+        cols["names"],
+        cols["name_offsets"],
+        [source_name],
+        [bounds_path.parent],
+        extra,
+        labels,
+    )
+    catalog._origin = ((bounds_path, source_name, priority, key),)
+    return catalog
+
+
+def _write_cache(catalog: SourceCatalog, cache_dir: Path, key: Dict[str, int]) -> None:
+    """Write a single-source catalog's columns; meta.json goes last and marks the cache valid."""
+    cache_dir.mkdir(exist_ok=True)
+    meta_path = cache_dir / "meta.json"
+    try:
+        meta_path.unlink()
+    except FileNotFoundError:
+        pass
+    tmp_suffix = f".{os.getpid()}.tmp"
+    columns: Dict[str, Any] = {
+        "bounds": catalog.bounds,
+        "width": catalog.width,
+        "height": catalog.height,
+        "pixel_size": catalog.pixel_size,
+        "name_offsets": catalog._offsets,
+        "names": catalog._names,
+    }
+    for name, column in (catalog.extra or {}).items():
+        columns[f"extra_{name}"] = column
+    for name, column in columns.items():
+        tmp = cache_dir / f"{name}.npy{tmp_suffix}"
+        with tmp.open("wb") as fp:
+            np.save(fp, np.ascontiguousarray(column))
+        os.replace(tmp, cache_dir / f"{name}.npy")
+    tmp = cache_dir / f"meta.json{tmp_suffix}"
+    meta = dict(key, count=len(catalog))
+    if catalog.extra is not None:
+        meta["labels"] = catalog.labels
+    tmp.write_text(json.dumps(meta))
+    os.replace(tmp, meta_path)
+
+
+def _concat_extra(catalogs: Sequence[SourceCatalog]) -> Tuple[Dict[str, np.ndarray], Dict[str, List[str]]]:
+    """Join rich columns, merging the label tables of the text columns."""
+    extra: Dict[str, np.ndarray] = {}
+    labels: Dict[str, List[str]] = {}
+    for name in RICH_FIELDS:
+        if name not in _LABELLED:
+            extra[name] = np.concatenate([c.extra[name] for c in catalogs])
+            continue
+        table: Dict[str, int] = {}
+        parts = []
+        for c in catalogs:
+            remap = np.array([table.setdefault(label, len(table)) for label in c.labels[name]], dtype=np.int64)
+            parts.append(remap[c.extra[name]] if len(remap) else c.extra[name])
+        extra[name] = np.concatenate(parts)
+        labels[name] = list(table)
+    return extra, labels
+
+
+def _load_origin(origin: Tuple[Tuple[Path, str, int, Dict[str, int]], ...]) -> SourceCatalog:
+    """Unpickle a memory-mapped catalog by re-opening its cache files."""
+    parts = []
+    for bounds_path, source_name, priority, key in origin:
+        part = _read_cache(bounds_path, source_name, priority, key)
+        if part is None:
+            raise RuntimeError(f"catalog cache for {bounds_path} changed while in use")
+        parts.append(part)
+    return SourceCatalog.concat(parts)
@@ -17,7 +17,8 @@ from pathlib import Path
 from typing import List, Optional, Sequence, Tuple
 
 from .aggregate_by_zoom import aggregate_zoom_range
-from .aggregate_pmtiles import build_records_from_sources, SourceRecord, emit_lineage_from_mbtiles
+from .aggregate_pmtiles import build_records_from_sources, emit_lineage_from_mbtiles, load_bounds
+from .source_catalog import SourceCatalog
 from .merge_mbtiles import merge_mbtiles_files
 from .zoom_split_config import (
     get_split_pattern,
@@ -26,6 +27,7 @@ from .zoom_split_config import (
     ZoomGroup,
 )
 from .memory_monitor import get_rss_bytes, format_bytes
+from .tile_workers import default_workers
 from .uss_monitor import USSMonitor
 from .spinner import register_gc_spinner
 import csv
@@ -52,6 +54,8 @@ def run_split_aggregate(
     watchdog_interval_seconds: float = 0.5,
     emit_lineage: bool = False,
     lineage_suffix: str = "-lineage",
+    pyramid: bool = False,
+    workers: int = 1,
 ) -> None:
     """Zoom分割を使ったaggregate処理を実行する。
 
@@ -67,6 +71,8 @@ def run_split_aggregate(
         warp_threads: warpスレッド数
         overwrite: 既存ファイルを上書きするか
         keep_intermediates: 中間ファイルを保持するか
+        pyramid: 各グループで max_zoom のみソースから生成し、下位ズームは子タイルから縮小するか
+        workers: 各グループのタイル生成を行うワーカープロセス数
     """
     output_pmtiles = Path(output_pmtiles)
     output_dir = output_pmtiles.parent
@@ -96,18 +102,25 @@ def run_split_aggregate(
         except Exception:
             pass
 
-    # By default avoid building the full list of SourceRecord objects in
+    # By default avoid building the source catalog in
     # the parent process to reduce peak memory usage. When running with
     # spawn_per_group=True we will let each worker subprocess load the
     # records it needs. If running in-process (spawn_per_group=False)
     # we must build records here.
-    records: Optional[List[SourceRecord]] = None
+    records: Optional[SourceCatalog] = None
     if not spawn_per_group:
         if verbose:
             print("Loading source records (in-process mode)...")
         records = build_records_from_sources(sources)
         if verbose:
             print(f"Loaded {len(records)} source records\n")
+    else:
+        # Compile each bounds.csv once so group subprocesses memory-map it
+        for src_name in sources:
+            try:
+                load_bounds(src_name)
+            except Exception as exc:
+                print(f"Warning: could not prepare catalog for '{src_name}': {exc}")
 
     # 中間MBTilesファイルのパスリスト
     intermediate_mbtiles: List[Path] = []
@@ -191,11 +204,15 @@ def run_split_aggregate(
                     str(io_sleep_ms),
                     "--warp-threads",
                     str(warp_threads),
+                    "--workers",
+                    str(workers),
                 ]
                 if verbose:
                     cmd.append("--verbose")
                 if overwrite:
                     cmd.append("--overwrite")
+                if pyramid:
+                    cmd.append("--pyramid")
                 # Pass top-level source names (not per-file records). Passing
                 # one argument per GeoTIFF (records) easily exceeds the OS
                 # ARG_MAX and raises "Argument list too long" errors. Use the
@@ -258,6 +275,8 @@ def run_split_aggregate(
                     io_sleep_ms=io_sleep_ms,
                     warp_threads=warp_threads,
                     overwrite=overwrite,
+                    pyramid=pyramid,
+                    workers=workers,
                 )
 
             intermediate_mbtiles.append(intermediate_path)
@@ -568,6 +587,18 @@ def parse_args() -> argparse.Namespace:
         default="-lineage",
         help="Suffix to append for lineage MBTiles/PMTiles (default: -lineage)",
     )
+    parser.add_argument(
+        "--pyramid",
+        action="store_true",
+        default=os.environ.get("FUSI_PYRAMID", "").lower() in ("1", "true", "yes"),
+        help="In each group, build zooms below the group's max zoom from child tiles (env: FUSI_PYRAMID=1)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=default_workers(),
+        help="Render tiles in N worker processes per group (env: FUSI_WORKERS)",
+    )
     # Positional sources: one or more source names (e.g. dem1a dem5a)
     parser.add_argument(
         "sources",
@@ -615,6 +646,8 @@ def main() -> None:
             watchdog_interval_seconds=args.watchdog_interval_seconds,
             emit_lineage=getattr(args, 'emit_lineage', False),
             lineage_suffix=getattr(args, 'lineage_suffix', '-lineage'),
+            pyramid=args.pyramid,
+            workers=args.workers,
         )
     except KeyboardInterrupt:
         print("\n\nInterrupted by user")
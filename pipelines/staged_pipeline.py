@@ -0,0 +1,248 @@
+"""Thread-pool stages connected by bounded queues (read -> encode -> write).
+
+A tile passes through I/O-heavy work (GeoTIFF decode, warp) and CPU-heavy
+work (Terrarium math, WebP encoding). Done one after another, only one of
+them is busy at a time. rasterio/GDAL reads and Pillow's WebP encoder both
+release the GIL, so giving each stage its own threads lets them overlap.
+
+`StagedPipeline` runs every stage in its own thread pool. Stages are
+connected by bounded queues and a feeder thread pulls items from the input
+iterable. Results come back in input order. At most `max_in_flight` items
+are between the feeder and the consumer at any time, so memory stays
+bounded when a later stage (or the writer consuming the results) is slow.
+
+A stage function returning None drops the item: later stages skip it and
+it is not yielded, but it still keeps its place in the output order.
+
+Per-stage statistics (busy time / utilisation and input queue depth) show
+which stage is the bottleneck. The consumer is reported as the final
+"write" stage: its busy time is the time spent outside the generator.
+
+Usage:
+    pipeline = StagedPipeline([Stage("read", render, 2), Stage("encode", encode, 2)])
+    for result in pipeline.run(tasks):
+        write(result)
+    print(pipeline.format_stats())
+"""
+from __future__ import annotations
+
+import heapq
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence
+
+__all__ = ["Stage", "StagedPipeline", "StageStats"]
+
+# Marks the end of the input in a stage queue
+_STOP = object()
+# Seconds between checks of the shutdown flag while blocked on a queue
+_POLL_S = 0.1
+
+
+class Stage(NamedTuple):
+    """One pipeline step: `fn(item) -> item or None`, run on `threads` threads."""
+
+    name: str
+    fn: Callable[[Any], Any]
+    threads: int = 1
+
+
+class _Failure(NamedTuple):
+    exc: BaseException
+
+
+class StageStats:
+    """Busy time and input-queue depth samples for one stage."""
+
+    def __init__(self, name: str, threads: int, queue_size: int) -> None:
+        self.name = name
+        self.threads = threads
+        self.queue_size = queue_size
+        self.items = 0
+        self.busy_s = 0.0
+        self.depth_total = 0
+        self.depth_samples = 0
+        self.depth_max = 0
+        self._lock = threading.Lock()
+
+    def record(self, busy_s: float, depth: int) -> None:
+        with self._lock:
+            self.items += 1
+            self.busy_s += busy_s
+            self.depth_total += depth
+            self.depth_samples += 1
+            self.depth_max = max(self.depth_max, depth)
+
+    def utilisation(self, elapsed_s: float) -> float:
+        """Fraction of the stage's thread time spent working."""
+        if elapsed_s <= 0:
+            return 0.0
+        return min(1.0, self.busy_s / (elapsed_s * self.threads))
+
+    def mean_depth(self) -> float:
+        return self.depth_total / self.depth_samples if self.depth_samples else 0.0
+
+
+class StagedPipeline:
+    """Ordered multi-stage thread pipeline with bounded queues."""
+
+    def __init__(
+        self,
+        stages: Sequence[Stage],
+        queue_size: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+    ) -> None:
+        if not stages:
+            raise ValueError("StagedPipeline needs at least one stage")
+        for stage in stages:
+            if stage.threads < 1:
+                raise ValueError(f"stage '{stage.name}' needs at least one thread")
+        self.stages = list(stages)
+        widest = max(s.threads for s in self.stages)
+        self.queue_size = int(queue_size) if queue_size else 2 * widest
+        self.max_in_flight = (
+            int(max_in_flight) if max_in_flight else self.queue_size * (len(self.stages) + 1) + widest * len(self.stages)
+        )
+        self.stats: List[StageStats] = [StageStats(s.name, s.threads, self.queue_size) for s in self.stages]
+        self.write_stats = StageStats("write", 1, self.queue_size)
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+
+    def elapsed(self) -> float:
+        if self._started is None:
+            return 0.0
+        return (self._finished or time.perf_counter()) - self._started
+
+    def run(self, items: Iterable[Any]) -> Iterator[Any]:
+        """Yield the results of all stages for `items`, in input order."""
+        closed = threading.Event()
+        slots = threading.Semaphore(self.max_in_flight)
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        threads: List[threading.Thread] = []
+
+        def put(q: "queue.Queue", entry: Any) -> bool:
+            while not closed.is_set():
+                try:
+                    q.put(entry, timeout=_POLL_S)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def feed() -> None:
+            seq = 0
+            source = iter(items)
+            try:
+                while True:
+                    # Take a slot before pulling, so the input is not read ahead
+                    while not slots.acquire(timeout=_POLL_S):
+                        if closed.is_set():
+                            return
+                    try:
+                        item = next(source)
+                    except StopIteration:
+                        break
+                    if not put(queues[0], (seq, item)):
+                        return
+                    seq += 1
+            except BaseException as exc:  # surfaced to the consumer in order
+                put(queues[0], (seq, _Failure(exc)))
+            for _ in range(self.stages[0].threads):
+                put(queues[0], _STOP)
+
+        def work(index: int, remaining: List[int], lock: threading.Lock) -> None:
+            stage = self.stages[index]
+            stats = self.stats[index]
+            inbox, outbox = queues[index], queues[index + 1]
+            while not closed.is_set():
+                try:
+                    entry = inbox.get(timeout=_POLL_S)
+                except queue.Empty:
+                    continue
+                if entry is _STOP:
+                    break
+                depth = inbox.qsize()
+                seq, value = entry
+                t0 = time.perf_counter()
+                if value is not None and not isinstance(value, _Failure):
+                    try:
+                        value = stage.fn(value)
+                    except BaseException as exc:
+                        value = _Failure(exc)
+                stats.record(time.perf_counter() - t0, depth)
+                if not put(outbox, (seq, value)):
+                    return
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                # The last thread of a stage forwards the end marker
+                downstream = self.stages[index + 1].threads if index + 1 < len(self.stages) else 1
+                for _ in range(downstream):
+                    put(outbox, _STOP)
+
+        threads.append(threading.Thread(target=feed, name="pipeline-feed", daemon=True))
+        for index, stage in enumerate(self.stages):
+            remaining, lock = [stage.threads], threading.Lock()
+            for n in range(stage.threads):
+                threads.append(
+                    threading.Thread(
+                        target=work, args=(index, remaining, lock), name=f"pipeline-{stage.name}-{n}", daemon=True
+                    )
+                )
+
+        self._started = time.perf_counter()
+        self._finished = None
+        for thread in threads:
+            thread.start()
+
+        results = queues[-1]
+        pending: List[Any] = []
+        next_seq = 0
+        try:
+            while True:
+                entry = results.get()
+                if entry is _STOP:
+                    break
+                heapq.heappush(pending, entry)
+                while pending and pending[0][0] == next_seq:
+                    _, value = heapq.heappop(pending)
+                    next_seq += 1
+                    slots.release()
+                    if isinstance(value, _Failure):
+                        raise value.exc
+                    if value is None:
+                        continue
+                    t0 = time.perf_counter()
+                    yield value
+                    self.write_stats.record(time.perf_counter() - t0, results.qsize() + len(pending))
+        finally:
+            closed.set()
+            self._finished = time.perf_counter()
+            for thread in threads:
+                thread.join()
+
+    def stage_stats(self) -> Dict[str, Dict[str, float]]:
+        """Return {stage: {threads, items, utilisation, queue_mean, queue_max}}, ending with "write"."""
+        elapsed = self.elapsed()
+        out: Dict[str, Dict[str, float]] = {}
+        for stats in self.stats + [self.write_stats]:
+            out[stats.name] = {
+                "threads": stats.threads,
+                "items": stats.items,
+                "utilisation": stats.utilisation(elapsed),
+                "queue_mean": stats.mean_depth(),
+                "queue_max": stats.depth_max,
+            }
+        return out
+
+    def format_stats(self) -> str:
+        """One-line summary, e.g. `read 2x 93% busy q=7.1/8 | encode 2x 41% busy q=0.3/8 | ...`."""
+        parts = []
+        for name, s in self.stage_stats().items():
+            parts.append(
+                f"{name} {s['threads']}x {s['utilisation'] * 100:.0f}% busy "
+                f"q={s['queue_mean']:.1f}/{self.queue_size}"
+            )
+        return " | ".join(parts)
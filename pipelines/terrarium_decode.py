@@ -0,0 +1,89 @@
+"""Terrarium decoding shared by the merge and inspection tools.
+
+Terrarium stores elevation as `R * 256 + G + B / 256 - 32768` metres. The
+tools used to decode WebP to RGBA, copy each channel to float32 and combine
+the three copies, allocating five full-size arrays per tile.
+
+Here WebP is decoded straight to RGB (`imagecodecs.webp_decode_rgb`, into a
+per-thread buffer that is reused across tiles) and elevation is computed
+with in-place ufuncs on the output array only: ((R * 256 + G) * 256 + B)
+/ 256 - 32768. Every step is exact in float32 (the largest intermediate is
+below 2**24), so the result is bit-identical to the per-channel formula.
+
+Usage:
+    elev = decode_terrarium(blob)                     # (H, W) float32
+    decode_terrarium(blob, out=elev)                  # reuse an output buffer
+    stack = decode_terrarium_batch(blobs, skip_errors=True)  # (N, H, W)
+"""
+from __future__ import annotations
+
+import threading
+from typing import Optional, Sequence
+
+import numpy as np
+
+try:  # Allow running as a module or script
+    from . import imagecodecs
+except ImportError:  # pragma: no cover - fallback for direct execution
+    import imagecodecs
+
+__all__ = ["decode_terrarium", "decode_terrarium_batch", "rgb_to_elevation"]
+
+_local = threading.local()
+
+
+def rgb_to_elevation(rgb: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Elevations (float32, metres) of an (..., 3) or (..., 4) uint8 Terrarium array."""
+    if rgb.ndim < 3 or rgb.shape[-1] < 3:
+        raise ValueError("Unexpected tile shape for Terrarium decoding")
+    shape = rgb.shape[:-1]
+    if out is None:
+        out = np.empty(shape, dtype=np.float32)
+    elif out.shape != shape or out.dtype != np.float32:
+        raise ValueError(f"out must be float32 with shape {shape}, got {out.dtype} {out.shape}")
+    np.multiply(rgb[..., 0], 256, out=out, dtype=np.float32)
+    np.add(out, rgb[..., 1], out=out)
+    np.multiply(out, 256, out=out)
+    np.add(out, rgb[..., 2], out=out)
+    np.multiply(out, 1.0 / 256.0, out=out)
+    np.subtract(out, 32768.0, out=out)
+    return out
+
+
+def _decode_rgb(blob: bytes) -> np.ndarray:
+    """Decode into this thread's RGB buffer; valid until the thread's next decode."""
+    rgb = _local.rgb = imagecodecs.webp_decode_rgb(blob, out=getattr(_local, "rgb", None))
+    return rgb
+
+
+def decode_terrarium(blob: bytes, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Decode a Terrarium WebP tile to float32 elevations (into `out` when given)."""
+    return rgb_to_elevation(_decode_rgb(blob), out=out)
+
+
+def decode_terrarium_batch(
+    blobs: Sequence[bytes],
+    out: Optional[np.ndarray] = None,
+    skip_errors: bool = False,
+) -> Optional[np.ndarray]:
+    """Decode tiles of one shape into an (N, H, W) float32 stack.
+
+    With `skip_errors`, blobs that fail to decode (or differ in shape) are
+    left out of the stack; otherwise the first failure is raised. Returns
+    None when nothing decoded. `out` needs room for every blob.
+    """
+    count = 0
+    for blob in blobs:
+        try:
+            rgb = _decode_rgb(blob)
+            if out is None:
+                out = np.empty((len(blobs),) + rgb.shape[:2], dtype=np.float32)
+            elif out.shape[1:] != rgb.shape[:2]:
+                raise ValueError(f"tile shape {rgb.shape[:2]} differs from the batch's {out.shape[1:]}")
+            rgb_to_elevation(rgb, out=out[count])
+        except Exception:
+            if not skip_errors:
+                raise
+            continue
+        count += 1
+    return out[:count] if count else None
@@ -0,0 +1,154 @@
+"""Vectorised XYZ tile-grid arithmetic for planning and scan loops.
+
+`mercantile.tiles()` yields one `Tile` per step and `mercantile.xy_bounds()`
+builds one bbox per call, which costs tens of millions of Python steps at
+z16 for counting alone. The tiles of a WGS84 bbox at one zoom are always a
+rectangle of tile indices, so this module works with inclusive ranges
+`(x0, y0, x1, y1)`:
+
+* `tile_range` / `zoom_ranges` give exactly the tiles `mercantile.tiles()`
+  enumerates for a bbox (same clamping and edge epsilon);
+* `range_count` / `count_tiles` / `tiles_in_subtree` count in closed form;
+* `xy_bounds_array` computes Mercator bounds for arrays of tiles, and
+  `iter_tiles` walks a range in `mercantile.tiles()` order (x outer, y
+  inner) with bounds computed a block at a time (`iter_tile_arrays` does
+  the same for arbitrary tile lists).
+
+Bounds use the same arithmetic as `mercantile.xy_bounds`, so values are
+bit-identical.
+
+Usage:
+    ranges = zoom_ranges(west, south, east, north, range(min_zoom, max_zoom + 1))
+    total = count_tiles(ranges)
+    for x, y, bounds in iter_tiles(ranges[z], z):
+        ...
+"""
+from __future__ import annotations
+
+import math
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+import mercantile
+import numpy as np
+
+# Web Mercator world width in metres (mercantile.CE)
+CE = 2 * math.pi * 6378137.0
+# Latitude limit and south/east epsilon used by mercantile.tiles()
+LAT_LIMIT = 85.051129
+LL_EPSILON = 1e-11
+# Tiles per vectorised block in `iter_tiles`
+DEFAULT_BLOCK = 4096
+
+TileRange = Tuple[int, int, int, int]
+
+__all__ = [
+    "CE",
+    "TileRange",
+    "count_tiles",
+    "iter_tile_arrays",
+    "iter_tiles",
+    "lnglat_bounds",
+    "range_count",
+    "tile_range",
+    "tiles_in_subtree",
+    "xy_bounds_array",
+    "zoom_ranges",
+]
+
+
+def tile_range(west: float, south: float, east: float, north: float, z: int) -> TileRange:
+    """Inclusive `(x0, y0, x1, y1)` of the tiles `mercantile.tiles()` yields at `z`.
+
+    Bboxes crossing the antimeridian (`west > east`) are not supported.
+    """
+    if west > east:
+        raise ValueError("tile_range does not support bboxes crossing the antimeridian")
+    west = max(-180.0, west)
+    south = max(-LAT_LIMIT, south)
+    east = min(180.0, east)
+    north = min(LAT_LIMIT, north)
+    ul = mercantile.tile(west, north, z)
+    lr = mercantile.tile(east - LL_EPSILON, south + LL_EPSILON, z)
+    return ul.x, ul.y, lr.x, lr.y
+
+
+def zoom_ranges(west: float, south: float, east: float, north: float, zooms: Iterable[int]) -> Dict[int, TileRange]:
+    """`tile_range` for every zoom in `zooms`."""
+    return {z: tile_range(west, south, east, north, z) for z in zooms}
+
+
+def range_count(r: TileRange) -> int:
+    x0, y0, x1, y1 = r
+    return max(0, x1 - x0 + 1) * max(0, y1 - y0 + 1)
+
+
+def count_tiles(ranges: Dict[int, TileRange]) -> int:
+    """Total number of tiles in `ranges`."""
+    return sum(range_count(r) for r in ranges.values())
+
+
+def tiles_in_subtree(z: int, x: int, y: int, ranges: Dict[int, TileRange]) -> int:
+    """Count the tiles of `ranges` inside the subtree of z/x/y (itself included)."""
+    total = 0
+    for zz, (x0, y0, x1, y1) in ranges.items():
+        if zz < z:
+            continue
+        d = zz - z
+        nx = min(x1, ((x + 1) << d) - 1) - max(x0, x << d) + 1
+        ny = min(y1, ((y + 1) << d) - 1) - max(y0, y << d) + 1
+        if nx > 0 and ny > 0:
+            total += nx * ny
+    return total
+
+
+def xy_bounds_array(z: int, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+    """Mercator `(left, bottom, right, top)` rows for tiles `(xs[i], ys[i])` at `z`."""
+    tile_size = CE / math.pow(2, z)
+    out = np.empty((len(xs), 4), dtype=np.float64)
+    out[:, 0] = np.asarray(xs, dtype=np.float64) * tile_size - CE / 2
+    out[:, 2] = out[:, 0] + tile_size
+    out[:, 3] = CE / 2 - np.asarray(ys, dtype=np.float64) * tile_size
+    out[:, 1] = out[:, 3] - tile_size
+    return out
+
+
+def iter_tiles(
+    r: TileRange, z: int, block: int = DEFAULT_BLOCK
+) -> Iterator[Tuple[int, int, mercantile.Bbox]]:
+    """Yield `(x, y, xy_bounds)` over range `r` in `mercantile.tiles()` order."""
+    x0, y0, x1, y1 = r
+    ny = y1 - y0 + 1
+    if x1 < x0 or ny <= 0:
+        return
+    ys_col = np.arange(y0, y1 + 1, dtype=np.int64)
+    cols = max(1, block // ny)
+    for cx in range(x0, x1 + 1, cols):
+        xs = np.repeat(np.arange(cx, min(cx + cols, x1 + 1), dtype=np.int64), ny)
+        ys = np.tile(ys_col, len(xs) // ny)
+        yield from iter_tile_arrays(z, xs, ys, len(xs))
+
+
+def iter_tile_arrays(
+    z: int, xs: np.ndarray, ys: np.ndarray, block: int = DEFAULT_BLOCK
+) -> Iterator[Tuple[int, int, mercantile.Bbox]]:
+    """Yield `(x, y, xy_bounds)` for tiles `(xs[i], ys[i])` at `z`, in array order."""
+    for start in range(0, len(xs), max(1, block)):
+        bx, by = xs[start : start + block], ys[start : start + block]
+        bounds = xy_bounds_array(z, bx, by).tolist()
+        for x, y, b in zip(np.asarray(bx).tolist(), np.asarray(by).tolist(), bounds):
+            yield x, y, mercantile.Bbox(*b)
+
+
+def lnglat_bounds(ranges: Dict[int, TileRange]) -> Optional[Tuple[float, float, float, float]]:
+    """WGS84 `(west, south, east, north)` covered by the tiles of `ranges`."""
+    out = None
+    for z, (x0, y0, x1, y1) in ranges.items():
+        if x1 < x0 or y1 < y0:
+            continue
+        ul, lr = mercantile.bounds(x0, y0, z), mercantile.bounds(x1, y1, z)
+        box = (ul.west, lr.south, lr.east, ul.north)
+        if out is None:
+            out = box
+        else:
+            out = (min(out[0], box[0]), min(out[1], box[1]), max(out[2], box[2]), max(out[3], box[3]))
+    return out
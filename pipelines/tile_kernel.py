@@ -0,0 +1,103 @@
+"""Per-thread tile kernel: priority merge and Terrarium encode in reusable buffers.
+
+Every emitted tile used to allocate a handful of full-size temporaries: the
+`np.where` results and masks of `merge_tile_candidates`, and in
+`encode_terrarium` the filled copy, the rounded and offset elevations, the
+fractional part and a fresh RGB array. At hundreds of tiles per second that
+is several GiB/s of short-lived allocations.
+
+`TileKernel` owns one set of tile-sized buffers and does both steps in
+place (`np.copyto(..., where=)` and ufuncs with `out=`). `merge` has the
+semantics of `merge_tile_candidates` (priority order, lazy, stops once no
+NaN is left) and `encode` runs `encode_terrarium` on the kernel's output
+and scratch buffers. Results are views into the kernel's buffers and stay
+valid only until its next call, so a kernel must not be shared between
+threads and merged tiles handed to another thread must be copied first;
+`get_tile_kernel` returns one kernel per thread and tile shape.
+
+`scripts/bench_tile_kernel.py` compares tiles/s and transient allocation
+per tile against the allocating functions.
+
+Usage:
+    kernel = get_tile_kernel()
+    merged = kernel.merge(reads)
+    if merged is not None:
+        webp = webp_encode(kernel.encode(merged, z))
+"""
+from __future__ import annotations
+
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+try:  # Allow running as a module or script
+    from .convert_terrarium import encode_terrarium
+except ImportError:  # pragma: no cover - fallback for direct execution
+    from convert_terrarium import encode_terrarium
+
+__all__ = ["TileKernel", "get_tile_kernel"]
+
+_local = threading.local()
+
+
+class TileKernel:
+    """Reusable float32/bool/uint8 buffers for merging and encoding `shape` tiles."""
+
+    def __init__(self, shape: Tuple[int, int] = (512, 512)) -> None:
+        self.shape = (int(shape[0]), int(shape[1]))
+        self.merged = np.empty(self.shape, dtype=np.float32)
+        self.rgb = np.empty(self.shape + (3,), dtype=np.uint8)
+        self._gaps = np.empty(self.shape, dtype=bool)
+        self._mask = np.empty(self.shape, dtype=bool)
+        self._work = np.empty(self.shape, dtype=np.float32)
+        self._steps = np.empty(self.shape, dtype=np.int32)
+
+    def merge(self, candidates: Iterable[Optional[np.ndarray]]) -> Optional[np.ndarray]:
+        """Fill NaN gaps of each candidate from the next one into `self.merged`.
+
+        Like `merge_tile_candidates`, `candidates` is consumed lazily and
+        only until no NaN pixel is left. Returns `self.merged`, or None when
+        every candidate was None.
+        """
+        merged, gaps, fill = self.merged, self._gaps, self._mask
+        started = False
+        for data in candidates:
+            if data is None:
+                continue
+            if not started:
+                np.copyto(merged, data)
+                np.isnan(merged, out=gaps)
+                started = True
+            else:
+                np.isnan(data, out=fill)
+                np.logical_not(fill, out=fill)
+                np.logical_and(fill, gaps, out=fill)
+                np.copyto(merged, data, where=fill)
+                # fill is a subset of gaps
+                np.logical_xor(gaps, fill, out=gaps)
+            if not gaps.any():
+                break
+        return merged if started else None
+
+    def encode(self, data: np.ndarray, z: int) -> np.ndarray:
+        """Terrarium RGB of `data` at zoom `z`, written into `self.rgb`.
+
+        `encode_terrarium` with the kernel's output and scratch buffers;
+        tiles of another shape get freshly allocated ones.
+        """
+        if data.shape != self.shape:
+            return encode_terrarium(data, z)
+        return encode_terrarium(data, z, out=self.rgb, scratch=(self._work, self._steps))
+
+
+def get_tile_kernel(shape: Tuple[int, int] = (512, 512)) -> TileKernel:
+    """Return this thread's kernel for `shape` tiles, creating it on first use."""
+    kernels: Optional[Dict[Tuple[int, int], TileKernel]] = getattr(_local, "kernels", None)
+    if kernels is None:
+        kernels = _local.kernels = {}
+    key = (int(shape[0]), int(shape[1]))
+    kernel = kernels.get(key)
+    if kernel is None:
+        kernel = kernels[key] = TileKernel(key)
+    return kernel
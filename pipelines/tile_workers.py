@@ -0,0 +1,282 @@
+"""Process pool that renders Terrarium tiles in parallel for the aggregator.
+
+Each worker process receives the full `SourceRecord` list once (pool
+initializer) and then renders tasks of the form `(z, x, y, candidate
+indices)`: read + warp + merge + Terrarium + `webp_encode`, merging and
+encoding in the worker's `TileKernel` buffers. Only the encoded WebP bytes
+travel back to the parent, where the single MBTiles writer consumes them.
+
+Results are yielded strictly in submission order, and at most
+`max_in_flight` tasks are outstanding, so output is deterministic for any
+worker count and memory stays bounded while the writer is the bottleneck.
+
+Besides single tiles, workers accept spatially compact chunks: every
+descendant of a chunk tile at the render zoom (`render_chunk_task`), or in
+pyramid mode the whole subtree below a chunk tile (`render_pyramid_chunk_task`).
+A chunk carries the indices of its candidate sources, so each worker only
+touches the files around its chunk and its dataset pool / block cache stay
+warm. Tiles inside a chunk are rendered in Morton order.
+
+Workers are started with the "spawn" method so no GDAL/SQLite state is
+inherited from the parent. Each worker keeps its own dataset pool and
+source block cache (sized from the same settings as the parent).
+"""
+from __future__ import annotations
+
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+try:
+    import mercantile
+except Exception:  # pragma: no cover - optional
+    mercantile = None
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+TileTask = Tuple[int, int, int, Tuple[int, ...]]
+TileResult = Tuple[int, int, int, Optional[bytes]]
+# (render zoom, chunk z, chunk x, chunk y, candidate indices)
+ChunkTask = Tuple[int, int, int, int, Tuple[int, ...]]
+# (render zoom, chunk z, chunk x, chunk y, [(z, x, y, webp)], checked tiles)
+ChunkResult = Tuple[int, int, int, int, List[Tuple[int, int, int, bytes]], int]
+# (chunk z, chunk x, chunk y, [(z, x, y, webp)], chunk root float32 or None, checked tiles)
+PyramidChunkResult = Tuple[int, int, int, List[Tuple[int, int, int, bytes]], Optional[Any], int]
+
+__all__ = [
+    "TileWorkerPool",
+    "default_workers",
+    "ordered_map",
+    "render_tile_task",
+    "render_chunk_task",
+    "render_pyramid_chunk_task",
+]
+
+# Per-process state installed by `_init_worker`
+_STATE: Dict[str, Any] = {}
+
+
+def default_workers() -> int:
+    """Return the worker count from env `FUSI_WORKERS` (default 1 = in-process)."""
+    try:
+        return max(1, int(os.environ.get("FUSI_WORKERS", "1")))
+    except (TypeError, ValueError):
+        return 1
+
+
+def ordered_map(
+    executor: Executor,
+    fn: Callable[[T], R],
+    items: Iterable[T],
+    max_in_flight: int,
+) -> Iterator[R]:
+    """Like `executor.map` but lazy: `items` is consumed only as results drain.
+
+    At most `max_in_flight` futures are pending at once and results are
+    yielded in the order of `items`.
+    """
+    if max_in_flight < 1:
+        raise ValueError("max_in_flight must be >= 1")
+    pending: deque = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= max_in_flight:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _aggregate_module():
+    try:
+        from . import aggregate_pmtiles
+    except ImportError:  # pragma: no cover - fallback for direct execution
+        import aggregate_pmtiles
+    return aggregate_pmtiles
+
+
+def _pyramid_module():
+    try:
+        from . import pyramid
+    except ImportError:  # pragma: no cover - fallback for direct execution
+        import pyramid
+    return pyramid
+
+
+def _init_worker(records: Sequence[Any], settings: Dict[str, Any]) -> None:
+    agg = _aggregate_module()
+    # A catalog stays columnar; plain record lists are copied as before
+    _STATE["records"] = records if isinstance(records, agg.SourceCatalog) else list(records)
+    _STATE["index"] = agg.SpatialIndex.from_records(_STATE["records"])
+    _STATE["settings"] = dict(settings)
+    # Culled records arrive as indices into the record sequence
+    _STATE["occluded"] = {
+        key: {_STATE["records"][i] for i in indices} for key, indices in settings.get("occluded", {}).items()
+    }
+    _STATE["footprints"] = {_STATE["records"][i]: fp for i, fp in settings.get("footprints", {}).items()}
+    agg.configure_shared_pool(settings.get("max_open_files"))
+    agg.configure_shared_cache(settings.get("source_cache_mb"))
+    if settings.get("codec_backend"):
+        agg.imagecodecs.set_backend(settings["codec_backend"])
+
+
+def render_tile_task(task: TileTask) -> TileResult:
+    """Render and encode one tile inside a worker; returns WebP bytes or None."""
+    agg = _aggregate_module()
+    z, x, y, candidate_indices = task
+    records = _STATE["records"]
+    return z, x, y, _render_and_encode(agg, [records[i] for i in candidate_indices], z, x, y)
+
+
+def _render_and_encode(agg, candidates, z: int, x: int, y: int) -> Optional[bytes]:
+    settings = _STATE["settings"]
+    # Rendered and encoded back to back, so the merge can reuse the kernel
+    merged = agg.render_tile_from_sources(
+        candidates,
+        mercantile.xy_bounds(x, y, z),
+        out_shape=(512, 512),
+        warp_threads=settings.get("warp_threads", 1),
+        read_mode=settings.get("read_mode", "auto"),
+        zoom=z,
+        warp_engine=settings.get("warp_engine", "gdal"),
+        kernel=agg.get_tile_kernel(),
+    )
+    if merged is None:
+        return None
+    return _encode(agg, merged, z, x, y)
+
+
+def _encode(agg, merged, z: int, x: int, y: int) -> Optional[bytes]:
+    try:
+        rgb = agg.get_tile_kernel(merged.shape).encode(merged, z)
+        return agg.imagecodecs.webp_encode(rgb, lossless=True)
+    except Exception as exc:  # pragma: no cover - defensive logging
+        print(f"Warning: Failed to encode tile {z}/{x}/{y}: {exc}")
+        return None
+
+
+def _chunk_pruner(agg, zooms: Iterable[int], count_from_zoom: int):
+    settings = _STATE["settings"]
+    checked = [0]
+
+    def add(n: int) -> None:
+        checked[0] += n
+
+    ranges = {z: settings["zoom_ranges"][z] for z in zooms}
+    prune = agg.make_candidate_pruner(
+        settings["bbox_mercator"],
+        ranges,
+        add,
+        count_from_zoom,
+        _STATE["occluded"],
+        _STATE["index"],
+        _STATE["footprints"],
+        settings.get("coverage"),
+    )
+    return prune, checked
+
+
+def render_chunk_task(task: ChunkTask) -> ChunkResult:
+    """Render every tile at the render zoom under a chunk tile, in Morton order."""
+    agg = _aggregate_module()
+    pyr = _pyramid_module()
+    z, cz, cx, cy, candidate_indices = task
+    records = _STATE["records"]
+    prune, checked = _chunk_pruner(agg, [z], count_from_zoom=z)
+    tiles: List[Tuple[int, int, int, bytes]] = []
+    for tz, x, y, candidates in pyr.iter_morton_tiles(
+        z, (cz, cx, cy), prune, [records[i] for i in candidate_indices]
+    ):
+        webp = _render_and_encode(agg, candidates, tz, x, y)
+        if webp is not None:
+            tiles.append((tz, x, y, webp))
+    return z, cz, cx, cy, tiles, checked[0]
+
+
+def render_pyramid_chunk_task(task: ChunkTask) -> PyramidChunkResult:
+    """Build the pyramid below a chunk tile; returns its encoded tiles and float32 root."""
+    agg = _aggregate_module()
+    pyr = _pyramid_module()
+    max_zoom, cz, cx, cy, candidate_indices = task
+    records = _STATE["records"]
+    # The chunk root itself is counted by the parent's traversal
+    prune, checked = _chunk_pruner(agg, range(cz, max_zoom + 1), count_from_zoom=cz + 1)
+
+    def render_leaf(z, x, y, candidates):
+        settings = _STATE["settings"]
+        return agg.render_tile_from_sources(
+            candidates,
+            mercantile.xy_bounds(x, y, z),
+            out_shape=(512, 512),
+            warp_threads=settings.get("warp_threads", 1),
+            read_mode=settings.get("read_mode", "auto"),
+            zoom=z,
+            warp_engine=settings.get("warp_engine", "gdal"),
+        )
+
+    builder = pyr.DepthFirstPyramid(max_zoom, render_leaf, prune=prune, min_zoom=cz)
+    walker = builder.walk(cz, cx, cy, [records[i] for i in candidate_indices])
+    tiles: List[Tuple[int, int, int, bytes]] = []
+    while True:
+        try:
+            z, x, y, merged = next(walker)
+        except StopIteration as stop:
+            root = stop.value
+            break
+        webp = _encode(agg, merged, z, x, y)
+        if webp is not None:
+            tiles.append((z, x, y, webp))
+    return cz, cx, cy, tiles, root, checked[0]
+
+
+class TileWorkerPool:
+    """Context manager around a spawn-based `ProcessPoolExecutor`.
+
+    Usage:
+        with TileWorkerPool(records, workers=8, settings={...}) as workers:
+            for z, x, y, webp in workers.imap(tasks):
+                ...
+    """
+
+    def __init__(
+        self,
+        records: Sequence[Any],
+        workers: int,
+        settings: Optional[Dict[str, Any]] = None,
+        max_in_flight: Optional[int] = None,
+    ) -> None:
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+        self.workers = int(workers)
+        self.max_in_flight = int(max_in_flight) if max_in_flight else 4 * self.workers
+        self._records = records
+        self._settings = dict(settings or {})
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def __enter__(self) -> "TileWorkerPool":
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self._records, self._settings),
+        )
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._executor is not None:
+            # Drop queued work on errors/interrupts instead of draining it
+            self._executor.shutdown(wait=True, cancel_futures=exc[0] is not None)
+            self._executor = None
+
+    def imap(
+        self,
+        tasks: Iterable[Any],
+        fn: Callable[[Any], Any] = render_tile_task,
+        max_in_flight: Optional[int] = None,
+    ) -> Iterator[Any]:
+        """Run `fn` (a task function of this module) over `tasks`, in task order."""
+        if self._executor is None:
+            raise RuntimeError("TileWorkerPool must be used as a context manager")
+        return ordered_map(self._executor, fn, tasks, max_in_flight or self.max_in_flight)
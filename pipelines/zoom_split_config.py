@@ -3,14 +3,24 @@
 
 メモリ使用量を抑えるために、ズームレベルを複数のグループに分割して
 処理する際の設定を提供します。
+
+`--pyramid`（深さ優先のピラミッド生成）ではメモリ使用量がズーム段数で
+決まり範囲に依存しないため、ここでのメモリ見積もりは従来モード向けです。
 """
 
 from __future__ import annotations
 
-import math
 from dataclasses import dataclass
 from typing import List, Optional, Tuple
 
+try:  # Allow running as a module or script
+    from .tile_grid import count_tiles, zoom_ranges
+except ImportError:  # pragma: no cover - fallback for direct execution
+    if __package__:
+        # Imported from the package: a real failure (e.g. missing mercantile)
+        raise
+    from tile_grid import count_tiles, zoom_ranges
+
 
 @dataclass
 class ZoomGroup:
@@ -123,20 +133,8 @@ def estimate_tile_count(min_zoom: int, max_zoom: int, bbox_wgs84: Optional[Tuple
 
     west, south, east, north = bbox
 
-    total_tiles = 0
-    for z in range(min_zoom, max_zoom + 1):
-        # Web Mercator投影でのタイル数を計算
-        # 経度方向のタイル数（少数切り上げで少なくとも1）
-        tiles_x = max(1, math.ceil((east - west) / 360.0 * (2 ** z)))
-
-        # 緯度方向のタイル数（Web Mercatorの変換）
-        lat_rad_min = math.radians(south)
-        lat_rad_max = math.radians(north)
-        y_min = (1 - math.log(math.tan(lat_rad_max) + 1 / math.cos(lat_rad_max)) / math.pi) / 2 * (2 ** z)
-        y_max = (1 - math.log(math.tan(lat_rad_min) + 1 / math.cos(lat_rad_min)) / math.pi) / 2 * (2 ** z)
-        tiles_y = max(1, math.ceil(abs(y_max - y_min)))
-
-        total_tiles += tiles_x * tiles_y
+    # mercantile.tiles() が列挙するタイル数をズームごとに閉形式で数える
+    total_tiles = count_tiles(zoom_ranges(west, south, east, north, range(min_zoom, max_zoom + 1)))
 
     # Ensure at least one tile is reported for tiny bbox ranges
     return max(1, total_tiles)
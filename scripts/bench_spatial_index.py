@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+"""Benchmark the packed spatial index against the old z5 bucket scan.
+
+Usage:
+  python scripts/bench_spatial_index.py --sheets 20000 --sheet-m 1000 --zoom 16 --queries 5000
+"""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+# Ensure the repository root is on sys.path so `pipelines` can be imported
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from pipelines.bench_spatial_index import main
+
+if __name__ == "__main__":
+    raise SystemExit(main())
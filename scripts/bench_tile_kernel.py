@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+"""Benchmark the reusable-buffer tile kernel against the allocating merge/encode.
+
+Usage:
+  python scripts/bench_tile_kernel.py --tiles 200 --sources 3 --zoom 15
+"""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+# Ensure the repository root is on sys.path so `pipelines` can be imported
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from pipelines.bench_tile_kernel import main
+
+if __name__ == "__main__":
+    raise SystemExit(main())
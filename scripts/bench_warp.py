@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+"""Benchmark the separable NumPy warp against GDAL reproject.
+
+Usage:
+  python scripts/bench_warp.py --zoom 15 --tiles 64 --size 2400
+"""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+# Ensure the repository root is on sys.path so `pipelines` can be imported
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from pipelines.bench_warp import main
+
+if __name__ == "__main__":
+    raise SystemExit(main())
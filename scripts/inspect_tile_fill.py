@@ -14,12 +14,10 @@ try:
 except Exception:  # pragma: no cover - optional
     mercantile = None
 import sys
-from io import BytesIO
 from pathlib import Path
 import argparse
 
 import numpy as np
-from PIL import Image
 
 import sys
 from pathlib import Path
@@ -28,23 +26,11 @@ from pathlib import Path
 # ensure the repository root is on sys.path so `pipelines` can be imported.
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 from pipelines.inspect_tile_fill import main
+from pipelines.terrarium_decode import decode_terrarium
 
 
 def decode_webp_to_elevation(webp_bytes: bytes) -> np.ndarray:
-    # Decode WebP to RGB(A) using imagecodecs if available, fallback to Pillow
-    try:
-        arr = imagecodecs.webp_decode(webp_bytes)
-        # imagecodecs returns ndarray uint8 with shape (h,w,3) or (h,w,4)
-        rgb = arr[:, :, :3]
-    except Exception:
-        img = Image.open(BytesIO(webp_bytes)).convert("RGB")
-        rgb = np.array(img)
-
-    r = rgb[:, :, 0].astype("float32")
-    g = rgb[:, :, 1].astype("float32")
-    b = rgb[:, :, 2].astype("float32")
-    elev = (r * 256.0 + g + b / 256.0) - 32768.0
-    return elev
+    return decode_terrarium(webp_bytes)
 
 
 def fetch_tile_from_mbtiles(mbtiles_path: Path, z: int, x: int, y: int) -> bytes | None:
@@ -0,0 +1,80 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def _write_synthetic_dem(path: Path):
+    """Write a small JGD2011 DEM (1 arc-second pixels) with a nodata corner."""
+    import rasterio
+    from rasterio.transform import from_origin
+    from rasterio.warp import transform_bounds
+
+    from pipelines.aggregate_pmtiles import SourceRecord
+
+    height, width = 252, 360
+    yy, xx = np.mgrid[0:height, 0:width].astype(np.float32)
+    data = 120.0 + 40.0 * np.sin(xx / 17.0) + 25.0 * np.cos(yy / 11.0) + 0.3 * xx
+    data = data.astype(np.float32)
+    data[:40, :60] = -9999.0
+    res = 1.0 / 3600.0
+    transform = from_origin(139.70, 35.72, res, res)
+    with rasterio.open(
+        path,
+        "w",
+        driver="GTiff",
+        height=height,
+        width=width,
+        count=1,
+        dtype="float32",
+        crs="EPSG:6668",
+        transform=transform,
+        nodata=-9999.0,
+    ) as dst:
+        dst.write(data, 1)
+        bounds = dst.bounds
+    left, bottom, right, top = transform_bounds("EPSG:6668", "EPSG:3857", *bounds)
+    return SourceRecord(
+        path=path,
+        left=left,
+        bottom=bottom,
+        right=right,
+        top=top,
+        width=width,
+        height=height,
+        pixel_size=max((right - left) / width, (top - bottom) / height),
+        source="synthetic",
+        priority=0,
+    )
+
+
+def _tiles_over(record, z: int):
+    """The z tiles `mercantile.tiles()` lists for the WGS84 bbox of `record`."""
+    import mercantile
+    from rasterio.warp import transform_bounds
+
+    west, south, east, north = transform_bounds("EPSG:3857", "EPSG:4326", *record.bounds_mercator)
+    return list(mercantile.tiles(west, south, east, north, z))
+
+
+@pytest.fixture
+def make_synthetic_dem():
+    """Factory writing the synthetic DEM to a given path and returning its record."""
+    pytest.importorskip("rasterio")
+    return _write_synthetic_dem
+
+
+@pytest.fixture
+def tiles_over():
+    """`tiles_over(record, z)`: the z tiles covering a record's bbox."""
+    pytest.importorskip("rasterio")
+    pytest.importorskip("mercantile")
+    return _tiles_over
+
+
+@pytest.fixture
+def synthetic_record(make_synthetic_dem, tmp_path):
+    return make_synthetic_dem(tmp_path / "dem.tif")
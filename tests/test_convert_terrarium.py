@@ -0,0 +1,67 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+pytest.importorskip("rasterio")
+pytest.importorskip("pmtiles")
+
+from pipelines.convert_terrarium import encode_terrarium, encode_terrarium_batch, get_vertical_resolution
+
+
+def _legacy_encode(data, z):
+    """The encoder as it was before the integer paths (512x512 only)."""
+    filled = np.where(np.isnan(data), 0.0, data)
+    factor = get_vertical_resolution(z)
+    data_offset = np.round(filled / factor) * factor + 32768.0
+    rgb = np.zeros((512, 512, 3), dtype=np.uint8)
+    rgb[..., 0] = np.clip(data_offset // 256, 0, 255).astype(np.uint8)
+    rgb[..., 1] = np.clip(data_offset % 256, 0, 255).astype(np.uint8)
+    fractional = (data_offset - np.floor(data_offset)) * 256
+    rgb[..., 2] = np.clip(fractional, 0, 255).astype(np.uint8)
+    return rgb
+
+
+def _tiles(seed):
+    rng = np.random.default_rng(seed)
+    relief = rng.uniform(-500.0, 4000.0, (512, 512)).astype(np.float32)
+    relief[rng.random(relief.shape) < 0.1] = np.nan
+    # Exact halves of the rounding step (ties go to even) and off-range values
+    steps = (np.arange(512 * 512, dtype=np.float32).reshape(512, 512) - 131072.0) / 512.0
+    wide = rng.uniform(-70000.0, 120000.0, (512, 512)).astype(np.float32)
+    huge = wide * np.float32(1000.0)
+    huge[0, :4] = [np.inf, -np.inf, 3e38, -3e38]
+    return [relief, steps, wide, huge, np.full((512, 512), np.nan, np.float32)]
+
+
+@pytest.mark.parametrize("z", range(0, 18))
+def test_encoder_is_bit_identical_to_legacy(z):
+    for data in _tiles(z):
+        assert np.array_equal(encode_terrarium(data, z), _legacy_encode(data, z))
+    as_float64 = _tiles(z)[0].astype(np.float64) + 1e-9
+    assert np.array_equal(encode_terrarium(as_float64, z), _legacy_encode(as_float64, z))
+
+
+@pytest.mark.parametrize("z", [3, 11, 12, 17])
+def test_out_scratch_shapes_and_batch(z):
+    relief = _tiles(z)[0]
+    out = np.empty((512, 512, 3), dtype=np.uint8)
+    scratch = (np.empty((512, 512), np.float32), np.empty((512, 512), np.int32))
+    assert encode_terrarium(relief, z, out=out, scratch=scratch) is out
+    assert np.array_equal(out, _legacy_encode(relief, z))
+    if get_vertical_resolution(z) >= 1:
+        assert not out[..., 2].any()
+
+    small = relief[:256, 100:400]
+    assert np.array_equal(encode_terrarium(small, z), _legacy_encode(relief, z)[:256, 100:400])
+
+    stack = np.stack(_tiles(z)[:3])
+    batch = encode_terrarium_batch(stack, z)
+    assert batch.shape == (3, 512, 512, 3)
+    for tile, rgb in zip(stack, batch):
+        assert np.array_equal(rgb, _legacy_encode(tile, z))
+    with pytest.raises(ValueError):
+        encode_terrarium(relief, z, out=np.empty((256, 256, 3), np.uint8))
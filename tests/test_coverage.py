@@ -0,0 +1,129 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+mercantile = pytest.importorskip("mercantile")
+
+from pipelines.coverage import TileCoverage, morton_decode, morton_encode
+from pipelines.footprints import Footprint, footprint_touches
+from pipelines.source_catalog import SourceRecord
+from pipelines.spatial_index import SpatialIndex
+from pipelines.tile_grid import zoom_ranges
+
+BBOX = (139.55, 35.45, 140.05, 35.85)
+ZOOMS = range(8, 14)
+
+
+def _record(i, left, bottom, right, top):
+    return SourceRecord(Path(f"r{i}.tif"), left, bottom, right, top, 100, 100, 5.0, "s", 0)
+
+
+def _records():
+    rng = np.random.default_rng(7)
+    records = []
+    for i in range(40):
+        west, south = rng.uniform(139.4, 140.1), rng.uniform(35.4, 35.9)
+        left, bottom = mercantile.xy(west, south)
+        right, top = mercantile.xy(west + rng.uniform(0.005, 0.08), south + rng.uniform(0.005, 0.06))
+        records.append(_record(i, left, bottom, right, top))
+    # Edges exactly on tile lines: touching tiles must not count
+    edge = mercantile.xy_bounds(mercantile.tile(139.8, 35.7, 12))
+    records.append(_record(40, edge.left, edge.bottom, edge.right, edge.top))
+    return records
+
+
+def _footprints(records):
+    """Partial z17 footprints (data in the western half) for every third record."""
+    out = {}
+    for record in records[::3]:
+        west, south = mercantile.lnglat(record.left, record.bottom)
+        east, north = mercantile.lnglat(record.right, record.top)
+        ul, lr = mercantile.tile(west, north, 17), mercantile.tile(east - 1e-11, south + 1e-11, 17)
+        data = np.zeros((lr.y - ul.y + 1, lr.x - ul.x + 1), dtype=bool)
+        data[:, : max(1, data.shape[1] // 2)] = True
+        out[record] = Footprint(17, ul.x, ul.y, data, data.copy(), record.bounds_mercator)
+    out[records[1]] = None
+    return out
+
+
+def _brute_force(records, footprints, ranges):
+    index = SpatialIndex.from_records(records)
+    covered = {}
+    for z, (x0, y0, x1, y1) in ranges.items():
+        tiles = []
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                b = mercantile.xy_bounds(x, y, z)
+                for r in index.candidates((b.left, b.bottom, b.right, b.top)):
+                    fp = footprints.get(r, r)
+                    if fp is r or (fp is not None and footprint_touches(fp, z, x, y)):
+                        tiles.append((x, y))
+                        break
+        covered[z] = tiles
+    return covered
+
+
+def test_morton_round_trip_and_child_order():
+    xs = np.array([0, 1, 0, 1, 12345, (1 << 17) - 1])
+    ys = np.array([0, 0, 1, 1, 54321, 3])
+    keys = morton_encode(xs, ys)
+    assert keys[:4].tolist() == [0, 1, 2, 3]
+    dx, dy = morton_decode(keys)
+    assert dx.tolist() == xs.tolist() and dy.tolist() == ys.tolist()
+
+
+@pytest.mark.parametrize("with_footprints", [False, True])
+def test_coverage_matches_candidate_scan(with_footprints):
+    records = _records()
+    footprints = _footprints(records) if with_footprints else {}
+    ranges = zoom_ranges(*BBOX, ZOOMS)
+    coverage = TileCoverage.from_records(records, ranges, footprints)
+    expected = _brute_force(records, footprints, ranges)
+
+    for z in ZOOMS:
+        xs, ys = coverage.tiles(z)
+        # Same tiles, in mercantile.tiles() order
+        assert list(zip(xs.tolist(), ys.tolist())) == expected[z]
+        got = list(coverage.iter_tiles(z, block=7))
+        assert [(x, y) for x, y, _ in got] == expected[z]
+        assert all(b == mercantile.xy_bounds(x, y, z) for x, y, b in got)
+    assert coverage.total() == sum(len(t) for t in expected.values())
+    assert coverage.total() < sum((x1 - x0 + 1) * (y1 - y0 + 1) for x0, y0, x1, y1 in ranges.values())
+
+
+def test_subtree_counts():
+    records = _records()
+    ranges = zoom_ranges(*BBOX, ZOOMS)
+    coverage = TileCoverage.from_records(records, ranges, _footprints(records))
+    covered = {z: set(zip(*(a.tolist() for a in coverage.tiles(z)))) for z in ZOOMS}
+    x0, y0, x1, y1 = ranges[9]
+    for x in range(x0, x1 + 1):
+        for y in range(y0, y1 + 1):
+            below = sum(
+                1 for z in ZOOMS if z >= 9 for tx, ty in covered[z] if (tx >> (z - 9), ty >> (z - 9)) == (x, y)
+            )
+            assert coverage.count_in_subtree(9, x, y) == below
+            assert coverage.count_in_subtree(9, x, y, [13]) == sum(
+                1 for tx, ty in covered[13] if (tx >> 4, ty >> 4) == (x, y)
+            )
+            assert coverage.contains(9, x, y) == ((x, y) in covered[9])
+
+
+def test_metatiles_group_covered_tiles():
+    records = _records()
+    ranges = zoom_ranges(*BBOX, ZOOMS)
+    coverage = TileCoverage.from_records(records, ranges, _footprints(records))
+    for z in ZOOMS:
+        seen = []
+        for mx, my, xs, ys in coverage.iter_metatiles(z, 4):
+            tiles = list(zip(xs.tolist(), ys.tolist()))
+            assert tiles == sorted(tiles)
+            assert all((x >> 2, y >> 2) == (mx, my) for x, y in tiles)
+            seen.extend(tiles)
+        assert sorted(seen) == list(zip(*(a.tolist() for a in coverage.tiles(z))))
+    # Blocks larger than the world collapse to the zoom-0 tile
+    assert [mx for mx, _, _, _ in TileCoverage({1: np.arange(4)}).iter_metatiles(1, 8)] == [0]
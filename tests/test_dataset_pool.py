@@ -0,0 +1,91 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from pipelines.dataset_pool import DatasetPool
+
+
+class _FakeDataset:
+    def __init__(self, path):
+        self.path = path
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_pool_reuses_handles_and_counts_hits():
+    opened = []
+
+    def opener(path):
+        ds = _FakeDataset(path)
+        opened.append(ds)
+        return ds
+
+    pool = DatasetPool(max_open=2, opener=opener)
+    a1 = pool.get("a.tif")
+    a2 = pool.get(Path("a.tif"))
+    assert a1 is a2
+    assert len(opened) == 1
+    assert pool.stats()["hits"] == 1
+    assert pool.stats()["misses"] == 1
+
+
+def test_pool_evicts_least_recently_used():
+    pool = DatasetPool(max_open=2, opener=_FakeDataset)
+    a = pool.get("a.tif")
+    b = pool.get("b.tif")
+    pool.get("a.tif")  # touch a so b becomes LRU
+    pool.get("c.tif")
+    assert "a.tif" in pool and "c.tif" in pool
+    assert "b.tif" not in pool
+    assert b.closed and not a.closed
+    assert pool.evictions == 1
+    assert "evict=1" in pool.format_stats()
+
+    pool.resize(1)
+    assert len(pool) == 1 and a.closed
+    pool.close()
+    assert len(pool) == 0
+
+
+def test_pool_rejects_invalid_limit():
+    with pytest.raises(ValueError):
+        DatasetPool(max_open=0)
+
+
+def test_thread_local_pool_gives_each_thread_its_own_handles():
+    import threading
+
+    from pipelines.dataset_pool import ThreadLocalPool
+
+    pool = ThreadLocalPool(max_open=2, opener=_FakeDataset)
+    main = pool.get("a.tif")
+    assert pool.get("a.tif") is main
+    seen = []
+    thread = threading.Thread(target=lambda: seen.append(pool.get("a.tif")))
+    thread.start()
+    thread.join()
+    assert seen[0] is not main
+    s = pool.stats()
+    assert (s["hits"], s["misses"], s["open"]) == (1, 2, 2)
+    pool.close()
+    assert main.closed and seen[0].closed
+
+
+def test_reads_share_pooled_dataset_handles(tmp_path, make_synthetic_dem, tiles_over):
+    pytest.importorskip("rasterio")
+    mercantile = pytest.importorskip("mercantile")
+    from pipelines.aggregate_pmtiles import read_tile_from_source
+
+    record = make_synthetic_dem(tmp_path / "dem.tif")
+    pool = DatasetPool(max_open=4)
+    tiles = tiles_over(record, 13)[:3]
+    for tile in tiles:
+        read_tile_from_source(record, mercantile.xy_bounds(tile), (512, 512), 1, pool=pool)
+    assert pool.misses == 1
+    assert pool.hits == len(tiles) - 1
+    pool.close()
@@ -0,0 +1,129 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+rasterio = pytest.importorskip("rasterio")
+mercantile = pytest.importorskip("mercantile")
+
+from rasterio.warp import transform_bounds
+from rasterio.windows import Window, bounds as window_bounds
+
+from pipelines.aggregate_pmtiles import generate_aggregated_tiles
+from pipelines.footprints import compute_footprint, plan_occlusion
+
+BUCKET = (5, 28, 12)
+
+
+def _filled_copy(record, path: Path, window=None):
+    """Copy `record`'s DEM (or a window of it) with the nodata corner filled."""
+    with rasterio.open(record.path) as src:
+        window = window or Window(0, 0, src.width, src.height)
+        data = src.read(1, window=window)
+        profile = src.profile.copy()
+        profile.update(width=window.width, height=window.height, transform=src.window_transform(window))
+        left, bottom, right, top = transform_bounds(src.crs, "EPSG:3857", *window_bounds(window, src.transform))
+    data[data == profile["nodata"]] = 50.0
+    with rasterio.open(path, "w", **profile) as dst:
+        dst.write(data, 1)
+    return record._replace(path=path, left=left, bottom=bottom, right=right, top=top, width=window.width)
+
+
+@pytest.fixture
+def dems(tmp_path, make_synthetic_dem):
+    holed = make_synthetic_dem(tmp_path / "holed.tif")
+    filled = _filled_copy(holed, tmp_path / "filled.tif")
+    return holed, filled
+
+
+def test_footprint_marks_nodata_corner(dems):
+    holed, filled = dems
+    fp = compute_footprint(holed)
+    assert fp.data.any() and not fp.data.all()
+    assert fp.full.sum() <= fp.data.sum()
+    assert compute_footprint(filled).data.all()
+
+
+def test_plan_culls_only_fully_covered_records(dems):
+    holed, filled = dems
+    lower_holed = holed._replace(priority=1)
+    lower_filled = filled._replace(priority=1)
+    footprints = {r: compute_footprint(r) for r in (holed, filled, lower_holed, lower_filled)}
+
+    # The filled DEM covers everything the holed one has, not the reverse
+    plan = plan_occlusion({BUCKET: [lower_holed, filled]}, footprints)
+    assert plan.occluded == {BUCKET: {lower_holed}}
+    assert plan.eliminated == [lower_holed] and plan.eliminated_bytes > 0
+    assert plan_occlusion({BUCKET: [holed, lower_filled]}, footprints).occluded == {}
+
+    # Records without a footprint are never culled
+    assert plan_occlusion({BUCKET: [filled, lower_holed]}, {filled: footprints[filled]}).occluded == {}
+
+
+def test_plan_covers_across_sheet_seams(tmp_path, dems):
+    holed, filled = dems
+    west = _filled_copy(holed, tmp_path / "west.tif", Window(0, 0, 170, holed.height))
+    east = _filled_copy(holed, tmp_path / "east.tif", Window(170, 0, holed.width - 170, holed.height))
+    lower = filled._replace(priority=1)
+    footprints = {r: compute_footprint(r) for r in (west, east, lower)}
+    assert plan_occlusion({BUCKET: [lower, west, east]}, footprints).occluded == {BUCKET: {lower}}
+    assert plan_occlusion({BUCKET: [lower, west]}, footprints).occluded == {}
+
+
+@pytest.mark.parametrize("pyramid,workers", [(False, 1), (True, 1), (False, 2)])
+def test_culled_aggregation_matches_full(dems, monkeypatch, capsys, pyramid, workers):
+    monkeypatch.setenv("FUSI_WEBP_METHOD", "0")
+    holed, filled = dems
+    records = [filled, holed._replace(priority=1)]
+    kwargs = dict(min_zoom=11, max_zoom=13, progress_interval=0, pyramid=pyramid, workers=workers, chunk_depth=1)
+    full = list(generate_aggregated_tiles(records, **kwargs))
+    culled = list(generate_aggregated_tiles(records, cull_occluded=True, **kwargs))
+    assert full
+    assert culled == full
+    assert "occlusion: 1 records never read" in capsys.readouterr().out
+
+
+def test_fully_valid_geographic_record_needs_no_read(tmp_path, dems):
+    _, filled = dems
+    rich = filled._replace(path=tmp_path / "absent.tif", crs="EPSG:6668", valid_fraction=1.0)
+    fast, read = compute_footprint(rich), compute_footprint(filled)
+    assert (fast.x0, fast.y0) == (read.x0, read.y0)
+    assert (fast.data == read.data).all() and (fast.full == read.full).all()
+
+
+def _coastal_source(tmp_path, holed):
+    """A source dir holding one DEM whose eastern half is nodata, with stored footprints."""
+    from pipelines.source_bounds import build_bounds
+    from pipelines.source_catalog import SourceCatalog
+
+    src_dir = tmp_path / "coast"
+    src_dir.mkdir()
+    with rasterio.open(holed.path) as src:
+        data, profile = src.read(1), src.profile.copy()
+    data[:, 180:] = profile["nodata"]
+    with rasterio.open(src_dir / "coast.tif", "w", **profile) as dst:
+        dst.write(data, 1)
+    build_bounds(src_dir, footprints=True)
+    return SourceCatalog.from_bounds_csv(src_dir / "bounds.csv", "coast")
+
+
+@pytest.mark.parametrize("pyramid,workers", [(False, 1), (True, 1), (False, 2)])
+def test_stored_footprints_skip_reads_without_changing_tiles(tmp_path, dems, monkeypatch, pyramid, workers):
+    import pipelines.aggregate_pmtiles as agg
+
+    monkeypatch.setenv("FUSI_WEBP_METHOD", "0")
+    catalog = _coastal_source(tmp_path, dems[0])
+    assert (tmp_path / "coast" / "footprints.npz").exists()
+
+    reads = []
+    real_read = agg.read_tile_from_source
+    monkeypatch.setattr(agg, "read_tile_from_source", lambda record, *a, **k: reads.append(1) or real_read(record, *a, **k))
+    kwargs = dict(min_zoom=12, max_zoom=14, progress_interval=0, pyramid=pyramid, workers=workers, chunk_depth=1)
+    full = list(generate_aggregated_tiles(catalog, footprint_filter=False, **kwargs))
+    full_reads, reads[:] = len(reads), []
+    filtered = list(generate_aggregated_tiles(catalog, **kwargs))
+    assert full and filtered == full
+    if workers == 1:
+        assert len(reads) < full_reads
@@ -49,3 +49,79 @@ def test_webp_method_env_override(monkeypatch):
     b = imagecodecs.webp_encode(arr, lossless=True)
     dec = imagecodecs.webp_decode(b)
     assert dec.shape == arr.shape
+
+
+def test_webp_encode_many_matches_single_encodes_in_order():
+    arrays = []
+    for i in range(12):
+        arr = make_test_image()
+        arr[..., 0] = i * 20
+        arrays.append(arr)
+    expected = [imagecodecs.webp_encode(a, lossless=True, method=0) for a in arrays]
+    assert imagecodecs.webp_encode_many(arrays, method=0, threads=4) == expected
+    assert imagecodecs.webp_encode_many(arrays, method=0, threads=1) == expected
+
+
+def test_webp_encoder_map_is_lazy_and_bounded():
+    pulled = []
+
+    def items():
+        for i in range(20):
+            pulled.append(i)
+            yield i
+
+    with imagecodecs.WebPEncoder(threads=3, max_in_flight=4) as encoder:
+        for consumed, value in enumerate(encoder.map(lambda i: i * 2, items()), start=1):
+            assert value == (consumed - 1) * 2
+            assert len(pulled) - consumed <= 4
+
+
+def _terrarium_like_tiles(count=3):
+    rng = np.random.default_rng(1)
+    tiles = []
+    for _ in range(count):
+        rgb = np.zeros((128, 128, 3), dtype='uint8')
+        rgb[..., 0] = 128 + rng.integers(0, 2, (128, 128))
+        rgb[..., 1] = rng.integers(0, 256, (128, 128))
+        tiles.append(rgb)
+    return tiles
+
+
+def test_backend_selection(monkeypatch):
+    assert 'pillow' in imagecodecs.available_backends()
+    monkeypatch.setenv('FUSI_WEBP_BACKEND', 'nope')
+    assert imagecodecs.default_backend_name() == 'pillow'
+    with pytest.raises(ValueError):
+        imagecodecs.set_backend('nope')
+    try:
+        assert imagecodecs.set_backend('pillow').name == 'pillow'
+        assert imagecodecs.get_backend().name == 'pillow'
+        # An env-only backend that is not installed falls back to Pillow
+        monkeypatch.setenv('FUSI_WEBP_BACKEND', 'imagecodecs')
+        expected = 'imagecodecs' if 'imagecodecs' in imagecodecs.available_backends() else 'pillow'
+        assert imagecodecs.set_backend(None).name == expected
+    finally:
+        monkeypatch.delenv('FUSI_WEBP_BACKEND')
+        imagecodecs.set_backend(None)
+
+
+@pytest.mark.parametrize('name', imagecodecs.CODEC_BACKENDS)
+def test_backends_round_trip_losslessly(name):
+    if name not in imagecodecs.available_backends():
+        pytest.skip(f'{name} not installed')
+    backend = imagecodecs.load_backend(name)
+    pillow = imagecodecs.load_backend('pillow')
+    for rgb in _terrarium_like_tiles():
+        blob = backend.encode(rgb, lossless=True, method=0)
+        assert np.array_equal(backend.decode(blob, channels=3), rgb)
+        # Tiles from any backend decode identically with Pillow
+        assert np.array_equal(pillow.decode(blob, channels=3), rgb)
+        out = np.empty_like(rgb)
+        assert backend.decode(blob, channels=3, out=out) is out
+        assert backend.decode(blob, channels=4).shape == rgb.shape[:2] + (4,)
+
+
+def test_bench_reports_every_combination():
+    results = imagecodecs.bench(_terrarium_like_tiles(2), ['pillow'], methods=(0, 4))
+    assert [(r['backend'], r['method']) for r in results] == [('pillow', 0), ('pillow', 4)]
+    assert all(r['identical'] and r['bytes_per_tile'] > 0 for r in results)
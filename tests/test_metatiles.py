@@ -0,0 +1,51 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+rasterio = pytest.importorskip("rasterio")
+mercantile = pytest.importorskip("mercantile")
+
+from pipelines.aggregate_pmtiles import default_metatile, render_metatile_from_sources, render_tile_from_sources
+from pipelines.coverage import TileCoverage
+from pipelines.dataset_pool import DatasetPool
+from pipelines.source_cache import SourceBlockCache
+
+
+@pytest.mark.parametrize("z,size", [(13, 2), (14, 4), (15, 4)])
+@pytest.mark.parametrize("warp_engine,tolerance", [("gdal", 0.5), ("numpy", 1e-3)])
+def test_metatiles_match_tile_by_tile_rendering(synthetic_record, z, size, warp_engine, tolerance):
+    pool = DatasetPool(4)
+    cache = SourceBlockCache(64 * 1024 * 1024)
+    kwargs = dict(pool=pool, cache=cache, warp_engine=warp_engine)
+    coverage = TileCoverage.from_records([synthetic_record], {z: (0, 0, (1 << z) - 1, (1 << z) - 1)})
+    compared = 0
+    for mx, my, xs, ys in coverage.iter_metatiles(z, size):
+        tiles = list(zip(xs.tolist(), ys.tolist()))
+        assert all((x >> (size.bit_length() - 1), y >> (size.bit_length() - 1)) == (mx, my) for x, y in tiles)
+        rendered = render_metatile_from_sources([synthetic_record], z, tiles, size, **kwargs)
+        blocks = {(x, y): tile for x, y, tile in rendered}
+        for x, y in tiles:
+            single = render_tile_from_sources([synthetic_record], mercantile.xy_bounds(x, y, z), zoom=z, **kwargs)
+            block = blocks.get((x, y))
+            if single is None or block is None:
+                # Only slivers along the raster edge may differ
+                other = block if single is None else single
+                assert other is None or np.isnan(other).mean() > 0.99
+                continue
+            assert block.shape == (512, 512)
+            assert (np.isnan(single) != np.isnan(block)).mean() < 0.01
+            both = ~np.isnan(single) & ~np.isnan(block)
+            assert np.abs(single[both] - block[both]).max() < tolerance
+            compared += 1
+    pool.close()
+    assert compared
+
+
+@pytest.mark.parametrize("value, expected", [("4", 4), ("3", 1), ("big", 1)])
+def test_default_metatile_ignores_bad_env(monkeypatch, value, expected):
+    monkeypatch.setenv("FUSI_METATILE", value)
+    assert default_metatile() == expected
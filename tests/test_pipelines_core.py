@@ -65,3 +65,27 @@ def test_merge_with_provenance():
     assert prov[0, 1] == 1
     assert prov[1, 0] == 1
     assert prov[1, 1] == 0
+
+
+def _reads_until_full(arrays, consumed):
+    for arr in arrays:
+        consumed.append(arr)
+        yield arr
+
+
+def test_merge_stops_reading_once_tile_is_full():
+    full = np.array([[1.0, 2.0], [3.0, 4.0]], dtype=np.float32)
+    gappy = np.array([[np.nan, 5.0], [6.0, np.nan]], dtype=np.float32)
+    unused = np.zeros((2, 2), dtype=np.float32)
+
+    consumed = []
+    merged = merge_tile_candidates(_reads_until_full([gappy, full, unused], consumed))
+    assert len(consumed) == 2
+    assert merged.tolist() == [[1.0, 5.0], [6.0, 4.0]]
+
+    consumed = []
+    merged, prov = __import__('pipelines.aggregate_pmtiles', fromlist=['']).merge_tile_candidates_with_provenance(
+        _reads_until_full([(0, gappy), (1, full), (2, unused)], consumed)
+    )
+    assert len(consumed) == 2
+    assert prov.tolist() == [[1, 0], [0, 1]]
@@ -0,0 +1,60 @@
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+rasterio = pytest.importorskip("rasterio")
+mercantile = pytest.importorskip("mercantile")
+
+from pipelines.aggregate_pmtiles import SourceReadStats, compute_tile_provenance, render_tile_from_sources
+
+
+def test_lower_priority_reads_are_skipped_when_tile_is_full(synthetic_record, tmp_path, tiles_over):
+    shutil.copy(synthetic_record.path, tmp_path / "lower.tif")
+    lower = synthetic_record._replace(path=tmp_path / "lower.tif", priority=1)
+    skipped_tiles = 0
+    for tile in tiles_over(synthetic_record, 14):
+        bounds = mercantile.xy_bounds(tile)
+        alone = render_tile_from_sources([synthetic_record], bounds, zoom=14, read_stats=SourceReadStats())
+        stats = SourceReadStats()
+        both = render_tile_from_sources([lower, synthetic_record], bounds, zoom=14, read_stats=stats)
+        if alone is None:
+            continue
+        np.testing.assert_array_equal(both, alone)
+        full = not np.isnan(alone).any()
+        assert stats.zoom_stats()[14] == ((1, 1) if full else (2, 0))
+
+        stats = SourceReadStats()
+        _, prov = compute_tile_provenance([lower, synthetic_record], bounds, (512, 512), zoom=14, read_stats=stats)
+        assert stats.zoom_stats()[14] == ((1, 1) if full else (2, 0))
+        if full:
+            assert (prov == 0).all()
+            skipped_tiles += 1
+    assert skipped_tiles
+
+
+def test_provenance_breaks_priority_ties_like_the_merge(synthetic_record, tmp_path, tiles_over):
+    # Same priority, coarser and offset by +100 m: the finer source must win
+    with rasterio.open(synthetic_record.path) as src:
+        profile = src.profile
+        data = src.read(1)
+    data[data != profile["nodata"]] += 100.0
+    with rasterio.open(tmp_path / "coarse.tif", "w", **profile) as dst:
+        dst.write(data, 1)
+    coarse = synthetic_record._replace(path=tmp_path / "coarse.tif", pixel_size=synthetic_record.pixel_size * 2)
+    compared = 0
+    for tile in tiles_over(synthetic_record, 14):
+        bounds = mercantile.xy_bounds(tile)
+        rendered = render_tile_from_sources([coarse, synthetic_record], bounds, zoom=14, read_stats=SourceReadStats())
+        merged, _ = compute_tile_provenance(
+            [coarse, synthetic_record], bounds, (512, 512), zoom=14, read_stats=SourceReadStats()
+        )
+        if rendered is None:
+            continue
+        np.testing.assert_array_equal(merged, rendered)
+        compared += 1
+    assert compared
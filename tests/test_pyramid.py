@@ -0,0 +1,123 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from pipelines.pyramid import build_parent_level, combine_children, downsample_2x2
+
+
+def test_downsample_is_nan_aware_mean():
+    arr = np.array(
+        [
+            [1.0, 3.0, np.nan, np.nan],
+            [5.0, 7.0, np.nan, 8.0],
+        ],
+        dtype=np.float32,
+    )
+    out = downsample_2x2(arr)
+    assert out.dtype == np.float32
+    assert out[0, 0] == pytest.approx(4.0)
+    assert out[0, 1] == pytest.approx(8.0)
+    assert np.isnan(downsample_2x2(np.full((2, 2), np.nan, dtype=np.float32))).all()
+
+
+def test_combine_children_places_quadrants():
+    size = 8
+    children = [np.full((size, size), v, dtype=np.float32) for v in (1.0, 2.0, 3.0, 4.0)]
+    children[3] = None  # SE child missing
+    parent = combine_children(children, tile_size=size)
+    half = size // 2
+    assert np.all(parent[:half, :half] == 1.0)  # NW
+    assert np.all(parent[:half, half:] == 2.0)  # NE
+    assert np.all(parent[half:, :half] == 3.0)  # SW
+    assert np.isnan(parent[half:, half:]).all()  # SE
+    assert combine_children([None] * 4, tile_size=size) is None
+
+
+def test_build_parent_level_groups_children_by_parent():
+    size = 4
+    level = {
+        (4, 6): np.ones((size, size), dtype=np.float32),
+        (5, 7): np.full((size, size), 3.0, dtype=np.float32),
+        (7, 6): np.full((size, size), 5.0, dtype=np.float32),
+    }
+    parents = dict(build_parent_level(level, tile_size=size))
+    assert set(parents) == {(2, 3), (3, 3)}
+    p = parents[(2, 3)]
+    assert np.all(p[:2, :2] == 1.0) and np.all(p[2:, 2:] == 3.0)
+    assert np.isnan(p[:2, 2:]).all()
+    assert np.all(parents[(3, 3)][:2, 2:] == 5.0)
+
+
+def _leaf(size):
+    def render(z, x, y, state):
+        return np.full((size, size), float(x * 1000 + y), dtype=np.float32)
+    return render
+
+
+def test_depth_first_pyramid_matches_breadth_first_and_bounds_memory():
+    from pipelines.pyramid import DepthFirstPyramid
+
+    size, depth = 4, 5
+    builder = DepthFirstPyramid(depth, _leaf(size), min_zoom=0, tile_size=size)
+    tiles = {(z, x, y): arr.copy() for z, x, y, arr in builder.build([(0, 0, 0)])}
+
+    # Breadth-first reference
+    level = {(x, y): _leaf(size)(depth, x, y, None) for x in range(1 << depth) for y in range(1 << depth)}
+    for z in range(depth - 1, -1, -1):
+        level = dict(build_parent_level(level, tile_size=size))
+        for (x, y), arr in level.items():
+            assert np.array_equal(tiles[(z, x, y)], arr)
+    assert len(tiles) == sum(4 ** z for z in range(depth + 1))
+    assert builder.peak_buffered <= 4 * depth
+    assert builder.buffered == 0
+
+
+def test_depth_first_pyramid_visits_leaves_in_morton_order_and_prunes():
+    from pipelines.pyramid import DepthFirstPyramid
+
+    def prune(z, x, y, state):
+        # Skip the SE quadrant of the root entirely
+        return None if (z >= 1 and (x >> (z - 1), y >> (z - 1)) == (1, 1)) else state
+
+    builder = DepthFirstPyramid(2, _leaf(2), prune=prune, min_zoom=1, tile_size=2)
+    order = [(z, x, y) for z, x, y, _ in builder.build([(0, 0, 0)], state=True)]
+    leaves = [(x, y) for z, x, y in order if z == 2]
+    assert leaves[:4] == [(0, 0), (1, 0), (0, 1), (1, 1)]
+    assert (2, 2) not in leaves and len(leaves) == 12
+    assert (1, 1, 1) not in order and (0, 0, 0) not in order  # pruned / above min_zoom
+    # Parents come right after their fourth child
+    assert order.index((1, 0, 0)) == order.index((2, 1, 1)) + 1
+
+
+rasterio = pytest.importorskip("rasterio")
+mercantile = pytest.importorskip("mercantile")
+
+from pipelines import imagecodecs  # noqa: E402
+from pipelines.aggregate_pmtiles import generate_aggregated_tiles  # noqa: E402
+
+
+def _decode(webp: bytes) -> np.ndarray:
+    rgba = imagecodecs.webp_decode(webp).astype(np.float64)
+    return rgba[..., 0] * 256.0 + rgba[..., 1] + rgba[..., 2] / 256.0 - 32768.0
+
+
+def test_pyramid_mode_matches_direct_rendering(tmp_path, monkeypatch, make_synthetic_dem):
+    monkeypatch.setenv("FUSI_WEBP_METHOD", "0")
+    record = make_synthetic_dem(tmp_path / "dem.tif")
+    kwargs = dict(min_zoom=11, max_zoom=13, progress_interval=0)
+    direct = {(z, x, y): w for z, x, y, w in generate_aggregated_tiles([record], **kwargs)}
+    pyramid = {(z, x, y): w for z, x, y, w in generate_aggregated_tiles([record], pyramid=True, **kwargs)}
+
+    # Max zoom comes straight from the sources in both modes
+    for key in (k for k in direct if k[0] == 13):
+        assert pyramid[key] == direct[key]
+    # Lower zooms exist for the same tiles and agree to within a few metres
+    assert set(pyramid) == set(direct)
+    for key in (k for k in direct if k[0] < 13):
+        a = _decode(direct[key])
+        b = _decode(pyramid[key])
+        assert float(np.median(np.abs(a - b))) < 2.0
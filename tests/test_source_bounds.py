@@ -0,0 +1,90 @@
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+rasterio = pytest.importorskip("rasterio")
+
+from rasterio.transform import from_origin
+
+from pipelines.source_bounds import build_bounds, default_jobs, load_existing_rows
+from pipelines.source_catalog import SourceCatalog
+
+
+def _write_tif(path: Path, x0: float) -> None:
+    with rasterio.open(
+        path, "w", driver="GTiff", height=4, width=6, count=1, dtype="float32",
+        crs="EPSG:6668", transform=from_origin(x0, 35.7, 0.001, 0.001),
+    ) as dst:
+        dst.write(np.zeros((1, 4, 6), dtype=np.float32))
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_incremental_rebuild_opens_only_new_or_modified_files(tmp_path, jobs):
+    for i in range(3):
+        _write_tif(tmp_path / f"{i}.tif", 139.0 + 0.01 * i)
+    (tmp_path / "broken.tif").write_bytes(b"not a tiff")
+
+    assert build_bounds(tmp_path, jobs=jobs) == (3, 4)
+    full = (tmp_path / "bounds.csv").read_text()
+    assert build_bounds(tmp_path, jobs=jobs, incremental=True) == (3, 1)
+    assert (tmp_path / "bounds.csv").read_text() == full
+
+    _write_tif(tmp_path / "3.tif", 139.03)
+    _write_tif(tmp_path / "1.tif", 140.0)
+    st = os.stat(tmp_path / "1.tif")
+    os.utime(tmp_path / "1.tif", ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert build_bounds(tmp_path, jobs=jobs, incremental=True) == (4, 3)
+    rows = load_existing_rows(tmp_path / "bounds.csv")
+    assert sorted(rows) == ["0.tif", "1.tif", "2.tif", "3.tif"]
+
+    incremental = (tmp_path / "bounds.csv").read_text()
+    build_bounds(tmp_path, jobs=jobs)
+    assert (tmp_path / "bounds.csv").read_text() == incremental
+    assert not list(tmp_path.glob(".bounds.csv.*"))
+
+    catalog = SourceCatalog.from_bounds_csv(tmp_path / "bounds.csv", "test")
+    assert [r.path.name for r in catalog] == ["0.tif", "1.tif", "2.tif", "3.tif"]
+    assert catalog[1].left > catalog[3].left
+
+
+def test_rich_columns_reach_the_catalog_and_empty_files_are_skipped(tmp_path):
+    _write_tif(tmp_path / "0.tif", 139.0)
+    with rasterio.open(
+        tmp_path / "1.tif", "w", driver="GTiff", height=4, width=6, count=1, dtype="int16", nodata=-1,
+        crs="EPSG:6668", transform=from_origin(139.01, 35.7, 0.001, 0.001),
+    ) as dst:
+        data = np.arange(24, dtype=np.int16).reshape(1, 4, 6)
+        data[0, 0, :3] = -1
+        dst.write(data)
+    with rasterio.open(
+        tmp_path / "2.tif", "w", driver="GTiff", height=4, width=6, count=1, dtype="float32", nodata=-9999,
+        crs="EPSG:6668", transform=from_origin(139.02, 35.7, 0.001, 0.001),
+    ) as dst:
+        dst.write(np.full((1, 4, 6), -9999, dtype=np.float32))
+
+    build_bounds(tmp_path)
+    # A plain bounds.csv cannot serve a rich rebuild, so every file is reopened
+    assert build_bounds(tmp_path, incremental=True, rich=True) == (3, 3)
+    assert build_bounds(tmp_path, incremental=True, rich=True) == (3, 0)
+
+    catalog = SourceCatalog.cached(tmp_path / "bounds.csv", "test")
+    assert [r.path.name for r in catalog] == ["0.tif", "1.tif"]
+    plain, holed = catalog
+    assert plain.nodata is None and plain.valid_fraction == 1.0 and plain.min_elevation == 0.0
+    assert holed.record()[10:] == ("EPSG:6668", -1.0, "int16", 6, 4, 0, 0.875, 3.0, 23.0)
+
+    merged = SourceCatalog.concat([SourceCatalog.from_bounds_csv(tmp_path / "bounds.csv", "test"), catalog])
+    assert [r.dtype for r in merged] == ["float32", "int16", "float32", "int16"]
+    assert merged.labels["dtype"] == ["float32", "int16"]
+
+
+def test_default_jobs_ignores_bad_env(monkeypatch):
+    monkeypatch.setenv('FUSI_BOUNDS_JOBS', '3')
+    assert default_jobs() == 3
+    monkeypatch.setenv('FUSI_BOUNDS_JOBS', 'x')
+    assert default_jobs() == 1
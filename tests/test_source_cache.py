@@ -0,0 +1,96 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from pipelines.source_cache import SourceBlockCache
+
+
+def _block(n: int = 16) -> np.ndarray:
+    return np.zeros((n, n), dtype=np.float32)  # n*n*4 bytes
+
+
+def test_cache_evicts_least_recently_used_within_budget():
+    size = _block().nbytes
+    cache = SourceBlockCache(max_bytes=2 * size)
+    cache.put("a", _block())
+    cache.put("b", _block())
+    assert cache.get("a") is not None  # a is now most recent
+    cache.put("c", _block())
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.current_bytes == 2 * size
+    assert cache.evictions == 1
+
+
+def test_cache_counts_hits_per_zoom():
+    cache = SourceBlockCache(max_bytes=1 << 20)
+    cache.put("k", _block())
+    cache.get("k", zoom=10)
+    cache.get("k", zoom=10)
+    cache.get("missing", zoom=11)
+    assert cache.zoom_stats() == {10: (2, 0), 11: (0, 1)}
+    assert "hit=2 miss=0" in cache.format_stats(10)
+
+
+def test_cache_skips_oversized_and_disabled():
+    cache = SourceBlockCache(max_bytes=10)
+    cache.put("big", _block())
+    assert len(cache) == 0
+    disabled = SourceBlockCache(max_bytes=0)
+    assert not disabled.enabled
+    disabled.put("k", _block())
+    assert disabled.get("k") is None
+
+
+def test_cached_blocks_are_read_only():
+    cache = SourceBlockCache(max_bytes=1 << 20)
+    cache.put("k", _block())
+    with pytest.raises(ValueError):
+        cache.get("k")[0, 0] = 1.0
+
+
+rasterio = pytest.importorskip("rasterio")
+mercantile = pytest.importorskip("mercantile")
+
+from pipelines.aggregate_pmtiles import read_tile_from_source  # noqa: E402
+
+
+@pytest.mark.parametrize("z,mode", [(9, "auto"), (11, "auto"), (13, "window"), (14, "auto")])
+def test_cached_reads_match_uncached_reads(tmp_path, z, mode, make_synthetic_dem, tiles_over):
+    record = make_synthetic_dem(tmp_path / "dem.tif")
+    cache = SourceBlockCache(max_bytes=64 << 20)
+    uncached_cache = SourceBlockCache(max_bytes=0)
+    tiles = tiles_over(record, z)[:6]
+    for _ in range(2):  # second pass is served entirely from the cache
+        for tile in tiles:
+            bounds = mercantile.xy_bounds(tile)
+            direct = read_tile_from_source(record, bounds, (512, 512), 1, read_mode=mode, cache=uncached_cache)
+            cached = read_tile_from_source(record, bounds, (512, 512), 1, read_mode=mode, cache=cache, zoom=z)
+            assert (direct is None) == (cached is None)
+            if direct is not None:
+                assert np.array_equal(direct, cached, equal_nan=True)
+    hits, misses = cache.zoom_stats()[z]
+    assert hits >= misses > 0
+
+
+@pytest.mark.parametrize("factor", [1, 2, 4, 8])
+def test_block_stitching_matches_uncached_window_read(tmp_path, factor, make_synthetic_dem):
+    from rasterio.windows import Window
+
+    from pipelines.source_cache import read_level_window
+
+    record = make_synthetic_dem(tmp_path / "dem.tif")
+    cache = SourceBlockCache(max_bytes=64 << 20)
+    window = Window(13, 7, 301, 229)  # unaligned, reaches the ragged right/bottom edges
+    with rasterio.open(record.path) as src:
+        direct, t_direct = read_level_window(src, "dem", window, factor=factor, block_size=16)
+        stitched, t_stitched = read_level_window(src, "dem", window, factor=factor, cache=cache, block_size=16)
+        again, _ = read_level_window(src, "dem", window, factor=factor, cache=cache, block_size=16)
+    assert t_direct == t_stitched
+    assert np.array_equal(direct, stitched, equal_nan=True)
+    assert np.array_equal(direct, again, equal_nan=True)
+    assert np.isnan(direct).any() and not np.isnan(direct).all()
@@ -0,0 +1,123 @@
+import csv
+import pickle
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from pipelines.source_catalog import SourceCatalog, SourceRecord, SourceRef
+
+FIELDS = ["filename", "left", "bottom", "right", "top", "width", "height"]
+
+
+def _write_source(root: Path, name: str, rows) -> Path:
+    src = root / "source-store" / name
+    src.mkdir(parents=True)
+    with (src / "bounds.csv").open("w", newline="") as fp:
+        writer = csv.writer(fp)
+        writer.writerow(FIELDS)
+        for row in rows:
+            if row[0] != "missing.tif":
+                (src / row[0]).write_bytes(b"")
+            writer.writerow(row)
+    return src / "bounds.csv"
+
+
+def test_from_bounds_csv_matches_record_fields(tmp_path):
+    bounds_csv = _write_source(
+        tmp_path,
+        "dem5a",
+        [
+            ("a.tif", 0, 0, 100, 50, 20, 10),
+            ("missing.tif", 0, 0, 1, 1, 1, 1),
+            ("bad.tif", "nan", 0, 1, 1, 1, 1),
+            ("b.tif", 100, 0, 150, 50, 50, 50),
+        ],
+    )
+    catalog = SourceCatalog.from_bounds_csv(bounds_csv, "dem5a", priority=2)
+    assert len(catalog) == 2
+    a, b = catalog
+    assert a.record() == SourceRecord(bounds_csv.parent / "a.tif", 0.0, 0.0, 100.0, 50.0, 20, 10, 5.0, "dem5a", 2)
+    assert b.bounds_mercator == (100.0, 0.0, 150.0, 50.0) and b.pixel_size == 1.0
+    assert catalog[-1] == b and catalog[0:1] == [a]
+    assert catalog.union_bounds() == (0.0, 0.0, 150.0, 50.0)
+    assert catalog.overlapping((90.0, 10.0, 100.0, 20.0)) == [a]
+
+
+def test_concat_keeps_source_order_and_views_are_keys(tmp_path):
+    first = _write_source(tmp_path, "dem1a", [("x.tif", 0, 0, 10, 10, 10, 10)])
+    second = _write_source(tmp_path, "dem5a", [("x.tif", 0, 0, 10, 10, 2, 2), ("y.tif", 5, 5, 20, 20, 3, 3)])
+    catalog = SourceCatalog.concat(
+        [SourceCatalog.from_bounds_csv(first, "dem1a", 0), SourceCatalog.from_bounds_csv(second, "dem5a", 1)]
+    )
+    assert [(r.source, r.priority, r.path) for r in catalog] == [
+        ("dem1a", 0, first.parent / "x.tif"),
+        ("dem5a", 1, second.parent / "x.tif"),
+        ("dem5a", 1, second.parent / "y.tif"),
+    ]
+    # Views are created per access but compare and hash by row
+    assert catalog[1] == catalog[1] and catalog[1] != catalog[2]
+    assert {catalog[1]: "hit"}[catalog[1]] == "hit"
+    assert catalog[2]._replace(priority=5).priority == 5
+
+    copy = pickle.loads(pickle.dumps(catalog))
+    assert copy.records() == catalog.records()
+    assert isinstance(copy[0], SourceRef)
+
+
+def test_memory_per_record_is_tens_of_bytes(tmp_path):
+    rows = [(f"FG-GML-5339-{i:04d}-DEM5A.tif", i, 0, i + 1, 1, 225, 150) for i in range(2000)]
+    bounds_csv = _write_source(tmp_path, "dem5a", rows)
+    catalog = SourceCatalog.from_bounds_csv(bounds_csv, "dem5a")
+    names = sum(len(r[0]) for r in rows)
+    assert (catalog.nbytes() - names) / len(catalog) < 64
+
+
+def test_aggregation_over_catalog_matches_record_list(tmp_path, monkeypatch, make_synthetic_dem):
+    pytest.importorskip("rasterio")
+    pytest.importorskip("mercantile")
+    from pipelines.aggregate_pmtiles import generate_aggregated_tiles
+
+    monkeypatch.setenv("FUSI_WEBP_METHOD", "0")
+    src = tmp_path / "source-store" / "synthetic"
+    src.mkdir(parents=True)
+    record = make_synthetic_dem(src / "dem.tif")
+    with (src / "bounds.csv").open("w", newline="") as fp:
+        writer = csv.writer(fp)
+        writer.writerow(FIELDS)
+        writer.writerow(["dem.tif", repr(record.left), repr(record.bottom), repr(record.right), repr(record.top), 360, 252])
+    catalog = SourceCatalog.from_bounds_csv(src / "bounds.csv", "synthetic")
+    assert catalog[0].record() == record
+
+    kwargs = dict(min_zoom=11, max_zoom=12, progress_interval=0)
+    from_list = list(generate_aggregated_tiles([record], **kwargs))
+    assert from_list
+    assert list(generate_aggregated_tiles(catalog, **kwargs)) == from_list
+    assert list(generate_aggregated_tiles(catalog, workers=2, **kwargs)) == from_list
+
+
+def test_cached_catalog_is_reused_until_bounds_csv_changes(tmp_path):
+    rows = [("a.tif", 0, 0, 100, 50, 20, 10), ("b.tif", 100, 0, 150, 50, 50, 50)]
+    bounds_csv = _write_source(tmp_path, "dem5a", rows)
+    built = SourceCatalog.cached(bounds_csv, "dem5a", priority=1)
+    assert (bounds_csv.parent / "bounds.catalog" / "meta.json").exists()
+    assert built.records() == SourceCatalog.from_bounds_csv(bounds_csv, "dem5a", 1).records()
+
+    # A cache hit neither parses the CSV nor stats the GeoTIFFs
+    (bounds_csv.parent / "b.tif").unlink()
+    again = SourceCatalog.cached(bounds_csv, "dem5a", priority=3)
+    assert len(again) == 2 and again[1].priority == 3
+    # Columns are read-only views of the mapped files, not copies
+    assert not again.bounds.flags.writeable and not again.width.flags.writeable
+
+    # Memory-mapped catalogs pickle as a reference to the cache
+    merged = SourceCatalog.concat([again, SourceCatalog.cached(bounds_csv, "copy", priority=4)])
+    blob = pickle.dumps(merged)
+    assert len(blob) < 1000
+    assert pickle.loads(blob).records() == merged.records()
+
+    with bounds_csv.open("a", newline="") as fp:
+        csv.writer(fp).writerow(("c.tif", 0, 0, 1, 1, 1, 1))
+    assert [r.path.name for r in SourceCatalog.cached(bounds_csv, "dem5a")] == ["a.tif"]
@@ -0,0 +1,54 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from pipelines.spatial_index import SpatialIndex
+
+
+def _brute_force(bounds, priority, pixel_size, box):
+    order = sorted(range(len(bounds)), key=lambda i: (priority[i], pixel_size[i]))
+    left, bottom, right, top = box
+    return [
+        i
+        for i in order
+        if not (bounds[i, 2] <= left or bounds[i, 0] >= right or bounds[i, 3] <= bottom or bounds[i, 1] >= top)
+    ]
+
+
+@pytest.mark.parametrize("n,node_size", [(0, 16), (1, 16), (7, 2), (300, 4), (3000, 16)])
+def test_query_matches_brute_force_in_merge_order(n, node_size):
+    rng = np.random.default_rng(n)
+    corner = rng.uniform(0, 1000, (n, 2))
+    bounds = np.hstack([corner, corner + rng.uniform(1, 40, (n, 2))])
+    priority = rng.integers(0, 3, n)
+    pixel_size = rng.choice([1.0, 5.0, 10.0], n)
+    index = SpatialIndex(bounds, priority, pixel_size, node_size=node_size)
+    for _ in range(100):
+        x, y = rng.uniform(-50, 1000, 2)
+        box = (x, y, x + rng.uniform(0.5, 150), y + rng.uniform(0.5, 150))
+        assert index.query(box).tolist() == _brute_force(bounds, priority, pixel_size, box)
+
+
+def test_touching_edges_do_not_overlap_and_ties_keep_input_order():
+    bounds = np.array([[0, 0, 10, 10], [10, 0, 20, 10], [0, 0, 20, 10]], dtype=float)
+    index = SpatialIndex(bounds, priority=[1, 0, 0], pixel_size=[1, 5, 5])
+    assert index.query((10, 0, 15, 5)).tolist() == [1, 2]
+    assert index.query((0, 0, 10, 10)).tolist() == [2, 0]
+    with pytest.raises(ValueError):
+        index.candidates((0, 0, 1, 1))
+
+
+def test_from_records_returns_records():
+    from pipelines.aggregate_pmtiles import SourceRecord
+
+    records = [
+        SourceRecord(Path(f"{i}.tif"), i * 10.0, 0.0, i * 10.0 + 10.0, 10.0, 1, 1, ps, "s", pr)
+        for i, (ps, pr) in enumerate([(5.0, 1), (1.0, 1), (1.0, 0)])
+    ]
+    index = SpatialIndex.from_records(records)
+    assert index.candidates((0.0, 0.0, 30.0, 10.0)) == [records[2], records[1], records[0]]
+    assert index.candidates((100.0, 0.0, 110.0, 10.0)) == []
@@ -0,0 +1,91 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from pipelines.staged_pipeline import Stage, StagedPipeline
+
+
+def test_pipeline_preserves_order_and_drops_none():
+    def slow_for_small(i):
+        time.sleep(0.001 * (10 - i % 10))
+        return i
+
+    def square_odd(i):
+        return i * i if i % 2 else None
+
+    pipeline = StagedPipeline([Stage("a", slow_for_small, 3), Stage("b", square_odd, 2)])
+    assert list(pipeline.run(range(40))) == [i * i for i in range(40) if i % 2]
+    stats = pipeline.stage_stats()
+    assert list(stats) == ["a", "b", "write"]
+    assert stats["a"]["items"] == 40 and stats["b"]["items"] == 40
+    assert stats["write"]["items"] == 20
+    assert 0.0 <= stats["a"]["utilisation"] <= 1.0
+    assert "a 3x" in pipeline.format_stats()
+
+
+def test_pipeline_bounds_items_in_flight():
+    fed = []
+    lock = threading.Lock()
+
+    def items():
+        for i in range(100):
+            with lock:
+                fed.append(i)
+            yield i
+
+    pipeline = StagedPipeline([Stage("a", lambda i: i, 2), Stage("b", lambda i: i, 2)], max_in_flight=5)
+    for consumed, _ in enumerate(pipeline.run(items()), start=1):
+        time.sleep(0.0005)
+        assert len(fed) - consumed <= 5
+
+
+def test_pipeline_reraises_stage_errors_in_order():
+    def fail_at_7(i):
+        if i == 7:
+            raise RuntimeError("boom")
+        return i
+
+    seen = []
+    with pytest.raises(RuntimeError, match="boom"):
+        for value in StagedPipeline([Stage("a", fail_at_7, 2)]).run(range(20)):
+            seen.append(value)
+    assert seen == list(range(7))
+
+
+def test_pipeline_stops_cleanly_when_consumer_quits_early():
+    pipeline = StagedPipeline([Stage("a", lambda i: i, 2)])
+    results = pipeline.run(range(10_000))
+    assert next(results) == 0
+    results.close()
+    assert not [t for t in threading.enumerate() if t.name.startswith("pipeline-")]
+
+
+rasterio = pytest.importorskip("rasterio")
+mercantile = pytest.importorskip("mercantile")
+
+from pipelines.aggregate_pmtiles import generate_aggregated_tiles  # noqa: E402
+
+
+@pytest.mark.parametrize("pyramid", [False, True])
+def test_pipelined_aggregation_matches_sequential(tmp_path, monkeypatch, pyramid, make_synthetic_dem):
+    monkeypatch.setenv("FUSI_WEBP_METHOD", "0")
+    record = make_synthetic_dem(tmp_path / "dem.tif")
+    kwargs = dict(min_zoom=11, max_zoom=13, progress_interval=0, pyramid=pyramid)
+    sequential = list(generate_aggregated_tiles([record], **kwargs))
+    pipelined = list(generate_aggregated_tiles([record], pipeline=True, read_threads=2, encode_threads=3, **kwargs))
+    assert sequential
+    assert pipelined == sequential
+
+
+def test_default_read_threads_ignores_bad_env(monkeypatch):
+    from pipelines.aggregate_pmtiles import default_read_threads
+
+    monkeypatch.setenv("FUSI_READ_THREADS", "4")
+    assert default_read_threads() == 4
+    monkeypatch.setenv("FUSI_READ_THREADS", "x")
+    assert default_read_threads() == 2
@@ -0,0 +1,57 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+pytest.importorskip("PIL")
+
+from pipelines import imagecodecs
+from pipelines.terrarium_decode import decode_terrarium, decode_terrarium_batch, rgb_to_elevation
+
+
+def _per_channel(rgb):
+    r = rgb[..., 0].astype(np.float32)
+    g = rgb[..., 1].astype(np.float32)
+    b = rgb[..., 2].astype(np.float32)
+    return (r * 256.0) + g + (b / 256.0) - 32768.0
+
+
+def _rgb(seed, shape=(64, 48)):
+    return np.random.default_rng(seed).integers(0, 256, shape + (3,), dtype=np.uint8)
+
+
+def test_fused_elevation_is_bit_identical():
+    rgb = _rgb(0, (256, 256))
+    rgb[0, :3] = [[0, 0, 0], [255, 255, 255], [128, 0, 0]]
+    assert np.array_equal(rgb_to_elevation(rgb), _per_channel(rgb))
+    rgba = np.concatenate([rgb, np.full(rgb.shape[:2] + (1,), 255, np.uint8)], axis=-1)
+    out = np.empty(rgb.shape[:2], np.float32)
+    assert rgb_to_elevation(rgba, out=out) is out
+    assert np.array_equal(out, _per_channel(rgb))
+    with pytest.raises(ValueError):
+        rgb_to_elevation(rgb[..., :2])
+
+
+def test_decode_webp_round_trip_and_batch():
+    tiles = [_rgb(i) for i in range(3)]
+    blobs = [imagecodecs.webp_encode(t, lossless=True, method=0) for t in tiles]
+    for tile, blob in zip(tiles, blobs):
+        assert np.array_equal(decode_terrarium(blob), _per_channel(tile))
+    out = np.empty((64, 48), np.float32)
+    assert decode_terrarium(blobs[1], out=out) is out
+
+    stack = decode_terrarium_batch(blobs)
+    assert stack.shape == (3, 64, 48)
+    assert all(np.array_equal(s, _per_channel(t)) for s, t in zip(stack, tiles))
+
+    other = imagecodecs.webp_encode(_rgb(9, (32, 32)), lossless=True, method=0)
+    mixed = [blobs[0], b"not a webp", other, blobs[2]]
+    kept = decode_terrarium_batch(mixed, skip_errors=True)
+    assert kept.shape == (2, 64, 48)
+    assert np.array_equal(kept[1], _per_channel(tiles[2]))
+    assert decode_terrarium_batch([b"junk"], skip_errors=True) is None
+    with pytest.raises(Exception):
+        decode_terrarium_batch(mixed)
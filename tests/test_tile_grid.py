@@ -0,0 +1,76 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+mercantile = pytest.importorskip("mercantile")
+
+from pipelines.tile_grid import (
+    count_tiles,
+    iter_tiles,
+    lnglat_bounds,
+    range_count,
+    tile_range,
+    tiles_in_subtree,
+    zoom_ranges,
+)
+
+BBOXES = [
+    (139.70, 35.60, 139.80, 35.70),
+    (122.0, 24.0, 154.0, 46.0),
+    (-180.0, -90.0, 180.0, 90.0),
+    (139.6875, 35.6037, 139.7021, 35.6173),  # edges on z11/z12 tile lines
+    (10.0, 10.0, 10.0, 10.0),
+]
+
+
+@pytest.mark.parametrize("bbox", BBOXES)
+def test_iter_tiles_matches_mercantile(bbox):
+    for z in range(0, 13):
+        # Skip before enumerating: the world bbox has 16.7M tiles at z12
+        if range_count(tile_range(*bbox, z)) > 50000:
+            continue
+        expected = [(t.x, t.y, mercantile.xy_bounds(t)) for t in mercantile.tiles(*bbox, z)]
+        got = list(iter_tiles(tile_range(*bbox, z), z, block=97))
+        # Same tiles, same order, bit-identical bounds
+        assert got == expected
+
+
+def test_counts_are_closed_form():
+    bbox = BBOXES[1]
+    ranges = zoom_ranges(*bbox, range(5, 11))
+    assert count_tiles(ranges) == sum(1 for _ in mercantile.tiles(*bbox, range(5, 11)))
+    for tile in mercantile.tiles(*bbox, 6):
+        below = sum(
+            1
+            for z in range(6, 11)
+            for t in mercantile.tiles(*bbox, z)
+            if (t.x >> (z - 6), t.y >> (z - 6)) == (tile.x, tile.y)
+        )
+        assert tiles_in_subtree(6, tile.x, tile.y, ranges) == below
+    with pytest.raises(ValueError):
+        tile_range(170.0, 0.0, -170.0, 10.0, 3)
+
+
+def test_mbtiles_bounds_metadata_from_extents(tmp_path):
+    from pipelines.mbtiles_writer import MBTilesWriter
+
+    tiles = [(z, t.x, t.y) for z in (8, 10) for t in mercantile.tiles(139.0, 35.0, 140.5, 36.0, z)]
+    writer = MBTilesWriter(tmp_path / "out.mbtiles")
+    writer.add_tiles((z, x, y, b"t") for z, x, y in tiles)
+    writer.finalize()
+
+    boxes = [mercantile.bounds(x, y, z) for z, x, y in tiles]
+    expected = (
+        min(b.west for b in boxes),
+        min(b.south for b in boxes),
+        max(b.east for b in boxes),
+        max(b.north for b in boxes),
+    )
+    with sqlite3.connect(tmp_path / "out.mbtiles") as conn:
+        meta = dict(conn.execute("SELECT name, value FROM metadata"))
+    assert meta["bounds"] == ",".join(str(v) for v in expected)
+    assert lnglat_bounds({}) is None
@@ -0,0 +1,66 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+pytest.importorskip("rasterio")
+pytest.importorskip("pmtiles")
+
+from pipelines.aggregate_pmtiles import merge_tile_candidates
+from pipelines.convert_terrarium import encode_terrarium
+from pipelines.tile_kernel import TileKernel, get_tile_kernel
+
+
+def _tile(rng, holes=0.0, low=-500.0, high=4000.0):
+    data = rng.uniform(low, high, (512, 512)).astype(np.float32)
+    data[rng.random(data.shape) < holes] = np.nan
+    return data
+
+
+@pytest.mark.parametrize("z", range(0, 18))
+def test_encode_is_bit_identical(z):
+    rng = np.random.default_rng(z)
+    kernel = TileKernel()
+    tiles = [_tile(rng, holes=0.1), _tile(rng, low=-12000.0, high=12000.0), np.full((512, 512), np.nan, np.float32)]
+    for data in tiles:
+        rgb = kernel.encode(data, z)
+        assert rgb is kernel.rgb
+        assert np.array_equal(rgb, encode_terrarium(data, z))
+
+
+def test_merge_matches_merge_tile_candidates_and_stops_early():
+    rng = np.random.default_rng(1)
+    reads = [_tile(rng, holes=0.5), None, _tile(rng, holes=0.3), _tile(rng), _tile(rng)]
+    kernel = TileKernel()
+    consumed = []
+
+    def lazy(items):
+        for item in items:
+            consumed.append(item)
+            yield item
+
+    merged = kernel.merge(lazy(reads))
+    assert merged is kernel.merged
+    assert np.array_equal(merged, merge_tile_candidates(iter(reads)), equal_nan=True)
+    # The fourth read fills every gap; the fifth is never consumed
+    assert len(consumed) == 4
+    # Buffers are reused and fully reset by the next merge
+    only = _tile(rng, holes=0.2)
+    assert np.array_equal(kernel.merge([only]), only, equal_nan=True)
+    assert kernel.merge([None, None]) is None
+
+
+def test_kernels_are_per_thread_and_shape():
+    import threading
+
+    main = get_tile_kernel()
+    assert get_tile_kernel((512, 512)) is main
+    assert get_tile_kernel((256, 256)).shape == (256, 256)
+    other = []
+    thread = threading.Thread(target=lambda: other.append(get_tile_kernel()))
+    thread.start()
+    thread.join()
+    assert other[0] is not main
@@ -0,0 +1,93 @@
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from pipelines.tile_workers import ordered_map
+
+
+def test_ordered_map_preserves_order_with_uneven_task_times():
+    def slow_for_small(i):
+        time.sleep(0.002 * (10 - i))
+        return i * i
+
+    with ThreadPoolExecutor(max_workers=4) as ex:
+        assert list(ordered_map(ex, slow_for_small, range(10), max_in_flight=4)) == [i * i for i in range(10)]
+
+
+def test_ordered_map_applies_backpressure():
+    submitted = []
+    lock = threading.Lock()
+
+    def items():
+        for i in range(50):
+            with lock:
+                submitted.append(i)
+            yield i
+
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        for consumed, _ in enumerate(ordered_map(ex, lambda i: i, items(), max_in_flight=3), start=1):
+            # Never more than max_in_flight items ahead of the consumer
+            assert len(submitted) - consumed <= 3
+
+
+rasterio = pytest.importorskip("rasterio")
+mercantile = pytest.importorskip("mercantile")
+
+from pipelines.aggregate_pmtiles import generate_aggregated_tiles  # noqa: E402
+
+
+def test_worker_pool_output_is_identical_to_single_process(tmp_path, monkeypatch, make_synthetic_dem):
+    monkeypatch.setenv("FUSI_WEBP_METHOD", "0")
+    record = make_synthetic_dem(tmp_path / "dem.tif")
+    kwargs = dict(min_zoom=11, max_zoom=13, progress_interval=0)
+    single = list(generate_aggregated_tiles([record], **kwargs))
+    parallel = list(generate_aggregated_tiles([record], workers=2, chunk_depth=1, **kwargs))
+    assert single
+    # Chunks come back in Morton order rather than the row-major scan order
+    assert sorted(parallel) == sorted(single)
+    # ...but that order does not depend on the worker count
+    assert list(generate_aggregated_tiles([record], workers=3, chunk_depth=1, **kwargs)) == parallel
+
+
+def test_pyramid_with_workers_matches_in_process_pyramid(tmp_path, monkeypatch, make_synthetic_dem):
+    monkeypatch.setenv("FUSI_WEBP_METHOD", "0")
+    record = make_synthetic_dem(tmp_path / "dem.tif")
+    kwargs = dict(min_zoom=10, max_zoom=13, progress_interval=0, pyramid=True)
+    single = list(generate_aggregated_tiles([record], **kwargs))
+    parallel = list(generate_aggregated_tiles([record], workers=2, chunk_depth=2, **kwargs))
+    assert single
+    assert sorted(parallel) == sorted(single)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_encoder_pool_is_closed_when_consumer_stops_early(tmp_path, monkeypatch, make_synthetic_dem, workers):
+    from pipelines import imagecodecs
+
+    closed = []
+
+    class TrackedEncoder(imagecodecs.WebPEncoder):
+        def close(self):
+            closed.append(self)
+            super().close()
+
+    monkeypatch.setattr(imagecodecs, "WebPEncoder", TrackedEncoder)
+    record = make_synthetic_dem(tmp_path / "dem.tif")
+    tiles = generate_aggregated_tiles([record], min_zoom=11, max_zoom=13, progress_interval=0, workers=workers)
+    next(tiles)
+    tiles.close()
+    assert len(closed) == 1
+
+
+def test_default_chunk_depth_ignores_bad_env(monkeypatch):
+    from pipelines.aggregate_pmtiles import DEFAULT_CHUNK_DEPTH, default_chunk_depth
+
+    monkeypatch.setenv("FUSI_CHUNK_DEPTH", "2")
+    assert default_chunk_depth() == 2
+    monkeypatch.setenv("FUSI_CHUNK_DEPTH", "deep")
+    assert default_chunk_depth() == DEFAULT_CHUNK_DEPTH
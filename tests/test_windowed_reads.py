@@ -0,0 +1,65 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+rasterio = pytest.importorskip("rasterio")
+mercantile = pytest.importorskip("mercantile")
+
+from pipelines.aggregate_pmtiles import read_tile_from_source
+
+
+@pytest.mark.parametrize("z", [9, 12, 14])
+def test_window_read_is_pixel_identical_to_full_read(synthetic_record, z, tiles_over):
+    tiles = tiles_over(synthetic_record, z)
+    assert tiles
+    for tile in tiles[:6]:
+        bounds = mercantile.xy_bounds(tile)
+        full = read_tile_from_source(synthetic_record, bounds, (512, 512), 1, read_mode="full")
+        windowed = read_tile_from_source(synthetic_record, bounds, (512, 512), 1, read_mode="window")
+        if full is None:
+            assert windowed is None
+            continue
+        assert windowed is not None
+        assert np.array_equal(full, windowed, equal_nan=True)
+
+
+def test_auto_read_matches_full_read_when_tile_is_finer_than_source(synthetic_record, tiles_over):
+    # z14 pixels (~4.8 m) are finer than the 1" source, so no decimation applies
+    for tile in tiles_over(synthetic_record, 14)[:4]:
+        bounds = mercantile.xy_bounds(tile)
+        full = read_tile_from_source(synthetic_record, bounds, (512, 512), 1, read_mode="full")
+        auto = read_tile_from_source(synthetic_record, bounds, (512, 512), 1, read_mode="auto")
+        assert (full is None) == (auto is None)
+        if full is not None:
+            assert np.array_equal(full, auto, equal_nan=True)
+
+
+def test_auto_read_decimates_coarse_tiles_within_tolerance(synthetic_record, tiles_over):
+    tile = tiles_over(synthetic_record, 8)[0]
+    bounds = mercantile.xy_bounds(tile)
+    full = read_tile_from_source(synthetic_record, bounds, (512, 512), 1, read_mode="full")
+    auto = read_tile_from_source(synthetic_record, bounds, (512, 512), 1, read_mode="auto")
+    assert full is not None and auto is not None
+    both = ~np.isnan(full) & ~np.isnan(auto)
+    assert both.sum() > 0.9 * (~np.isnan(full)).sum()
+    assert float(np.max(np.abs(full[both] - auto[both]))) < 5.0
+
+
+def test_window_read_returns_none_outside_source(synthetic_record):
+    far_tile = mercantile.tile(141.5, 43.0, 12)
+    bounds = mercantile.xy_bounds(far_tile)
+    for mode in ("full", "window", "auto"):
+        assert read_tile_from_source(synthetic_record, bounds, (512, 512), 1, read_mode=mode) is None
+
+
+def test_default_read_mode_ignores_bad_env(monkeypatch):
+    from pipelines.aggregate_pmtiles import default_read_mode
+
+    monkeypatch.setenv("FUSI_READ_MODE", "Window")
+    assert default_read_mode() == "window"
+    monkeypatch.setenv("FUSI_READ_MODE", "bogus")
+    assert default_read_mode() == "auto"